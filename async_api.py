@@ -0,0 +1,112 @@
+import asyncio
+import functools
+from robot_api import SimXArmAPI
+
+# --- ASYNCIO FACADE ---
+# Awaitable version of the xArm API for asyncio-based cell controllers:
+#
+#   arm = AsyncXArmAPI(XArmAPI(ip))
+#   await asyncio.gather(arm.set_position(x=250, wait=True), conveyor.run())
+#
+# Motions run the same step generators as SimXArmAPI, with asyncio.sleep in place
+# of time.sleep, so one event loop can drive the robot next to other coroutines.
+# The GUI stop flag raises SystemExit("Stop") as in blocking scripts; cancelling
+# the awaiting task stops the arm (set_state(4) on a real robot) and re-raises.
+
+POLL_S = 0.05
+
+
+class AsyncXArmAPI:
+    def __init__(self, api):
+        self.api = api
+        self._motion_lock = None
+        # Proxied APIs (isolated script on a real robot) have no step generators
+        self._native = isinstance(api, SimXArmAPI)
+
+    # --- DRIVER ---
+    async def _drive(self, steps):
+        try:
+            while True:
+                await asyncio.sleep(next(steps))
+        except StopIteration as done:
+            return done.value
+        except asyncio.CancelledError:
+            steps.close()
+            self._halt_motion()
+            raise
+
+    def _halt_motion(self):
+        if self.api.real_arm is not None:
+            try: self.api.real_arm.set_state(4)
+            except: pass
+        self.api._log("[ASYNC] Motion cancelled")
+
+    async def _motion(self, name, *args, **kwargs):
+        # One motion at a time per arm; callers queue on the lock in call order
+        if self._motion_lock is None: self._motion_lock = asyncio.Lock()
+        async with self._motion_lock:
+            return await self._drive(getattr(self.api, f"_{name}_steps")(*args, **kwargs))
+
+    # --- MOTION ---
+    async def set_servo_angle(self, angle, speed=None, mvacc=None, is_radian=False, wait=True):
+        if not self._native:
+            return await self._blocking("set_servo_angle", angle, speed=speed, mvacc=mvacc, is_radian=is_radian, wait=wait)
+        return await self._motion("servo_angle", angle, speed, mvacc, is_radian, wait)
+
+    async def set_position(self, x=None, y=None, z=None, roll=None, pitch=None, yaw=None, speed=None, silent=False, **kwargs):
+        if not self._native:
+            return await self._blocking("set_position", x, y, z, roll, pitch, yaw, speed=speed, silent=silent, **kwargs)
+        return await self._motion("position", x, y, z, roll, pitch, yaw, speed, silent, **kwargs)
+
+    async def plan_servo_angle(self, angle, speed=None, is_radian=False, time_budget=None, obstacles=None, wait=True):
+        if not self._native:
+            return await self._blocking("plan_servo_angle", angle, speed=speed, is_radian=is_radian,
+                                        time_budget=time_budget, obstacles=obstacles, wait=wait)
+        return await self._motion("plan_servo", angle, speed, is_radian, time_budget, obstacles, wait)
+
+    async def plan_position(self, x=None, y=None, z=None, roll=None, pitch=None, yaw=None, speed=None, **kwargs):
+        if not self._native:
+            return await self._blocking("plan_position", x, y, z, roll, pitch, yaw, speed=speed, **kwargs)
+        return await self._motion("plan_position", x, y, z, roll, pitch, yaw, speed, **kwargs)
+
+    async def move_circle(self, pose1, pose2, percent, speed=None, mvacc=None, mvtime=None, is_radian=False, wait=True, **kwargs):
+        if not self._native:
+            return await self._blocking("move_circle", pose1, pose2, percent, speed=speed, mvacc=mvacc,
+                                        mvtime=mvtime, is_radian=is_radian, wait=wait, **kwargs)
+        return await self._motion("move_circle", pose1, pose2, percent, speed, mvacc, mvtime, is_radian, wait, **kwargs)
+
+    async def draw_file(self, path, speed=None, plane=None):
+        if not self._native:
+            return await self._blocking("draw_file", path, speed=speed, plane=plane)
+        return await self._motion("draw_file", path, speed, plane)
+
+    async def _blocking(self, name, *args, **kwargs):
+        # Proxied API: the blocking call runs in the default executor
+        if self._motion_lock is None: self._motion_lock = asyncio.Lock()
+        async with self._motion_lock:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, functools.partial(getattr(self.api, name), *args, **kwargs))
+
+    async def sleep(self, seconds):
+        # Non-blocking wait that honours the GUI pause and stop buttons
+        loop = asyncio.get_running_loop()
+        end = loop.time() + seconds
+        while True:
+            if self._native:
+                for delay in self.api._control_steps(): await asyncio.sleep(delay)
+            remaining = end - loop.time()
+            if remaining <= 0: return
+            await asyncio.sleep(min(POLL_S, remaining))
+
+    # --- STATE / IO ---
+    def __getattr__(self, name):
+        # Everything else (state, mode, IO, getters) is a short call: awaitable, run inline
+        target = getattr(self.api, name, None)
+        if target is None and self.api.real_arm is not None: target = getattr(self.api.real_arm, name, None)
+        if target is None: raise AttributeError(name)
+        if not callable(target): return target
+
+        async def call(*args, **kwargs):
+            return target(*args, **kwargs)
+        call.__name__ = name
+        return call
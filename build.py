@@ -78,6 +78,25 @@ args = [
     '--hidden-import=visualizer',
     '--hidden-import=config',
     '--hidden-import=utils',
+    '--hidden-import=kinematics',
+    '--hidden-import=planner',
+    '--hidden-import=reachability',
+    '--hidden-import=seed_index',
+    '--hidden-import=ik_pool',
+    '--hidden-import=model_cache',
+    '--hidden-import=script_runner',
+    '--hidden-import=async_api',
+    '--hidden-import=cell',
+    '--hidden-import=telemetry',
+    '--hidden-import=replay',
+    '--hidden-import=timeline',
+    '--hidden-import=drawing',
+    '--hidden-import=paths',
+    '--hidden-import=timing',
+    '--hidden-import=cycle_time',
+    '--hidden-import=dynamics',
+    '--hidden-import=trajectory_io',
+    '--hidden-import=compare',
     '--noconsole',                
     '--clean', 
 ]
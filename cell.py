@@ -0,0 +1,174 @@
+import math
+import queue
+import threading
+import numpy as np
+import config
+import robot_api
+from robot_api import SimXArmAPI
+from kinematics import fit_link_spheres
+
+# --- MULTI-ROBOT CELL ---
+# Several arms of the active model in one scene, each with its own base transform,
+# SimXArmAPI and script thread. Robot 0 is the GUI's own API, so a one-robot cell
+# behaves exactly like the single-arm simulator. Per frame, FK for every arm is one
+# batched call, and arms are checked against each other with bounding spheres
+# fitted to the link meshes.
+
+SPHERES_PER_LINK = 3
+FALLBACK_LINK_RADIUS = 0.04 # m, links without mesh data
+
+
+def base_matrix(base):
+    # [x, y, z] in mm plus yaw in degrees -> 4x4 world transform of the robot base
+    x, y, z = [float(v) / 1000.0 for v in base[:3]]
+    yaw = math.radians(float(base[3])) if len(base) > 3 else 0.0
+    T = np.eye(4)
+    T[:2, :2] = [[math.cos(yaw), -math.sin(yaw)], [math.sin(yaw), math.cos(yaw)]]
+    T[:3, 3] = [x, y, z]
+    return T
+
+
+class RobotContext:
+    # Per-robot context: own joint queue, logs and stop/pause shared with the GUI
+    def __init__(self, parent, name):
+        self.parent = parent
+        self.name = name
+        self.log_queue = _PrefixedLog(parent.log_queue, name)
+        self.joint_queue = queue.Queue(maxsize=2)
+
+    @property
+    def stop_flag(self): return self.parent.stop_flag
+
+    @property
+    def paused(self): return self.parent.paused
+
+    def __getattr__(self, name):
+        return getattr(self.parent, name)
+
+
+class _PrefixedLog:
+    def __init__(self, q, name):
+        self.q = q
+        self.name = name
+
+    def put(self, msg): self.q.put(f"[{self.name}] {msg}")
+
+    put_nowait = put
+
+
+class RobotInstance:
+    def __init__(self, name, base, api, ctx, ip=None, script=None):
+        self.name = name
+        self.base = base_matrix(base)
+        self.api = api
+        self.ctx = ctx
+        self.ip = ip
+        self.script = script
+
+
+class Cell:
+    def __init__(self, primary_api, compiled, robots_cfg=None, ctx=None):
+        robots_cfg = robots_cfg or config.CELL_ROBOTS or [{}]
+        self.model = compiled.model
+        self.robots = []
+        for i, cfg in enumerate(robots_cfg):
+            name = cfg.get("name", f"Robot {i + 1}")
+            if i == 0:
+                api, rctx = primary_api, primary_api.ctx
+            else:
+                rctx = RobotContext(ctx or primary_api.ctx, name)
+                api = SimXArmAPI(rctx, compiled.chain(), compiled)
+                api.reach_map, api.seed_index = primary_api.reach_map, primary_api.seed_index
+            self.robots.append(RobotInstance(name, cfg.get("base", [0, 0, 0, 0]), api, rctx,
+                                             cfg.get("ip"), cfg.get("script")))
+        # Scripts that use robot_api.GLOBAL_API_INSTANCE keep talking to the GUI's arm
+        robot_api.GLOBAL_API_INSTANCE = primary_api
+
+        self.bases = np.stack([r.base for r in self.robots])
+        self.sphere_link = np.zeros(0, dtype=int)
+        self.sphere_local = np.zeros((0, 3))
+        self.sphere_radius = np.zeros(0)
+        self._claimed = set()
+        self._thread_robot = threading.local()
+        self.set_link_volumes({})
+
+    def __len__(self): return len(self.robots)
+
+    @property
+    def primary(self): return self.robots[0]
+
+    # --- MODEL ---
+    def set_model(self, chain, compiled):
+        self.model = compiled.model
+        for robot in self.robots[1:]:
+            robot.api.set_model(chain, compiled)
+
+    def set_link_volumes(self, link_points):
+        # link_points: {link index: [P, 3] mesh points in the link frame}
+        links, centers, radii = [], [], []
+        for i in range(self.model.n_links):
+            pts = link_points.get(i)
+            if pts is not None and len(pts):
+                spheres = fit_link_spheres(pts, SPHERES_PER_LINK)
+            elif i + 1 < self.model.n_links:
+                # No mesh: spheres along the segment to the next frame origin
+                nxt = self.model.origins[i + 1][:3, 3]
+                t = np.linspace(0.0, 1.0, SPHERES_PER_LINK)[:, None]
+                spheres = np.hstack([t * nxt, np.full((SPHERES_PER_LINK, 1), FALLBACK_LINK_RADIUS)])
+            else:
+                continue
+            links += [i] * len(spheres)
+            centers.append(spheres[:, :3])
+            radii.append(spheres[:, 3])
+        self.sphere_link = np.array(links, dtype=int)
+        self.sphere_local = np.vstack(centers) if centers else np.zeros((0, 3))
+        self.sphere_radius = np.concatenate(radii) if radii else np.zeros(0)
+
+    # --- PER FRAME ---
+    def joints(self, primary_joints=None):
+        rows = [list(r.api.joints_deg) for r in self.robots]
+        if primary_joints is not None: rows[0] = list(primary_joints)
+        n = self.model.n_joints
+        return np.array([(row + [0.0] * n)[:n] for row in rows], dtype=float)
+
+    def frames(self, primary_joints=None):
+        # All arms in one batched FK call: [R, L, 4, 4] in world coordinates
+        local = self.model.fk(np.radians(self.joints(primary_joints)), full=True)
+        return self.bases[:, None] @ local
+
+    def collisions(self, frames):
+        # Robot pairs (a, b) whose link spheres overlap
+        if len(self.robots) < 2 or len(self.sphere_link) == 0: return []
+        link_frames = frames[:, self.sphere_link]
+        centers = np.einsum('rsij,sj->rsi', link_frames[:, :, :3, :3], self.sphere_local) + link_frames[:, :, :3, 3]
+        pairs = []
+        for a in range(len(self.robots)):
+            for b in range(a + 1, len(self.robots)):
+                d = np.linalg.norm(centers[a][:, None, :] - centers[b][None, :, :], axis=2)
+                if np.any(d < self.sphere_radius[:, None] + self.sphere_radius[None, :]): pairs.append((a, b))
+        return pairs
+
+    # --- SCRIPTS ---
+    def bind_thread(self, robot):
+        self._thread_robot.robot = robot
+
+    def reset_claims(self):
+        self._claimed = set()
+
+    def api_for(self, ip=None):
+        # XArmAPI(ip) inside scripts: matching ip/name, else the thread's robot, else the next free arm
+        for i, robot in enumerate(self.robots):
+            if ip is not None and ip in (robot.ip, robot.name):
+                self._claimed.add(i)
+                return robot.api
+        bound = getattr(self._thread_robot, "robot", None)
+        if bound is not None: return bound.api
+        for i, robot in enumerate(self.robots):
+            if i not in self._claimed:
+                self._claimed.add(i)
+                return robot.api
+        return self.primary.api
+
+    def home(self):
+        for robot in self.robots[1:]:
+            robot.api.joints_deg = [0.0] * config.JOINT_COUNT
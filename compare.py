@@ -0,0 +1,223 @@
+import sys
+import time
+import argparse
+import numpy as np
+import config
+from kinematics import flagged_runs
+
+# --- SIM VS REAL COMPARISON ---
+# Aligns a simulated trajectory with a recording of the same script on the real arm
+# (both as trajectory_io structured arrays) and measures how far they differ.
+#
+#   1. Both are resampled to one uniform grid; joint velocities are the signal.
+#   2. Global offset: FFT cross-correlation of the whole runs (the script start differs).
+#   3. Local time warp: the real run is cut into overlapping windows, each window is
+#      cross-correlated (one batched FFT) against the sim around the global offset. The
+#      per-window lag, interpolated over time, maps every real sample to a sim time.
+#      Like a banded DTW, but O(N log N) and vectorized, so hour-long runs take seconds.
+#   4. Deviations: joints and TCP of the real run minus the warped sim.
+#   5. Timing: where the lag drifts, one run is moving slower than the other over that
+#      stretch; runs of lag steps adding up to TIMING_MIN_DRIFT are where the
+#      simulator's timing model is off (located to about a window).
+
+COMPARE_DT = 0.01 # s, common grid
+WINDOW_S = 4.0 # s, local alignment window (half-overlapping)
+SEARCH_S = 1.0 # s, local lag searched around the global offset
+MIN_MOTION = 1.0 # deg/s RMS, windows slower than this carry no timing information
+MIN_CORRELATION = 0.7 # Windows below this are a shape mismatch rather than a timing one
+TIMING_MIN_DRIFT = 0.05 # s, accumulated lag change flagged as a timing mismatch
+
+
+def _resample(rows, n_joints, dt):
+    t_in = np.asarray(rows["t"], dtype=float)
+    keep = np.concatenate([[True], np.diff(t_in) > 1e-9])
+    t_in = t_in[keep]
+    t = np.arange(0.0, t_in[-1] - t_in[0] + dt * 0.5, dt)
+    q_in = np.unwrap(np.radians(np.asarray(rows["joints"][keep][:, :n_joints], dtype=float)), axis=0)
+    q = np.column_stack([np.degrees(np.interp(t, t_in - t_in[0], q_in[:, k])) for k in range(n_joints)])
+    xyz = np.asarray(rows["pose"][keep][:, :3], dtype=float)
+    p = np.column_stack([np.interp(t, t_in - t_in[0], xyz[:, k]) for k in range(3)])
+    return t, q, p
+
+
+def _xcorr(a, b, n_fft):
+    # Sum over channels of the cross-correlation of a against b along axis -2: c[k] = sum a[i + k] b[i]
+    A = np.fft.rfft(a, n_fft, axis=-2)
+    B = np.fft.rfft(b, n_fft, axis=-2)
+    return np.fft.irfft(np.sum(A * np.conj(B), axis=-1), n_fft, axis=-1)
+
+
+def global_lag(v_sim, v_real, dt, max_lag=None):
+    # Seconds the real run trails the sim: real(t) ~ sim(t - lag)
+    n = len(v_sim) + len(v_real)
+    n_fft = 1 << int(np.ceil(np.log2(n)))
+    c = _xcorr(v_real, v_sim, n_fft) # c[k]: real shifted by k against sim
+    lags = np.arange(n_fft)
+    lags[lags > n_fft // 2] -= n_fft
+    if max_lag is not None: c = np.where(np.abs(lags) * dt <= max_lag, c, -np.inf)
+    return float(lags[int(np.argmax(c))] * dt)
+
+
+def local_lags(v_sim, v_real, dt, lag0, window_s=WINDOW_S, search_s=SEARCH_S):
+    # Per-window lag of the real run against the sim -> (window centers s, lags s, peak correlation,
+    # valid, moving); valid windows move and match well enough to trust their lag
+    m = max(4, int(round(window_s / dt)))
+    k = int(round(search_s / dt))
+    hop = m // 2
+    starts = np.arange(0, max(1, len(v_real) - m + 1), hop)
+    n_joints = v_real.shape[1]
+
+    # Real windows [W, m, n] and sim segments [W, m + 2k, n] around the global offset (zero padded)
+    idx = starts[:, None] + np.arange(m)[None, :]
+    real_w = v_real[np.clip(idx, 0, len(v_real) - 1)]
+    real_w[idx >= len(v_real)] = 0.0
+    sim_start = starts - int(round(lag0 / dt)) - k
+    sidx = sim_start[:, None] + np.arange(m + 2 * k)[None, :]
+    ok = (sidx >= 0) & (sidx < len(v_sim))
+    sim_w = np.where(ok[..., None], v_sim[np.clip(sidx, 0, len(v_sim) - 1)], 0.0)
+
+    n_fft = 1 << int(np.ceil(np.log2(m + 2 * k + m)))
+    c = _xcorr(sim_w, real_w, n_fft)[:, :2 * k + 1] # c[w, s]: sim segment offset s against the real window
+
+    # Normalized correlation: energy of the sim segment under the window via a running sum
+    e_sim = np.cumsum(np.concatenate([np.zeros((len(starts), 1)), np.sum(sim_w ** 2, axis=2)], axis=1), axis=1)
+    e_sim = e_sim[:, m:m + 2 * k + 1] - e_sim[:, :2 * k + 1]
+    e_real = np.sum(real_w ** 2, axis=(1, 2))
+    corr = c / np.sqrt(np.maximum(e_sim * e_real[:, None], 1e-12))
+    best = np.argmax(corr, axis=1)
+    lags = lag0 + (k - best) * dt
+    peak = corr[np.arange(len(starts)), best]
+    moving = np.sqrt(e_real / (m * n_joints)) > MIN_MOTION
+    valid = moving & (peak >= MIN_CORRELATION)
+    return (starts + m / 2.0) * dt, lags, peak, valid, moving
+
+
+def compare(sim, real, n_joints=None, dt=COMPARE_DT, max_lag=None):
+    # sim, real: trajectory_io structured arrays. Returns a dict with the alignment, the
+    # per-joint / TCP deviation of the real run from the aligned sim and the timing segments.
+    t0 = time.perf_counter()
+    n = n_joints or config.JOINT_COUNT
+    ts, qs, ps = _resample(sim, n, dt)
+    tr, qr, pr = _resample(real, n, dt)
+    vs, vr = np.gradient(qs, dt, axis=0), np.gradient(qr, dt, axis=0)
+
+    lag0 = global_lag(vs, vr, dt, max_lag)
+    centers, lags, peak, valid, moving = local_lags(vs, vr, dt, lag0)
+    if np.any(valid): lag_t = np.interp(tr, centers[valid], lags[valid])
+    else: lag_t = np.full(len(tr), lag0)
+
+    # Warp: sim state at t - lag(t) for every real sample
+    t_sim = np.clip(tr - lag_t, 0.0, ts[-1])
+    q_al = np.column_stack([np.interp(t_sim, ts, qs[:, k]) for k in range(n)])
+    p_al = np.column_stack([np.interp(t_sim, ts, ps[:, k]) for k in range(3)])
+    joint_err = (qr - q_al + 180.0) % 360.0 - 180.0
+    tcp_err = np.linalg.norm(pr - p_al, axis=1)
+
+    # Timing: lag steps between consecutive valid windows (beyond one grid step of jitter);
+    # drift > 0 means the real run took longer than the sim over that stretch
+    segments = []
+    vc, vl = centers[valid], lags[valid]
+    if len(vc) > 1:
+        for start, end in flagged_runs(np.abs(np.diff(vl)) > 1.5 * dt):
+            # Lag steps start..end-1 (end exclusive) run from window start to window end
+            drift = vl[end] - vl[start]
+            if abs(drift) < TIMING_MIN_DRIFT: continue
+            span_real = vc[end] - vc[start]
+            segments.append({"start": float(vc[start]), "end": float(vc[end]), "real": float(span_real),
+                             "sim": float(span_real - drift), "drift": float(drift)})
+    mismatch = [(float(centers[i]), float(peak[i])) for i in np.flatnonzero(moving & ~valid)]
+
+    return {
+        "t": tr, "lag": lag0, "lag_t": lag_t, "window_centers": centers, "window_lags": lags,
+        "window_corr": peak, "window_valid": valid,
+        "joint_error": joint_err, "tcp_error": tcp_err,
+        "joint_rms": np.sqrt(np.mean(joint_err ** 2, axis=0)), "joint_max": np.max(np.abs(joint_err), axis=0),
+        "tcp_rms": float(np.sqrt(np.mean(tcp_err ** 2))), "tcp_p95": float(np.percentile(tcp_err, 95)),
+        "tcp_max": float(np.max(tcp_err)), "timing": segments, "shape_mismatch": mismatch,
+        "duration_sim": float(ts[-1]), "duration_real": float(tr[-1]),
+        "elapsed": time.perf_counter() - t0,
+    }
+
+
+def format_report(result):
+    lines = [f"[COMPARE] Real run {result['duration_real']:.1f}s vs sim {result['duration_sim']:.1f}s, "
+             f"real starts {result['lag']:+.2f}s after the sim"]
+    rms = " ".join(f"J{k + 1}={v:.2f}" for k, v in enumerate(result["joint_rms"]))
+    lines.append(f"[COMPARE] Joint RMS deviation (deg) {rms}")
+    lines.append(f"[COMPARE] TCP deviation: RMS {result['tcp_rms']:.1f} mm, p95 {result['tcp_p95']:.1f} mm, "
+                 f"max {result['tcp_max']:.1f} mm")
+    for s in result["timing"][:10]:
+        word = "slower" if s["drift"] > 0 else "faster"
+        lines.append(f"[COMPARE] Timing off at {s['start']:.1f}-{s['end']:.1f}s: real arm {abs(s['drift']):.2f}s {word} "
+                     f"than the sim ({s['real']:.2f}s vs {s['sim']:.2f}s)")
+    if len(result["timing"]) > 10: lines.append(f"[COMPARE] ... {len(result['timing']) - 10} more timing segment(s)")
+    if result["shape_mismatch"]:
+        first = ", ".join(f"{t:.1f}s" for t, _ in result["shape_mismatch"][:5])
+        lines.append(f"[COMPARE] {len(result['shape_mismatch'])} window(s) move differently, not just slower/faster "
+                     f"(around {first})")
+    lines.append(f"[COMPARE] Compared in {result['elapsed'] * 1000:.0f}ms")
+    return lines
+
+
+def _synthetic_run(durations, dt, delay=0.0, n_joints=6):
+    # Smooth moves between fixed random targets with a 0.5 s pause after each, as trajectory rows
+    from trajectory_io import TRAJECTORY_DTYPE
+    rng = np.random.default_rng(5)
+    t_parts, q_parts = [np.arange(0.0, delay, dt)], [np.zeros((len(np.arange(0.0, delay, dt)), n_joints))]
+    t, q = delay, np.zeros(n_joints)
+    for d in durations:
+        target = rng.uniform(-60.0, 60.0, n_joints)
+        tt = np.arange(0.0, d, dt)
+        t_parts.append(t + tt)
+        q_parts.append(q + np.outer(0.5 - 0.5 * np.cos(np.pi * tt / d), target - q))
+        t, q = t + d, target
+        tt = np.arange(0.0, 0.5, dt)
+        t_parts.append(t + tt)
+        q_parts.append(np.repeat(q[None], len(tt), axis=0))
+        t += 0.5
+    t, q = np.concatenate(t_parts), np.concatenate(q_parts)
+    rows = np.zeros(len(t), dtype=TRAJECTORY_DTYPE)
+    rows["t"] = t
+    rows["joints"][:, :n_joints] = q
+    rows["pose"][:, :3] = q[:, :3]
+    return rows
+
+
+def self_check():
+    # Synthetic runs with a known slow move: mid-run the full drift is recovered; in the last
+    # move only part of it is (no window reaches past the end), but it must still be reported
+    durations = np.random.default_rng(2).uniform(1.0, 3.0, 30)
+    sim = _synthetic_run(durations, 0.01)
+    ok = True
+    for slow in (10, len(durations) - 1):
+        stretched = durations.copy()
+        stretched[slow] *= 1.5
+        result = compare(sim, _synthetic_run(stretched, 0.01, delay=2.3), 6)
+        drift = sum(s["drift"] for s in result["timing"])
+        expected = durations[slow] * 0.5
+        if slow < len(durations) - 1: passed = abs(drift - expected) < 0.1
+        else: passed = drift >= TIMING_MIN_DRIFT and result["timing"][-1]["end"] == result["window_centers"][-1]
+        print(f"[COMPARE] Move {slow + 1}/{len(durations)} {expected:.2f}s slower: drift {drift:.2f}s found "
+              f"-> {'OK' if passed else 'FAIL'}")
+        ok = ok and passed
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare a simulated trajectory with a real-arm recording")
+    parser.add_argument("sim", nargs="?", help="Exported simulated run (.npy / .parquet)")
+    parser.add_argument("real", nargs="?", help="Exported recording (.npy / .parquet)")
+    parser.add_argument("--joints", type=int, default=None, help="Joint count (default: the active model's)")
+    parser.add_argument("--max-lag", type=float, default=None, help="Max start offset searched (s)")
+    parser.add_argument("--self-check", action="store_true", help="Check the alignment on synthetic runs")
+    args = parser.parse_args()
+    if args.self_check: sys.exit(0 if self_check() else 1)
+    if not (args.sim and args.real): parser.error("sim and real are required")
+    import trajectory_io
+    sim, _ = trajectory_io.load(args.sim)
+    real, _ = trajectory_io.load(args.real)
+    for line in format_report(compare(sim, real, args.joints, max_lag=args.max_lag)): print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -21,10 +21,98 @@ JOINT_LIMITS = [
     (-124, 124), # J5: Wrist Pitch
     (-360, 360)  # J6: Wrist Roll
 ]
+
+# --- ROBOT MODELS ---
+# URDF files in MODEL_DIR. Joint limits come from the URDF <limit> tags unless
+# 'joint_limits' overrides them. JOINT_COUNT / JOINT_LIMITS above follow the active model.
+ROBOT_MODELS = {
+    "Lite 6": {"urdf": "lite6.urdf", "joint_limits": list(JOINT_LIMITS)},
+}
+DEFAULT_MODEL = "Lite 6"
+ACTIVE_MODEL = DEFAULT_MODEL
+
+# --- ROBOT CELL ---
+# Arms in the scene, all of the active model. base = [x, y, z] in mm + yaw in degrees.
+# Scripts get an arm with XArmAPI(ip) by matching 'ip' or 'name', otherwise in list
+# order; an optional 'script' runs on that arm in its own thread next to the main script.
+# Dual cell example:
+#   CELL_ROBOTS = [{"name": "Left", "base": [0, 300, 0, 0]},
+#                  {"name": "Right", "base": [0, -300, 0, 0], "ip": "192.168.1.156"}]
+CELL_ROBOTS = [{"name": "Robot 1", "base": [0, 0, 0, 0]}]
+
+# Run user scripts in a separate process (GUI stays responsive, Stop can kill the script)
+SCRIPT_ISOLATION = True
+
+# --- MOCK ROBOT ('debug' connection) ---
+MOCK_JOINT_SPEED = 180.0 # deg/s
+MOCK_JOINT_ACC = 1145.0 # deg/s², used when mvacc is not given
+MOCK_TCP_SPEED = 500.0 # mm/s
+MOCK_TCP_ACC = 2000.0 # mm/s²
+MOCK_SERVO_LAG = 0.02 # Seconds, servo tracking time constant (0 = ideal)
+
+# Record the connected arm (joints, pose, error codes) to USER_DATA_DIR/telemetry
+TELEMETRY_RECORD = True
+
 ROBOT_Z_OFFSET = 0.0
 SIM_SPEED_FACTOR = 1.0 
 ROBOT_SCAN_PORT = 30002
 
+# --- IK FALLBACK POOL ---
+IK_FALLBACK_ENABLED = True
+IK_FALLBACK_SEEDS = 8
+IK_FALLBACK_DEADLINE = 0.5 # Seconds
+
+# --- INCREMENTAL IK ---
+# Below this manipulability the Jacobian step is refused and the full solver is used
+DLS_MIN_MANIPULABILITY = 1e-4
+
+# --- PATH IK ---
+PATH_IK_BLOCK = 64 # Waypoints per batched IK pass
+PATH_MAX_JOINT_STEP = 10.0 # deg between waypoints before a row is re-solved on its own
+PATH_ADAPTIVE = True # Subdivide Cartesian moves by joint-space error instead of a fixed step
+PATH_JOINT_TOL = 0.5 # deg, max deviation of the joint path from straight-line joint interpolation
+PATH_COARSE_STEP = 0.05 # m, initial spacing before refinement
+PATH_MIN_STEP = 0.0005 # m, refinement stops here
+
+# --- TIMING ---
+# Limits the simulated Cartesian moves are timed against (per joint: a list, or one value for all)
+JOINT_SPEED_LIMIT = 180.0 # deg/s
+JOINT_ACC_LIMIT = 1145.0 # deg/s²
+TCP_ACC_LIMIT = 2000.0 # mm/s²
+
+# --- SINGULARITY CHECK ---
+# Cartesian paths are checked before execution; samples below / above these are flagged
+SINGULARITY_CHECK = True
+SINGULARITY_MANIP_MIN = 5e-4 # Manipulability (Lite 6: ~2e-3 typical, J5 at 2 deg is ~3e-4)
+SINGULARITY_COND_MAX = 100.0 # Jacobian condition number
+
+# --- DYNAMICS ---
+# Joint torques from the URDF inertials, checked against the URDF effort limits after a run
+DYNAMICS_CHECK = True
+TOOL_MASS = None # kg, None = estimated from the loaded end-effector mesh volume
+TOOL_DENSITY = 1200.0 # kg/m³, for that estimate
+PAYLOAD_MASS = 0.0 # kg, point mass at the tool tip
+TORQUE_LIMIT_SCALE = 1.0 # Fraction of the effort limits allowed
+DYNAMICS_DT = 0.01 # s, resampling step of a run before differentiating
+DYNAMICS_SMOOTH_S = 0.05 # s, moving average applied to the joint samples
+
+# --- DRAWING (G-code / SVG) ---
+# Plane in robot coordinates (mm): drawing X/Y map onto x_axis/y_axis from origin; the
+# pen points against the plane normal (x_axis x y_axis). pen_length: tip beyond the
+# flange, None = the loaded end-effector length.
+DRAWING_PLANE = {"origin": [250, 0, 0], "x_axis": [1, 0, 0], "y_axis": [0, 1, 0],
+                 "scale": 1.0, "pen_up": 10.0, "pen_length": None}
+DRAWING_SPEED = 50.0 # mm/s, pen down
+DRAWING_TRAVEL_SPEED = 150.0 # mm/s, pen up
+DRAWING_STEP = 1.0 # mm between resampled points, pen down
+DRAWING_TRAVEL_STEP = 5.0 # mm, pen up
+DRAWING_BLEND_RADIUS = 1.0 # mm, blend radius for the streamed moves on a real arm
+
+# --- MOTION PLANNER ---
+PLANNER_TIME_BUDGET = 2.0 # Seconds
+# Axis-aligned boxes in mm: ((min_x, min_y, min_z), (max_x, max_y, max_z))
+SCENE_OBSTACLES = []
+
 # --- COLORS ---
 COLOR_BG    = "#0E0E0E"
 COLOR_BASE  = "#f4f4f4"
@@ -0,0 +1,225 @@
+import io
+import os
+import sys
+import time
+import types
+import queue
+import runpy
+import inspect
+import threading
+import contextlib
+import numpy as np
+import config
+import robot_api
+from utils import normalize_angles
+from robot_api import SimXArmAPI, trapezoid
+
+# --- CYCLE TIME ESTIMATOR ---
+# Runs a script against a virtual-clock SimXArmAPI: every motion is solved and timed
+# exactly like in the simulator (Cartesian moves on the joint-limited timing law, joint
+# moves on the controller's trapezoidal profile), but the step generators are summed
+# instead of slept. Commands queue like on the controller: wait=False returns at once
+# and the next command starts when the queue is free. The script's time.sleep calls
+# advance the same clock.
+
+MOTION_COMMANDS = ("set_servo_angle", "set_position", "move_circle", "plan_servo_angle", "plan_position", "draw_file")
+MAX_VIRTUAL_S = 24 * 3600.0 # Scripts that loop forever are cut off here...
+MAX_WALL_S = 30.0 # ...or after this much real time
+SLOWEST = 5
+
+
+class _EstimatorContext:
+    def __init__(self):
+        self.log_queue = queue.Queue()
+        self.joint_queue = queue.Queue(maxsize=1)
+        self.stop_flag = False
+        self.paused = False
+
+
+def _scalar(limit):
+    return float(np.min(np.asarray(limit, dtype=float)))
+
+
+class EstimatorAPI(SimXArmAPI):
+    def __init__(self, chain, compiled, script_path):
+        super().__init__(_EstimatorContext(), chain, compiled)
+        self.script_path = os.path.abspath(script_path)
+        self.clock = 0.0 # Script time (s)
+        self.motion_end = 0.0 # When the controller's motion queue runs empty
+        self.sleep_total = 0.0
+        self.commands = []
+        self.truncated = False
+        self._elapsed = 0.0
+        self._wall_start = time.perf_counter()
+
+    # --- VIRTUAL CLOCK ---
+    def _run_blocking(self, steps):
+        try:
+            while True: self._elapsed += next(steps)
+        except StopIteration as done:
+            return done.value
+
+    def _sleep(self, seconds):
+        self.clock += max(0.0, float(seconds))
+        self.sleep_total += max(0.0, float(seconds))
+        self._check_budget()
+
+    def _check_budget(self):
+        if max(self.clock, self.motion_end) > MAX_VIRTUAL_S or time.perf_counter() - self._wall_start > MAX_WALL_S:
+            self.truncated = True
+            self.ctx.stop_flag = True
+            self._halt()
+
+    def _update_gui(self): pass
+
+    def _solve_ik_fallback(self, target_pos, target_orient, initial_rads):
+        return None # No process pool for an estimate
+
+    def _wait_plan_steps(self, future):
+        # Planning is not arm motion: wait for it without advancing the clock
+        future.result()
+        yield from ()
+
+    def _interpolated_move_steps(self, target_deg, duration):
+        # Controller joint profile: trapezoid over the largest joint change at the commanded speed
+        dist = max([abs(t - c) for t, c in zip(target_deg, self.joints_deg)] + [0.0])
+        v_max = _scalar(config.JOINT_SPEED_LIMIT)
+        speed = min(dist / duration, v_max) if duration > 0 else v_max
+        self.joints_deg = normalize_angles(list(target_deg))
+        yield trapezoid(dist, speed, _scalar(config.JOINT_ACC_LIMIT))[0]
+
+    def _script_line(self):
+        frame = sys._getframe(2)
+        while frame is not None:
+            if os.path.abspath(frame.f_code.co_filename) == self.script_path: return frame.f_lineno
+            frame = frame.f_back
+        return None
+
+
+def _timed(name):
+    # Motion command on the virtual clock: always solved to completion (wait=True) to get its
+    # duration, then queued with the script's own wait semantics
+    base = getattr(SimXArmAPI, name)
+    sig = inspect.signature(base)
+
+    def call(self, *args, **kwargs):
+        self._check_budget()
+        bound = sig.bind(self, *args, **kwargs)
+        if "wait" in sig.parameters:
+            wait = bound.arguments.get("wait", sig.parameters["wait"].default)
+            bound.arguments["wait"] = True
+        else:
+            extra = bound.arguments.get("kwargs", {})
+            wait = extra.pop("wait", True)
+            # Blended moves run in full either way, wait only decides whether the corner is left open
+            if (extra.get("radius") or 0) > 0: extra["wait"] = wait
+        self._elapsed = 0.0
+        result = base(*bound.args, **bound.kwargs)
+        start = max(self.clock, self.motion_end)
+        self.motion_end = start + self._elapsed
+        if wait: self.clock = self.motion_end
+        self.commands.append({"command": name, "line": self._script_line(), "start": start,
+                              "duration": self._elapsed, "wait": bool(wait)})
+        return result
+    call.__name__ = name
+    return call
+
+
+for _name in MOTION_COMMANDS: setattr(EstimatorAPI, _name, _timed(_name))
+
+
+def _script_print(buffer):
+    # print for the script's namespace: output goes to the estimate, not the GUI's stdout
+    def script_print(*args, **kwargs):
+        if kwargs.get("file") is None: kwargs["file"] = buffer
+        print(*args, **kwargs)
+    return script_print
+
+
+@contextlib.contextmanager
+def _script_environment(api):
+    # xarm shim returning the estimator, time.sleep on the virtual clock for this thread only.
+    # Everything is restored afterwards.
+    saved = {name: sys.modules.get(name) for name in ('xarm', 'xarm.wrapper')}
+    xarm_mod = types.ModuleType('xarm')
+    wrap_mod = types.ModuleType('xarm.wrapper')
+    wrap_mod.XArmAPI = lambda ip=None, **kwargs: api
+    xarm_mod.wrapper = wrap_mod
+    sys.modules['xarm'] = xarm_mod
+    sys.modules['xarm.wrapper'] = wrap_mod
+
+    real_sleep = time.sleep
+    me = threading.get_ident()
+
+    def sleep(seconds):
+        if threading.get_ident() == me: api._sleep(seconds)
+        else: real_sleep(seconds)
+    time.sleep = sleep
+    try:
+        yield
+    finally:
+        time.sleep = real_sleep
+        for name, mod in saved.items():
+            if mod is None: sys.modules.pop(name, None)
+            else: sys.modules[name] = mod
+
+
+def estimate_cycle_time(script_path, source_api):
+    # Estimate a script's cycle time starting from source_api's model, joints and tool.
+    # Returns {"total", "motion", "sleep", "commands", "slowest", "warnings", "error", "truncated",
+    # "output", "elapsed"}.
+    t0 = time.perf_counter()
+    live = robot_api.GLOBAL_API_INSTANCE
+    api = EstimatorAPI(source_api.chain, None, script_path)
+    robot_api.GLOBAL_API_INSTANCE = live # Scripts using the global keep talking to the GUI's arm
+    api.model = source_api.model
+    api.joints_deg = list(source_api.joints_deg)
+    api.last_rpy = list(source_api.last_rpy)
+    api.tool_offset = source_api.tool_offset
+    api.reach_map = source_api.reach_map
+    api.seed_index = source_api.seed_index
+
+    error = None
+    output = io.StringIO()
+    with _script_environment(api):
+        try: runpy.run_path(script_path, init_globals={"print": _script_print(output)}, run_name="__main__")
+        except SystemExit: pass
+        except Exception as e: error = f"{type(e).__name__}: {e}"
+    # A trailing blended move reaches its end point after the script: part of the last command
+    api._elapsed = 0.0
+    try: api._run_blocking(api._finish_blend_steps())
+    except SystemExit: pass
+    if api._elapsed > 0 and api.commands:
+        api.commands[-1]["duration"] += api._elapsed
+        api.motion_end += api._elapsed
+
+    warnings = []
+    while not api.ctx.log_queue.empty():
+        msg = api.ctx.log_queue.get()
+        if not msg.startswith("[MOVE]"): warnings.append(msg)
+    motion = sum(c["duration"] for c in api.commands)
+    return {
+        "total": max(api.clock, api.motion_end),
+        "motion": motion,
+        "sleep": api.sleep_total,
+        "commands": api.commands,
+        "slowest": sorted(api.commands, key=lambda c: -c["duration"])[:SLOWEST],
+        "warnings": warnings,
+        "error": error,
+        "truncated": api.truncated,
+        "output": output.getvalue(),
+        "elapsed": time.perf_counter() - t0,
+    }
+
+
+def format_report(result, script_name=""):
+    lines = [f"[CYCLE] {script_name}: {result['total']:.2f}s total, {result['motion']:.2f}s motion "
+             f"({len(result['commands'])} commands), {result['sleep']:.2f}s in time.sleep"]
+    for c in result["slowest"]:
+        where = f"line {c['line']}" if c["line"] else "?"
+        lines.append(f"[CYCLE]   {c['duration']:6.2f}s  {c['command']} ({where}, starts at {c['start']:.2f}s)")
+    if result["truncated"]: lines.append("[CYCLE] Script did not finish, estimate cut off")
+    if result["error"]: lines.append(f"[CYCLE] Script error: {result['error']}")
+    lines += [f"[CYCLE] {w}" for w in result["warnings"][:10]]
+    lines.append(f"[CYCLE] Estimated in {result['elapsed'] * 1000:.0f}ms")
+    return lines
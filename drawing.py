@@ -0,0 +1,474 @@
+import os
+import re
+import math
+import time
+import queue
+import threading
+import xml.etree.ElementTree as ET
+import numpy as np
+import config
+from utils import matrix_to_rpy
+
+# --- DRAWING IMPORT ---
+# Pen plotting from G-code or SVG files, as a streaming pipeline:
+#
+#   parse (strokes) -> map onto the drawing plane -> resample by arc length
+#       -> batched IK (seeded from the previous block) -> execute
+#
+# Everything up to IK runs in a producer thread that feeds a small bounded queue, so
+# the arm starts moving as soon as the first block is solved and memory stays flat
+# for drawings of any size.
+
+QUEUE_BLOCKS = 8 # Solved blocks buffered ahead of the arm
+FRAME_S = 1.0 / 60.0 # Sim: publish joints at most this often
+MAX_QUEUED_CMDS = 256 # Real arm: controller command buffer kept below this
+
+
+# --- GEOMETRY ---
+
+def resample(points, step):
+    # Polyline [k, D] -> points every 'step' along its arc length (end point kept)
+    points = np.asarray(points, dtype=float)
+    if len(points) < 2: return points
+    seg = np.linalg.norm(np.diff(points, axis=0), axis=1)
+    s = np.concatenate([[0.0], np.cumsum(seg)])
+    if s[-1] <= 0: return points[:1]
+    t = np.append(np.arange(0.0, s[-1], step), s[-1])
+    return np.stack([np.interp(t, s, points[:, d]) for d in range(points.shape[1])], axis=1)
+
+
+def arc_points(start, end, center, clockwise, step):
+    # 2D arc from start to end around center (start excluded); start == end is a full circle
+    r = math.hypot(start[0] - center[0], start[1] - center[1])
+    a0 = math.atan2(start[1] - center[1], start[0] - center[0])
+    a1 = math.atan2(end[1] - center[1], end[0] - center[0])
+    sweep = a1 - a0
+    if clockwise and sweep >= 0: sweep -= 2 * math.pi
+    if not clockwise and sweep <= 0: sweep += 2 * math.pi
+    n = max(2, int(math.ceil(abs(sweep) * r / max(step, 1e-6))))
+    a = a0 + sweep * np.arange(1, n + 1) / n
+    pts = np.stack([center[0] + r * np.cos(a), center[1] + r * np.sin(a)], axis=1)
+    pts[-1] = end
+    return pts
+
+
+def _bezier(ctrl, step):
+    ctrl = np.asarray(ctrl, dtype=float)
+    length = np.sum(np.linalg.norm(np.diff(ctrl, axis=0), axis=1))
+    t = np.linspace(0.0, 1.0, max(4, int(math.ceil(length / max(step, 1e-6)))) + 1)[1:, None]
+    if len(ctrl) == 3:
+        return (1 - t) ** 2 * ctrl[0] + 2 * (1 - t) * t * ctrl[1] + t ** 2 * ctrl[2]
+    return ((1 - t) ** 3 * ctrl[0] + 3 * (1 - t) ** 2 * t * ctrl[1] +
+            3 * (1 - t) * t ** 2 * ctrl[2] + t ** 3 * ctrl[3])
+
+
+def _svg_arc(p0, rx, ry, phi, large, sweep, p1, step):
+    # SVG endpoint arc -> points (W3C implementation notes F.6.5)
+    if rx == 0 or ry == 0: return np.array([p1])
+    rx, ry = abs(rx), abs(ry)
+    cp, sp = math.cos(math.radians(phi)), math.sin(math.radians(phi))
+    dx, dy = (p0[0] - p1[0]) / 2, (p0[1] - p1[1]) / 2
+    x1, y1 = cp * dx + sp * dy, -sp * dx + cp * dy
+    lam = x1 ** 2 / rx ** 2 + y1 ** 2 / ry ** 2
+    if lam > 1: rx, ry = rx * math.sqrt(lam), ry * math.sqrt(lam)
+    num = rx ** 2 * ry ** 2 - rx ** 2 * y1 ** 2 - ry ** 2 * x1 ** 2
+    coef = math.sqrt(max(num, 0) / (rx ** 2 * y1 ** 2 + ry ** 2 * x1 ** 2))
+    if large == sweep: coef = -coef
+    cx1, cy1 = coef * rx * y1 / ry, -coef * ry * x1 / rx
+    cx = cp * cx1 - sp * cy1 + (p0[0] + p1[0]) / 2
+    cy = sp * cx1 + cp * cy1 + (p0[1] + p1[1]) / 2
+    th0 = math.atan2((y1 - cy1) / ry, (x1 - cx1) / rx)
+    dth = math.atan2((-y1 - cy1) / ry, (-x1 - cx1) / rx) - th0
+    if sweep and dth < 0: dth += 2 * math.pi
+    if not sweep and dth > 0: dth -= 2 * math.pi
+    n = max(2, int(math.ceil(abs(dth) * max(rx, ry) / max(step, 1e-6))))
+    th = th0 + dth * np.arange(1, n + 1) / n
+    x = cx + rx * np.cos(th) * cp - ry * np.sin(th) * sp
+    y = cy + rx * np.cos(th) * sp + ry * np.sin(th) * cp
+    return np.stack([x, y], axis=1)
+
+
+# --- G-CODE ---
+_GCODE_WORD = re.compile(r'([A-Za-z])\s*([-+]?(?:\d+\.?\d*|\.\d+))')
+
+
+def gcode_strokes(lines, step=config.DRAWING_STEP):
+    # Pen-down polylines [k, 2] from G-code lines. G1/G2/G3 draw; G0, Z > 0 or M5 lift the pen.
+    x = y = 0.0
+    z = None
+    unit, absolute, motion, pen = 1.0, True, 0, True
+    stroke = []
+    for raw in lines:
+        line = re.sub(r'\(.*?\)', '', raw.split(';')[0])
+        words = _GCODE_WORD.findall(line)
+        if not words: continue
+        vals = {}
+        for letter, num in words:
+            letter, v = letter.upper(), float(num)
+            if letter == 'G':
+                if v in (0, 1, 2, 3): motion = int(v)
+                elif v == 20: unit = 25.4
+                elif v == 21: unit = 1.0
+                elif v == 90: absolute = True
+                elif v == 91: absolute = False
+            elif letter == 'M':
+                if v in (3, 4): pen = True
+                elif v == 5: pen = False
+            else:
+                vals[letter] = v * unit
+
+        if 'Z' in vals: z = vals['Z'] if absolute or z is None else z + vals['Z']
+        down = motion != 0 and pen and (z is None or z <= 0)
+        if not down and len(stroke) > 1: yield np.array(stroke)
+        if not down: stroke = []
+        if 'X' not in vals and 'Y' not in vals: continue
+
+        nx = vals.get('X', x if absolute else 0.0) + (0.0 if absolute else x)
+        ny = vals.get('Y', y if absolute else 0.0) + (0.0 if absolute else y)
+        if down:
+            if not stroke: stroke = [(x, y)]
+            if motion in (2, 3):
+                center = (x + vals.get('I', 0.0), y + vals.get('J', 0.0))
+                stroke.extend(map(tuple, arc_points((x, y), (nx, ny), center, motion == 2, step)))
+            else:
+                stroke.append((nx, ny))
+        x, y = nx, ny
+    if len(stroke) > 1: yield np.array(stroke)
+
+
+# --- SVG ---
+_SVG_TOKEN = re.compile(r'[MmLlHhVvCcSsQqTtAaZz]|[-+]?(?:\d*\.\d+|\d+\.?)(?:[eE][-+]?\d+)?')
+_SVG_ARGS = {'M': 2, 'L': 2, 'H': 1, 'V': 1, 'C': 6, 'S': 4, 'Q': 4, 'T': 2, 'A': 7, 'Z': 0}
+
+
+def _svg_transform(text):
+    M = np.eye(3)
+    for name, args in re.findall(r'(\w+)\s*\(([^)]*)\)', text or ""):
+        v = [float(a) for a in re.findall(r'[-+]?(?:\d*\.\d+|\d+\.?)(?:[eE][-+]?\d+)?', args)]
+        T = np.eye(3)
+        if name == 'matrix' and len(v) == 6: T[:2] = [[v[0], v[2], v[4]], [v[1], v[3], v[5]]]
+        elif name == 'translate': T[:2, 2] = [v[0], v[1] if len(v) > 1 else 0.0]
+        elif name == 'scale': T[0, 0], T[1, 1] = v[0], v[1] if len(v) > 1 else v[0]
+        elif name == 'rotate':
+            a = math.radians(v[0])
+            R = np.array([[math.cos(a), -math.sin(a), 0], [math.sin(a), math.cos(a), 0], [0, 0, 1]])
+            if len(v) == 3:
+                C = np.eye(3)
+                C[:2, 2] = v[1:]
+                R = C @ R @ np.linalg.inv(C)
+            T = R
+        M = M @ T
+    return M
+
+
+def svg_path_strokes(d, step):
+    # Subpaths of an SVG path 'd' attribute as polylines
+    tokens = _SVG_TOKEN.findall(d)
+    i, cmd = 0, None
+    cur = start = np.zeros(2)
+    last_ctrl = None
+    pts = []
+    while i < len(tokens):
+        if tokens[i].isalpha():
+            cmd = tokens[i]
+            i += 1
+            if cmd in 'Zz':
+                if len(pts) > 1:
+                    pts.append(start.copy())
+                    yield np.array(pts)
+                pts, cur, last_ctrl = [], start.copy(), None
+                continue
+        if cmd is None: break
+        n = _SVG_ARGS[cmd.upper()]
+        if i + n > len(tokens): break
+        v = [float(t) for t in tokens[i:i + n]]
+        i += n
+        rel = cmd.islower()
+        base = cur if rel else np.zeros(2)
+        c = cmd.upper()
+
+        if c == 'M':
+            if len(pts) > 1: yield np.array(pts)
+            cur = base + v[:2]
+            start, pts = cur.copy(), [cur.copy()]
+            cmd = 'l' if rel else 'L' # Further pairs are implicit lines
+            last_ctrl = None
+            continue
+        if not pts: pts = [cur.copy()]
+        if c == 'L': new = [base + v]
+        elif c == 'H': new = [np.array([v[0] + (cur[0] if rel else 0.0), cur[1]])]
+        elif c == 'V': new = [np.array([cur[0], v[0] + (cur[1] if rel else 0.0)])]
+        elif c in 'CS':
+            if c == 'C': c1, c2, end = base + v[0:2], base + v[2:4], base + v[4:6]
+            else:
+                c1 = 2 * cur - last_ctrl if last_ctrl is not None else cur.copy()
+                c2, end = base + v[0:2], base + v[2:4]
+            new = list(_bezier([cur, c1, c2, end], step))
+            last_ctrl = c2
+        elif c in 'QT':
+            if c == 'Q': c1, end = base + v[0:2], base + v[2:4]
+            else: c1, end = (2 * cur - last_ctrl if last_ctrl is not None else cur.copy()), base + v[0:2]
+            new = list(_bezier([cur, c1, end], step))
+            last_ctrl = c1
+        else: # A
+            end = base + v[5:7]
+            new = list(_svg_arc(cur, v[0], v[1], v[2], bool(v[3]), bool(v[4]), end, step))
+        if c not in 'CSQT': last_ctrl = None
+        pts.extend(new)
+        cur = np.array(new[-1], dtype=float)
+    if len(pts) > 1: yield np.array(pts)
+
+
+def _svg_shape_strokes(tag, a, step):
+    f = lambda k: float(a.get(k, 0) or 0)
+    if tag == 'path': yield from svg_path_strokes(a.get('d', ''), step)
+    elif tag == 'line': yield np.array([[f('x1'), f('y1')], [f('x2'), f('y2')]])
+    elif tag in ('polyline', 'polygon'):
+        v = [float(t) for t in _SVG_TOKEN.findall(a.get('points', '')) if not t.isalpha()]
+        pts = np.array(v[:len(v) // 2 * 2]).reshape(-1, 2)
+        if tag == 'polygon' and len(pts): pts = np.vstack([pts, pts[:1]])
+        if len(pts) > 1: yield pts
+    elif tag == 'rect':
+        x, y, w, h = f('x'), f('y'), f('width'), f('height')
+        yield np.array([[x, y], [x + w, y], [x + w, y + h], [x, y + h], [x, y]])
+    elif tag in ('circle', 'ellipse'):
+        rx = f('r') if tag == 'circle' else f('rx')
+        ry = f('r') if tag == 'circle' else f('ry')
+        n = max(12, int(math.ceil(2 * math.pi * max(rx, ry) / max(step, 1e-6))))
+        t = np.linspace(0.0, 2 * math.pi, n + 1)
+        yield np.stack([f('cx') + rx * np.cos(t), f('cy') + ry * np.sin(t)], axis=1)
+
+
+def svg_strokes(path, step=config.DRAWING_STEP):
+    # Streams the document: each shape is turned into strokes as soon as it is parsed.
+    # SVG's y axis points down; it is flipped so drawings are not mirrored on the plane.
+    stack = [np.eye(3)]
+    for event, el in ET.iterparse(path, events=("start", "end")):
+        tag = el.tag.rsplit('}', 1)[-1]
+        if event == "start":
+            stack.append(stack[-1] @ _svg_transform(el.attrib.get('transform')))
+            continue
+        M = stack.pop()
+        if tag in ('path', 'line', 'polyline', 'polygon', 'rect', 'circle', 'ellipse'):
+            for pts in _svg_shape_strokes(tag, el.attrib, step):
+                world = (np.hstack([pts, np.ones((len(pts), 1))]) @ M.T)[:, :2]
+                world[:, 1] *= -1
+                yield world
+        el.clear()
+
+
+def file_strokes(path, step=config.DRAWING_STEP):
+    if path.lower().endswith(".svg"): return svg_strokes(path, step)
+
+    def lines():
+        with open(path, "r", errors="ignore") as f:
+            for line in f: yield line
+    return gcode_strokes(lines(), step)
+
+
+# --- PLANE ---
+
+class DrawingPlane:
+    def __init__(self, origin=None, x_axis=None, y_axis=None, scale=None, pen_up=None, pen_length=None):
+        cfg = config.DRAWING_PLANE
+        self.origin = np.array(origin if origin is not None else cfg["origin"], dtype=float)
+        x = np.array(x_axis if x_axis is not None else cfg["x_axis"], dtype=float)
+        y = np.array(y_axis if y_axis is not None else cfg["y_axis"], dtype=float)
+        self.x = x / np.linalg.norm(x)
+        y = y - self.x * (y @ self.x)
+        self.y = y / np.linalg.norm(y)
+        self.normal = np.cross(self.x, self.y)
+        self.scale = float(scale if scale is not None else cfg["scale"])
+        self.pen_up = float(pen_up if pen_up is not None else cfg["pen_up"])
+        self.pen_length = pen_length if pen_length is not None else cfg.get("pen_length")
+        # Tool frame: z into the plane, x along the drawing's x axis
+        tool_z = -self.normal
+        self.orient = np.column_stack([self.x, np.cross(tool_z, self.x), tool_z])
+        self.rpy = matrix_to_rpy(self.orient)
+
+    def to_world(self, pts2d, lift=0.0):
+        # Drawing units -> robot mm, 'lift' mm above the plane
+        pts2d = np.asarray(pts2d, dtype=float) * self.scale
+        return self.origin + pts2d[:, :1] * self.x + pts2d[:, 1:2] * self.y + lift * self.normal
+
+
+def plan_segments(strokes, plane, step=config.DRAWING_STEP, travel_step=config.DRAWING_TRAVEL_STEP,
+                  speed=config.DRAWING_SPEED, travel_speed=config.DRAWING_TRAVEL_SPEED):
+    # Pen tip paths in mm as (points [k, 3], speed): lift, travel, lower, draw, ...
+    prev_up = None
+    for stroke in strokes:
+        draw = resample(plane.to_world(stroke), step)
+        if len(draw) < 2: continue
+        start_up = draw[0] + plane.pen_up * plane.normal
+        if prev_up is not None:
+            yield resample(np.array([prev_up, start_up]), travel_step)[1:], travel_speed
+        yield resample(np.array([start_up, draw[0]]), travel_step)[1:], travel_speed
+        yield draw[1:], speed
+        prev_up = draw[-1] + plane.pen_up * plane.normal
+        yield resample(np.array([draw[-1], prev_up]), travel_step)[1:], travel_speed
+
+
+# --- PIPELINE ---
+
+class DrawingJob:
+    def __init__(self, api, path, plane=None, speed=None):
+        self.api = api
+        self.path = path
+        self.plane = plane or DrawingPlane()
+        self.speed = speed or config.DRAWING_SPEED
+        pen = self.plane.pen_length
+        self.pen_length = float(pen) if pen is not None else api.tool_offset * 1000.0
+        self.queue = queue.Queue(maxsize=QUEUE_BLOCKS)
+        self.abort = threading.Event()
+        self.stats = {"points": 0, "unreachable": 0, "strokes": 0}
+        self._thread = None
+
+    def flange(self, tip_mm):
+        # Pen tip targets -> flange targets (pen along the tool z axis)
+        return np.asarray(tip_mm) - self.plane.orient[:, 2] * self.pen_length
+
+    def start(self):
+        self._thread = threading.Thread(target=self._produce, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.abort.set()
+        # Unblock a producer waiting on a full queue
+        try:
+            while True: self.queue.get_nowait()
+        except queue.Empty: pass
+
+    def _put(self, item):
+        while not self.abort.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except queue.Full: continue
+        return False
+
+    def _counted(self, strokes):
+        for stroke in strokes:
+            self.stats["strokes"] += 1
+            yield stroke
+
+    def _produce(self):
+        try:
+            block = config.PATH_IK_BLOCK
+            orient = self.plane.orient
+            segments = plan_segments(self._counted(file_strokes(self.path)), self.plane,
+                                     speed=self.speed)
+            seed = None
+            for points, speed in segments:
+                if seed is None:
+                    # Approach: a joint move to the first (lifted) point, then stream from there
+                    first = self.flange(points[0]) / 1000.0
+                    seed = self.api._solve_ik_jump(first, orient)
+                    if seed is None:
+                        self._put(("error", "First point of the drawing is unreachable"))
+                        return
+                    if not self._put(("approach", seed)): return
+                for s in range(0, len(points), block):
+                    if self.abort.is_set(): return
+                    tips = points[s:s + block]
+                    solutions = self.api._solve_ik_path(self.flange(tips) / 1000.0, orient, seed)
+                    last = next((q for q in reversed(solutions) if q is not None), None)
+                    if last is not None: seed = last
+                    if not self._put(("block", tips, solutions, speed)): return
+            self._put(("done", None))
+        except Exception as e:
+            self._put(("error", str(e)))
+
+    def messages(self):
+        # Generator of pipeline output; yields None while the next block is not ready
+        while True:
+            try: msg = self.queue.get_nowait()
+            except queue.Empty:
+                if self._thread is not None and not self._thread.is_alive() and self.queue.empty(): return
+                yield None
+                continue
+            yield msg
+            if msg[0] in ("done", "error"): return
+
+
+def draw_steps(api, path, plane=None, speed=None):
+    # Step generator (see SimXArmAPI COMMANDs) that streams a drawing file to the arm
+    if not os.path.exists(path):
+        api._log(f"[DRAW] File not found: {path}")
+        return -1
+    job = DrawingJob(api, path, plane, speed)
+    t0 = time.time()
+    api._log(f"[DRAW] Streaming {os.path.basename(path)}")
+    job.start()
+    roll, pitch, yaw = job.plane.rpy
+    eff = max(0.01, api.speed_multiplier) * config.SIM_SPEED_FACTOR
+    prev_tip = None
+    pending = 0.0
+    try:
+        for msg in job.messages():
+            yield from api._control_steps()
+            if msg is None:
+                yield 0.005
+                continue
+            kind = msg[0]
+            if kind == "error":
+                api._log(f"[DRAW] {msg[1]}")
+                return -2
+            if kind == "done": break
+            if kind == "approach":
+                api._log(f"[DRAW] First block ready in {(time.time() - t0) * 1000:.0f}ms")
+                api.last_rpy = [roll, pitch, yaw]
+                yield from api._servo_angle_steps(msg[1], speed=30)
+                continue
+
+            _, tips, solutions, speed = msg
+            flanges = job.flange(tips)
+            for tip, flange, joints in zip(tips, flanges, solutions):
+                job.stats["points"] += 1
+                if joints is None:
+                    job.stats["unreachable"] += 1
+                    continue
+                if api.is_connected:
+                    # Controller does the IK; keep its command buffer bounded
+                    yield from _throttle(api)
+                    api._note_command()
+                    api.real_arm.set_position(x=flange[0], y=flange[1], z=flange[2], roll=roll, pitch=pitch, yaw=yaw,
+                                              speed=speed, radius=config.DRAWING_BLEND_RADIUS, is_radian=False, wait=False)
+                    continue
+                dist = np.linalg.norm(tip - prev_tip) if prev_tip is not None else 0.0
+                prev_tip = tip
+                pending += dist / speed / eff
+                api.joints_deg = joints
+                if pending >= FRAME_S:
+                    api._update_gui()
+                    yield pending
+                    yield from api._control_steps()
+                    pending = 0.0
+        api._update_gui()
+        if api.is_connected: yield from _wait_idle(api)
+    finally:
+        job.stop()
+
+    s = job.stats
+    note = f", {s['unreachable']} unreachable" if s['unreachable'] else ""
+    api._log(f"[DRAW] Done: {s['strokes']} strokes, {s['points']} points{note} in {time.time() - t0:.1f}s")
+    return 0
+
+
+def _throttle(api):
+    get_cmdnum = getattr(api.real_arm, "get_cmdnum", None)
+    if get_cmdnum is None: return
+    while True:
+        code, n = get_cmdnum()
+        if code != 0 or n < MAX_QUEUED_CMDS: return
+        yield 0.05
+        yield from api._control_steps()
+
+
+def _wait_idle(api):
+    get_cmdnum = getattr(api.real_arm, "get_cmdnum", None)
+    if get_cmdnum is None: return
+    while True:
+        code, n = get_cmdnum()
+        if code != 0 or n == 0: return
+        yield 0.1
+        yield from api._control_steps()
@@ -0,0 +1,157 @@
+import numpy as np
+import config
+from kinematics import flagged_runs
+
+# --- INVERSE DYNAMICS ---
+# Recursive Newton-Euler on the compiled model, vectorized over samples: the forward
+# pass propagates link velocities / accelerations (gravity as a base acceleration) in
+# world coordinates from one batched FK, the backward pass sums link forces and moments
+# back down the chain and projects them on the joint axes. Link masses, COMs and inertia
+# tensors come from the URDF <inertial> tags; the tool and payload ride on the last frame.
+# No friction or motor inertia: the torques are what the links need, not motor currents.
+
+GRAVITY = np.array([0.0, 0.0, -9.81]) # m/s²
+
+
+def box_inertia(mass, dims):
+    # Solid box [dx, dy, dz] (m) about its center -> 3x3
+    dx, dy, dz = dims
+    return np.diag([dy * dy + dz * dz, dx * dx + dz * dz, dx * dx + dy * dy]) * mass / 12.0
+
+
+def combine(m1, c1, I1, m2, c2, I2):
+    # Two rigid bodies in the same frame -> (mass, COM, inertia about the combined COM)
+    m = m1 + m2
+    if m <= 0: return 0.0, np.zeros(3), np.zeros((3, 3))
+    c = (m1 * np.asarray(c1) + m2 * np.asarray(c2)) / m
+    shift = lambda mass, d: mass * (np.dot(d, d) * np.eye(3) - np.outer(d, d)) # Parallel axis
+    return m, c, np.asarray(I1) + shift(m1, np.asarray(c1) - c) + np.asarray(I2) + shift(m2, np.asarray(c2) - c)
+
+
+def _cross(a, b): return np.cross(a, b)
+
+
+class DynamicModel:
+    def __init__(self, model, masses, coms, inertias, effort_limits=None):
+        self.model = model
+        self.masses = np.asarray(masses, dtype=float) # [L] kg
+        self.coms = np.asarray(coms, dtype=float) # [L, 3] m, link frame
+        self.inertias = np.asarray(inertias, dtype=float) # [L, 3, 3] kg·m² about the COM, link frame
+        n = model.n_joints
+        limits = list(effort_limits or [])[:n] + [None] * max(0, n - len(effort_limits or []))
+        self.effort_limits = np.array([np.inf if l is None else float(l) for l in limits]) # [n] N·m
+
+    @classmethod
+    def from_compiled(cls, compiled, tool=None, payload=0.0, tool_offset=0.0):
+        # tool: (mass kg, COM [3] m, inertia about the COM) in the last frame, or None.
+        # payload: point mass (kg) at the tool tip, tool_offset (m) along the last frame's z
+        L = compiled.model.n_links
+        masses, coms, inertias = np.zeros(L), np.zeros((L, 3)), np.zeros((L, 3, 3))
+        for i, inertial in enumerate(compiled.inertials[:L]):
+            if not inertial: continue
+            masses[i], coms[i], inertias[i] = inertial["mass"], inertial["com"], inertial["inertia"]
+        extras = []
+        if tool is not None: extras.append(tool)
+        if payload > 0: extras.append((payload, [0.0, 0.0, tool_offset], np.zeros((3, 3))))
+        for mass, com, inertia in extras:
+            masses[-1], coms[-1], inertias[-1] = combine(masses[-1], coms[-1], inertias[-1], mass, com, inertia)
+        return cls(compiled.model, masses, coms, inertias, compiled.effort_limits)
+
+    def torques(self, q, qd, qdd, gravity=GRAVITY):
+        # q, qd, qdd [N, n] (rad, rad/s, rad/s²) -> joint torques [N, n] (N·m)
+        q, qd, qdd = (np.atleast_2d(np.asarray(a, dtype=float)) for a in (q, qd, qdd))
+        N, n = q.shape
+        model = self.model
+        frames = model.fk(q, full=True)
+        R, p = frames[:, :, :3, :3], frames[:, :, :3, 3]
+
+        # Forward pass: link 0 is the fixed base, accelerating upwards instead of gravity pulling down
+        w, dw = np.zeros((N, 3)), np.zeros((N, 3))
+        a = np.broadcast_to(-np.asarray(gravity, dtype=float), (N, 3)).copy()
+        F = np.zeros((N, model.n_links, 3)) # Net force on each link (at its COM)
+        M = np.zeros((N, model.n_links, 3)) # Net moment about each link's origin
+        r = np.einsum("nlij,lj->nli", R, self.coms) # COM offsets, world coordinates
+        z = np.zeros((N, model.n_links, 3))
+        j = 0
+        for i in range(1, model.n_links):
+            d = p[:, i] - p[:, i - 1]
+            a = a + _cross(dw, d) + _cross(w, _cross(w, d))
+            if model.active_mask[i]:
+                z[:, i] = R[:, i] @ model.axes[i]
+                wz = z[:, i] * qd[:, j, None]
+                dw = dw + z[:, i] * qdd[:, j, None] + _cross(w, wz)
+                w = w + wz
+                j += 1
+            if self.masses[i] <= 0: continue
+            ri = r[:, i]
+            ac = a + _cross(dw, ri) + _cross(w, _cross(w, ri))
+            Iw = R[:, i] @ self.inertias[i] @ R[:, i].transpose(0, 2, 1)
+            F[:, i] = self.masses[i] * ac
+            M[:, i] = np.einsum("nij,nj->ni", Iw, dw) + _cross(w, np.einsum("nij,nj->ni", Iw, w)) + _cross(ri, F[:, i])
+
+        # Backward pass: wrench of everything outboard, projected on each joint axis
+        tau = np.zeros((N, n))
+        f, m = np.zeros((N, 3)), np.zeros((N, 3))
+        j = n - 1
+        for i in range(model.n_links - 1, 0, -1):
+            if i + 1 < model.n_links: m = m + _cross(p[:, i + 1] - p[:, i], f)
+            m = m + M[:, i]
+            f = f + F[:, i]
+            if model.active_mask[i]:
+                tau[:, j] = np.einsum("ni,ni->n", m, z[:, i])
+                j -= 1
+        return tau
+
+    def gravity_torques(self, q):
+        q = np.atleast_2d(np.asarray(q, dtype=float))
+        return self.torques(q, np.zeros_like(q), np.zeros_like(q))
+
+    def trajectory(self, joints_deg, times, dt=None, smooth_s=None):
+        # Timed joint samples (deg, s) -> torques, power and energy over the whole run. The
+        # samples are resampled to a uniform grid and smoothed before differentiating twice.
+        dt = config.DYNAMICS_DT if dt is None else dt
+        smooth_s = config.DYNAMICS_SMOOTH_S if smooth_s is None else smooth_s
+        t_in = np.asarray(times, dtype=float)
+        q_in = np.radians(np.asarray(joints_deg, dtype=float))
+        keep = np.concatenate([[True], np.diff(t_in) > 1e-9]) # Samples published at the same instant
+        t_in, q_in = t_in[keep], np.unwrap(q_in[keep], axis=0)
+        if len(t_in) < 2: return None
+
+        t = np.arange(t_in[0], t_in[-1] + dt * 0.5, dt)
+        q = np.column_stack([np.interp(t, t_in, q_in[:, k]) for k in range(q_in.shape[1])])
+        q = _smooth(q, max(1, int(round(smooth_s / dt))))
+        qd = np.gradient(q, dt, axis=0)
+        qdd = np.gradient(qd, dt, axis=0)
+        tau = self.torques(q, qd, qdd)
+
+        power = tau * qd # W per joint; negative = the joint is braking
+        energy = np.sum(np.abs(power), axis=0) * dt # J per joint, no regeneration
+        limit = self.effort_limits * config.TORQUE_LIMIT_SCALE
+        over = np.abs(tau) > limit
+        violations = []
+        for k in range(tau.shape[1]):
+            for start, end in flagged_runs(over[:, k]):
+                violations.append({"joint": k, "start": float(t[start] - t[0]), "end": float(t[end] - t[0]),
+                                   "peak": float(np.max(np.abs(tau[start:end + 1, k]))), "limit": float(limit[k])})
+        return {"t": t - t[0], "torque": tau, "power": power, "over": over, "energy": energy,
+                "total_energy": float(energy.sum()), "peak": np.max(np.abs(tau), axis=0),
+                "violations": violations}
+
+
+def _smooth(x, window):
+    # Centered moving average along axis 0, edges held
+    if window <= 1 or len(x) < 3: return x
+    half = window // 2
+    padded = np.concatenate([np.repeat(x[:1], half, axis=0), x, np.repeat(x[-1:], half, axis=0)])
+    c = np.cumsum(np.concatenate([np.zeros((1,) + x.shape[1:]), padded]), axis=0)
+    w = 2 * half + 1
+    return (c[w:] - c[:-w]) / w
+
+
+def format_report(result):
+    peaks = " ".join(f"J{k + 1}={v:.1f}" for k, v in enumerate(result["peak"]))
+    lines = [f"[DYNAMICS] Energy {result['total_energy']:.1f} J over {result['t'][-1]:.1f}s, peak torque (N·m) {peaks}"]
+    for v in result["violations"][:10]:
+        lines.append(f"[DYNAMICS] J{v['joint'] + 1} over its torque limit at {v['start']:.2f}-{v['end']:.2f}s "
+                     f"(peak {v['peak']:.1f} / {v['limit']:.1f} N·m)")
+    return lines
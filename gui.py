@@ -23,7 +23,20 @@ from pathlib import Path
 from urllib.request import urlretrieve, urlopen
 from visualizer import RobotVisualizer
 from robot_api import SimXArmAPI
-from config import GLOBAL_API_INSTANCE, JOINT_COUNT, HISTORY_FILE, STL_HISTORY_FILE, ROBOT_SCAN_PORT, GITHUB_URL, PORTFOLIO_URL
+import planner
+from reachability import ReachabilityMap, LAYERS as REACH_LAYERS
+from seed_index import SeedIndex
+from model_cache import available_models
+from script_runner import ScriptProcess
+from cell import Cell
+from replay import TelemetryPlayer, MIN_SPEED, MAX_SPEED
+from telemetry import list_recordings, telemetry_dir
+from timeline import Timeline
+import cycle_time
+from dynamics import DynamicModel, format_report as dynamics_report
+import trajectory_io
+import compare
+from config import GLOBAL_API_INSTANCE, HISTORY_FILE, STL_HISTORY_FILE, ROBOT_SCAN_PORT, GITHUB_URL, PORTFOLIO_URL
 from utils import QueueRedirector, rpy_to_matrix
 
 # --- GUI CONTEXT ---
@@ -51,7 +64,7 @@ class ControlPanel(tk.Tk):
         except Exception as e:
             print(f"[SYSTEM] Could not load app icon: {e}")
         
-        self.title(f"{config.APP_NAME} {config.APP_VERSION} | UFACTORY Lite 6 Simulator | Controls")
+        self._set_title()
         screen_w = self.winfo_screenwidth()
         screen_h = self.winfo_screenheight()
         ctrl_w = 1000 
@@ -72,12 +85,22 @@ class ControlPanel(tk.Tk):
             self.destroy()
             return
             
+        self._set_title()
+
         # Init API
-        self.api = SimXArmAPI(self.ctx, self.ik_chain)
+        self.api = SimXArmAPI(self.ctx, self.ik_chain, self.viz.compiled)
+        self._load_kinematic_caches()
+        self.cell = Cell(self.api, self.viz.compiled, config.CELL_ROBOTS, self.ctx)
+        self.robot_threads = []
+        if len(self.cell) > 1:
+            self.viz.attach_cell(self.cell)
+            self.ctx.log_queue.put(f"[CELL] {len(self.cell)} robots: {', '.join(r.name for r in self.cell.robots)}")
         
         self.script_history = []
         self.stl_history = []
         self.current_script_path = None
+        self.script_process = None
+        self.player = None
 
         self.loop_var = tk.BooleanVar(value=False)
         self.speed_var = tk.DoubleVar(value=1.0)
@@ -108,6 +131,33 @@ class ControlPanel(tk.Tk):
         self._apply_modern_theme()
         self._update_calculated_fields([0.0] * config.JOINT_COUNT)
 
+    def _set_title(self):
+        self.title(f"{config.APP_NAME} {config.APP_VERSION} | UFACTORY {config.ACTIVE_MODEL} Simulator | Controls")
+
+    def _load_kinematic_caches(self):
+        model = self.api.model
+        self.api.reach_map = ReachabilityMap.load(model)
+        self.api.seed_index = SeedIndex.load(model)
+        self.api.start_ik_pool()
+        if self.api.reach_map is not None and self.api.seed_index is not None: return
+        limits = list(config.JOINT_LIMITS)
+
+        def build_worker():
+            # Results are dropped if the robot model was switched in the meantime
+            try:
+                if self.api.seed_index is None:
+                    index = SeedIndex.build(model, limits)
+                    if self.api.model is model: self.api.seed_index = index
+                if self.api.reach_map is None and self.api.model is model:
+                    self.ctx.log_queue.put("[REACH] No workspace map found. Building in background...")
+                    reach = ReachabilityMap.build(model, limits)
+                    if self.api.model is model: self.api.reach_map = reach
+                    self.ctx.log_queue.put("[REACH] Workspace map ready.")
+            except Exception as e:
+                self.ctx.log_queue.put(f"[REACH] Cache build failed: {e}")
+
+        threading.Thread(target=build_worker, daemon=True).start()
+
     def _load_history(self):
         self.script_history = []
 
@@ -183,7 +233,8 @@ class ControlPanel(tk.Tk):
             if is_collision:
                 self.was_colliding = True 
                 
-                if self.collision_alert_var.get():
+                # Replays and timeline scrubbing only show the collision; the recording itself is not interrupted
+                if self.collision_alert_var.get() and self.player is None and self.viz.scrub_frames is None:
                     self._handle_collision() 
                     return 
             
@@ -206,11 +257,17 @@ class ControlPanel(tk.Tk):
         self.is_handling_crash = True
         self.btn_run.config(state=tk.NORMAL)
         
-        self.ctx.log_queue.put("[ALERT] COLLISION DETECTED! Robot hit the floor.")
+        reason = self.viz.collision_reason or "floor"
+        if reason == "floor":
+            self.ctx.log_queue.put("[ALERT] COLLISION DETECTED! Robot hit the floor.")
+            detail = "The robot arm or end-effector hit the floor!"
+        else:
+            self.ctx.log_queue.put(f"[ALERT] COLLISION DETECTED! Between {reason[len('robots: '):]}.")
+            detail = f"Robot arms collided ({reason[len('robots: '):]})!"
         
         messagebox.showerror(
             "COLLISION DETECTED", 
-            "The robot arm or end-effector hit the floor!\n\nThe simulation has been paused.\nClick OK to reset the robot to Home position."
+            f"{detail}\n\nThe simulation has been paused.\nClick OK to reset the robot to Home position."
         )
         
         self.ctx.stop_flag = False 
@@ -242,12 +299,15 @@ class ControlPanel(tk.Tk):
             except queue.Empty: break
         
         if latest_joints:
+            # Any new pose (manual move, replay, robot) leaves timeline scrubbing
+            self._end_scrub()
             with self.data_lock:
                 self.viz.update_joints(latest_joints)
             
             is_running = (str(self.btn_run['state']) == 'disabled')
 
             for i, val in enumerate(latest_joints):
+                if i >= len(self.vars): break
                 self.vars[i].set(val)
                 
                 if hasattr(self, 'joint_entries') and i < len(self.joint_entries):
@@ -333,6 +393,7 @@ class ControlPanel(tk.Tk):
             self.rendering_paused = False
 
     def _force_trace_mode(self, mode_text):
+        self.api.tool_offset = self.viz.eef_offset_z if mode_text == "Effector Tip" else 0.0
         self.trace_mode_var.set(mode_text)
         self.viz.trace_source = mode_text.lower()
         self.viz.clear_trace()
@@ -470,6 +531,16 @@ class ControlPanel(tk.Tk):
         notebook.add(tab_manual, text="Manual")
         tab_manual.columnconfigure(0, weight=1)
         
+        # Robot Model
+        model_frame = ttk.LabelFrame(tab_manual, text="Robot Model", padding=10)
+        model_frame.pack(fill=tk.X, pady=5, padx=5)
+
+        self.model_var = tk.StringVar(value=config.ACTIVE_MODEL)
+        self.combo_model = ttk.Combobox(model_frame, textvariable=self.model_var,
+                                        values=list(available_models()), state="readonly")
+        self.combo_model.pack(fill=tk.X, padx=5)
+        self.combo_model.bind("<<ComboboxSelected>>", self._on_model_select)
+
         # Cartesian Control
         xyz_frame = ttk.LabelFrame(tab_manual, text="Cartesian Control", padding=10)
         xyz_frame.pack(fill=tk.X, pady=5, padx=5)
@@ -499,49 +570,12 @@ class ControlPanel(tk.Tk):
             self.xyz_entries.append(ent)
         
         # Joint Control
-        joint_frame = ttk.LabelFrame(tab_manual, text="Manual Joint Control", padding=10)
-        joint_frame.pack(fill=tk.BOTH, expand=True, pady=5, padx=5)
+        self.joint_frame = ttk.LabelFrame(tab_manual, text="Manual Joint Control", padding=10)
+        self.joint_frame.pack(fill=tk.BOTH, expand=True, pady=5, padx=5)
         
-        joint_frame.columnconfigure(0, weight=1)
-        joint_frame.columnconfigure(1, weight=1)
-        
-        self.vars = []
-        self.joint_entries = []
-        self.joint_sliders = []
-        
-        for i in range(config.JOINT_COUNT):
-            row = i // 2
-            col = i % 2  
-            
-            joint_col = ttk.Frame(joint_frame)
-            joint_col.grid(row=row, column=col, sticky="ew", padx=5, pady=5)
-            joint_col.columnconfigure(0, weight=1)
-            
-            # Label and entry
-            header = ttk.Frame(joint_col)
-            header.pack(fill=tk.X)
-            ttk.Label(header, text=f"Joint {i+1}").pack(side=tk.LEFT)
-            ent = ttk.Entry(header, width=6, justify="right")
-            ent.pack(side=tk.RIGHT)
-            ent.insert(0, "0.0")
-            ent.bind("<Return>", lambda event, idx=i: self._on_entry_submit(idx))
-            ent.bind("<FocusOut>", lambda event, idx=i: self._on_entry_submit(idx))
-            self.joint_entries.append(ent)
-
-            # Slider
-            v = tk.DoubleVar()
-            self.vars.append(v)
-            min_lim, max_lim = config.JOINT_LIMITS[i]
-            
-            s = ttk.Scale(joint_col, from_=min_lim, to=max_lim, variable=v, 
-                      command=lambda val, idx=i: self._slider_cb(idx, val))
-            s.pack(fill=tk.X, pady=(5, 0))
-            
-            self.joint_sliders.append(s)
-
-        # Reset to Home button
-        self.btn_reset = ttk.Button(joint_frame, text="Reset to Home", command=self._home)
-        self.btn_reset.grid(row=3, column=0, columnspan=2, sticky="ew", padx=5, pady=(10, 0))
+        self.joint_frame.columnconfigure(0, weight=1)
+        self.joint_frame.columnconfigure(1, weight=1)
+        self._build_joint_controls()
 
 
         # ========== TAB 2: SCRIPT LOADING ==========
@@ -597,6 +631,79 @@ class ControlPanel(tk.Tk):
         self.btn_stop = ttk.Button(cf, text="⏹ Stop", command=self._stop_script, state=tk.DISABLED)
         self.btn_stop.grid(row=0, column=3, sticky="ew", padx=5, pady=10)
 
+        self.btn_cycle = ttk.Button(cf, text="⏱ Estimate Cycle Time", command=self._estimate_cycle_time)
+        self.btn_cycle.grid(row=1, column=0, columnspan=4, sticky="ew", padx=5)
+
+        # Run Timeline (scrub the last run)
+        tf = ttk.LabelFrame(tab_script, text="Run Timeline", padding=10)
+        tf.pack(fill=tk.X, pady=5, padx=5)
+        self.timeline_var = tk.DoubleVar(value=0.0)
+        self.timeline_scale = ttk.Scale(tf, from_=0.0, to=1.0, variable=self.timeline_var, command=self._timeline_cb)
+        self.timeline_scale.pack(fill=tk.X, pady=5)
+        self.timeline_scale.state(["disabled"])
+        tl_row = ttk.Frame(tf)
+        tl_row.pack(fill=tk.X)
+        self.timeline_lbl = ttk.Label(tl_row, text="Run a script to record its timeline")
+        self.timeline_lbl.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.link_frames_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(tl_row, text="Link frames", variable=self.link_frames_var,
+                        command=lambda: self.viz.set_link_frames(self.link_frames_var.get())).pack(side=tk.LEFT, padx=5)
+        self.btn_timeline_live = ttk.Button(tl_row, text="Live", command=self._timeline_live, state=tk.DISABLED)
+        self.btn_timeline_live.pack(side=tk.LEFT)
+        self.btn_timeline_export = ttk.Button(tl_row, text="Export...", command=self._export_timeline, state=tk.DISABLED)
+        self.btn_timeline_export.pack(side=tk.LEFT, padx=(5, 0))
+        self.timeline = None
+
+        # ========== TAB: TELEMETRY REPLAY ==========
+        tab_replay = ttk.Frame(notebook)
+        notebook.add(tab_replay, text="Replay")
+        tab_replay.columnconfigure(0, weight=1)
+
+        rf = ttk.LabelFrame(tab_replay, text="Recording", padding=10)
+        rf.pack(fill=tk.X, pady=5, padx=5)
+        rf_inner = ttk.Frame(rf)
+        rf_inner.pack(fill=tk.X, pady=5)
+        self.combo_recordings = ttk.Combobox(rf_inner, state="readonly", postcommand=self._refresh_recordings)
+        self.combo_recordings.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 5))
+        self.combo_recordings.bind("<<ComboboxSelected>>", lambda e: self._open_recording(self.combo_recordings.get()))
+        ttk.Button(rf_inner, text="Open folder...", command=self._browse_recording).pack(side=tk.LEFT)
+        self.btn_replay_export = ttk.Button(rf_inner, text="Export...", command=self._export_recording, state=tk.DISABLED)
+        self.btn_replay_export.pack(side=tk.LEFT, padx=(5, 0))
+        self.btn_replay_compare = ttk.Button(rf_inner, text="Compare with run", command=self._compare_recording, state=tk.DISABLED)
+        self.btn_replay_compare.pack(side=tk.LEFT, padx=(5, 0))
+        self.replay_info_lbl = ttk.Label(rf, text="No recording loaded")
+        self.replay_info_lbl.pack(anchor="w", pady=(5, 0))
+
+        pf = ttk.LabelFrame(tab_replay, text="Playback", padding=10)
+        pf.pack(fill=tk.X, pady=5, padx=5)
+        pf.columnconfigure(0, weight=1)
+        pf.columnconfigure(1, weight=1)
+
+        self.btn_replay_play = ttk.Button(pf, text="▶ Play", command=self._toggle_replay, state=tk.DISABLED)
+        self.btn_replay_play.grid(row=0, column=0, sticky="ew", padx=5, pady=10)
+        self.btn_replay_stop = ttk.Button(pf, text="⏹ Close", command=self._close_replay, state=tk.DISABLED)
+        self.btn_replay_stop.grid(row=0, column=1, sticky="ew", padx=5, pady=10)
+
+        speed_row = ttk.Frame(pf)
+        speed_row.grid(row=1, column=0, columnspan=2, sticky="ew")
+        ttk.Label(speed_row, text="Speed:").pack(side=tk.LEFT, padx=5)
+        # Logarithmic slider: 10^0 .. 10^2 = 1x .. 100x
+        self.replay_speed_var = tk.DoubleVar(value=0.0)
+        ttk.Scale(speed_row, from_=math.log10(MIN_SPEED), to=math.log10(MAX_SPEED), variable=self.replay_speed_var,
+                  command=self._replay_speed_cb).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        self.replay_speed_lbl = ttk.Label(speed_row, text="1x", width=5)
+        self.replay_speed_lbl.pack(side=tk.LEFT)
+
+        seek_row = ttk.Frame(pf)
+        seek_row.grid(row=2, column=0, columnspan=2, sticky="ew", pady=(10, 0))
+        self.replay_pos_var = tk.DoubleVar(value=0.0)
+        self.replay_seek = ttk.Scale(seek_row, from_=0.0, to=1.0, variable=self.replay_pos_var, command=self._replay_seek_cb)
+        self.replay_seek.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        self.replay_time_lbl = ttk.Label(seek_row, text="00:00:00 / 00:00:00")
+        self.replay_time_lbl.pack(side=tk.LEFT)
+        self._replay_syncing = False
+        self._replay_ui_job = None
+
         # ========== TAB 3: CAMERA CONTROLS ==========
         tab_camera = ttk.Frame(notebook)
         notebook.add(tab_camera, text="Camera")
@@ -690,6 +797,10 @@ class ControlPanel(tk.Tk):
         self.trace_combo.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
         self.trace_combo.bind("<<ComboboxSelected>>", change_trace_source)
 
+        self.trace_manip_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(trace_row, text="Singularity colors", variable=self.trace_manip_var,
+                        command=lambda: self.viz.set_trace_manip(self.trace_manip_var.get())).pack(side=tk.LEFT, padx=5)
+
         # Ghost Mode & Visibility
         visibility_row = ttk.LabelFrame(tab_visibility, text="Display Modes", padding=10)
         visibility_row.pack(fill=tk.X, pady=5, padx=5)
@@ -722,6 +833,32 @@ class ControlPanel(tk.Tk):
         ttk.Checkbutton(visibility_row, text="Collision Alerts", 
                         variable=self.collision_alert_var).pack(anchor="w", padx=5, pady=5)
 
+        # Reachability Heat Map
+        reach_row = ttk.LabelFrame(tab_visibility, text="Workspace Reachability", padding=10)
+        reach_row.pack(fill=tk.X, pady=5, padx=5)
+
+        self.reach_var = tk.BooleanVar(value=False)
+        self.reach_layer_var = tk.StringVar(value="down")
+
+        def update_reach_map(event=None):
+            if not self.reach_var.get():
+                self.viz.hide_reachability()
+                return
+            if self.api.reach_map is None:
+                self.ctx.log_queue.put("[REACH] Workspace map is still being built.")
+                self.reach_var.set(False)
+                return
+            layer = self.api.reach_map.layer_names.index(self.reach_layer_var.get())
+            self.viz.show_reachability(self.api.reach_map, layer)
+
+        ttk.Checkbutton(reach_row, text="Heat Map", variable=self.reach_var,
+                        command=update_reach_map).pack(side=tk.LEFT, padx=5)
+
+        reach_combo = ttk.Combobox(reach_row, textvariable=self.reach_layer_var,
+                                   values=[name for name, _ in REACH_LAYERS], state="readonly", width=15)
+        reach_combo.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
+        reach_combo.bind("<<ComboboxSelected>>", update_reach_map)
+
         # ========== TAB 5: COLOR SETTINGS ==========
         tab_color = ttk.Frame(notebook)
         notebook.add(tab_color, text="Color")
@@ -802,6 +939,86 @@ class ControlPanel(tk.Tk):
         # Quit button
         ttk.Button(left_col, text="Quit to Desktop", command=self._on_close).grid(row=2, column=0, sticky="ew", pady=(5, 0))
 
+    def _build_joint_controls(self):
+        # One slider per joint of the active model; rebuilt on a model switch
+        joint_frame = self.joint_frame
+        for child in joint_frame.winfo_children(): child.destroy()
+
+        self.vars = []
+        self.joint_entries = []
+        self.joint_sliders = []
+        
+        for i in range(config.JOINT_COUNT):
+            row = i // 2
+            col = i % 2  
+            
+            joint_col = ttk.Frame(joint_frame)
+            joint_col.grid(row=row, column=col, sticky="ew", padx=5, pady=5)
+            joint_col.columnconfigure(0, weight=1)
+            
+            # Label and entry
+            header = ttk.Frame(joint_col)
+            header.pack(fill=tk.X)
+            ttk.Label(header, text=f"Joint {i+1}").pack(side=tk.LEFT)
+            ent = ttk.Entry(header, width=6, justify="right")
+            ent.pack(side=tk.RIGHT)
+            ent.insert(0, "0.0")
+            ent.bind("<Return>", lambda event, idx=i: self._on_entry_submit(idx))
+            ent.bind("<FocusOut>", lambda event, idx=i: self._on_entry_submit(idx))
+            self.joint_entries.append(ent)
+
+            # Slider
+            v = tk.DoubleVar()
+            self.vars.append(v)
+            min_lim, max_lim = config.JOINT_LIMITS[i]
+            
+            s = ttk.Scale(joint_col, from_=min_lim, to=max_lim, variable=v, 
+                      command=lambda val, idx=i: self._slider_cb(idx, val))
+            s.pack(fill=tk.X, pady=(5, 0))
+            
+            self.joint_sliders.append(s)
+
+        # Reset to Home button
+        self.btn_reset = ttk.Button(joint_frame, text="Reset to Home", command=self._home)
+        self.btn_reset.grid(row=(config.JOINT_COUNT + 1) // 2, column=0, columnspan=2, sticky="ew", padx=5, pady=(10, 0))
+
+    def _on_model_select(self, event=None):
+        name = self.model_var.get()
+        if name == config.ACTIVE_MODEL: return
+        if self.api.is_connected or str(self.btn_run['state']) == 'disabled':
+            messagebox.showwarning("Model locked", "Disconnect and stop the running script before switching robot model.")
+            self.model_var.set(config.ACTIVE_MODEL)
+            return
+
+        t0 = time.time()
+        self.rendering_paused = True
+        try:
+            with self.data_lock:
+                chain = self.viz.switch_model(name)
+            if chain is None:
+                messagebox.showerror("Error", f"Could not load robot model '{name}'.")
+                self.model_var.set(config.ACTIVE_MODEL)
+                return
+
+            self.ik_chain = chain
+            self.api.set_model(chain, self.viz.compiled)
+            self._load_kinematic_caches()
+            self.cell.set_model(chain, self.viz.compiled)
+            if len(self.cell) > 1: self.viz.attach_cell(self.cell)
+            self._build_joint_controls()
+            self._set_title()
+
+            # Re-apply user colors to the new actors
+            for key in ("arm", "wrist", "eef"):
+                if key in self.color_vars: self.viz.set_color(key, self.color_vars[key].get())
+            if self.reach_var.get():
+                self.reach_var.set(False)
+
+            self._update_calculated_fields([0.0] * config.JOINT_COUNT)
+            self.ctx.log_queue.put(f"[GUI] Robot model: {name} ({config.JOINT_COUNT} joints) loaded in {(time.time() - t0) * 1000:.0f}ms")
+        finally:
+            self.rendering_paused = False
+
     def _speed_cb(self, val):
         v = float(val)
         self.speed_lbl.config(text=f"{v:.1f}x")
@@ -875,10 +1092,11 @@ class ControlPanel(tk.Tk):
     def _home(self):
         self.ctx.log_queue.put("[GUI] Going home...")
         self.viz.clear_trace()
-        self.api.joints_deg = [0.0] * JOINT_COUNT
-        self.ctx.joint_queue.put([0.0]*JOINT_COUNT)
+        self.api.joints_deg = [0.0] * config.JOINT_COUNT
+        self.cell.home()
+        self.ctx.joint_queue.put([0.0]*config.JOINT_COUNT)
         if self.api.real_arm:
-            self.api.set_servo_angle([0]*6, speed=30, wait=False)
+            self.api.set_servo_angle([0]*config.JOINT_COUNT, speed=30, wait=False)
 
     def _reset_view(self):
         if self.viz: self.viz.reset_camera_view()
@@ -932,6 +1150,8 @@ class ControlPanel(tk.Tk):
         config_state = tk.DISABLED if running else tk.NORMAL
         combo_state = "disabled" if running else "readonly"
         self.ent_ip.config(state=config_state) # IP field
+        if hasattr(self, 'combo_model'):
+            self.combo_model.config(state=combo_state)
         self.btn_load_script.config(state=config_state) # Script load button
         self.speed_scale.config(state=config_state) # Speed slider
         # Script dropdown
@@ -992,18 +1212,59 @@ class ControlPanel(tk.Tk):
 
     def _run_current_script(self):
         if not self.current_script_path: return
+        self._close_replay()
+        self._end_scrub()
+        self.timeline = None
+        self.timeline_scale.state(["disabled"])
+        self.api.timeline = Timeline()
         self.viz.clear_trace()
         self.ctx.stop_flag = False
         self.ctx.paused = False
         self.btn_pause.config(text="⏸ Pause")
         self._toggle_controls(True)
         
+        # The isolated runner drives a single arm; cells run their scripts as threads
+        if config.SCRIPT_ISOLATION and len(self.cell) == 1:
+            threading.Thread(target=self._run_script_process, args=(self.current_script_path,), daemon=True).start()
+            return
+
+        self._install_xarm_shim()
+        self.cell.reset_claims()
+        self.robot_threads = []
+        for robot in self.cell.robots[1:]:
+            if not robot.script: continue
+            t = threading.Thread(target=self._run_robot_script, args=(robot,), daemon=True)
+            t.start()
+            self.robot_threads.append(t)
         threading.Thread(target=self._run_script_thread, args=(self.current_script_path,), daemon=True).start()
 
+    def _estimate_cycle_time(self):
+        # Runs the script on a virtual clock; not while it (or another estimate) is running for real
+        if not self.current_script_path or str(self.btn_run['state']) == 'disabled': return
+        self.btn_cycle.config(state=tk.DISABLED)
+        self.btn_run.config(state=tk.DISABLED) # The estimate swaps in its own xarm module and time.sleep
+        path = self.current_script_path
+        self.ctx.log_queue.put(f"[CYCLE] Estimating {os.path.basename(path)}...")
+
+        def worker():
+            try:
+                result = cycle_time.estimate_cycle_time(path, self.api)
+                for line in cycle_time.format_report(result, os.path.basename(path)): self.ctx.log_queue.put(line)
+            except Exception as e:
+                self.ctx.log_queue.put(f"[CYCLE] Estimate failed: {e}")
+            finally:
+                self.after(0, self._estimate_finished)
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _estimate_finished(self):
+        self.btn_cycle.config(state=tk.NORMAL)
+        if self.current_script_path and self.player is None: self.btn_run.config(state=tk.NORMAL)
+
     def _on_script_finished(self):
         if self.is_handling_crash:
             return
         self._toggle_controls(False)
+        self._compile_timeline()
         
         was_stopped_manually = self.ctx.stop_flag
         
@@ -1104,6 +1365,7 @@ class ControlPanel(tk.Tk):
                     messagebox.showwarning("Invalid IP", "IP Address contains invalid characters.\nOnly numbers (0-9) and dots (.) are allowed.")
                     return
 
+            self._close_replay()
             self.btn_connect.config(state=tk.DISABLED, text="Connecting...")
             self.ent_ip.config(state=tk.DISABLED)
             self._set_status_color("#ffb86c") # Orange
@@ -1184,40 +1446,272 @@ class ControlPanel(tk.Tk):
                 sock.close()
         self.after(0, lambda: self._scan_complete(found_ips))
 
-    def _run_script_thread(self, path):
+    def _install_xarm_shim(self):
         if 'xarm' in sys.modules: del sys.modules['xarm']
         if 'xarm.wrapper' in sys.modules: del sys.modules['xarm.wrapper']
         xarm_mod = types.ModuleType('xarm')
         wrap_mod = types.ModuleType('xarm.wrapper')
 
-        live_api_instance = self.api 
+        live_cell = self.cell
 
-        def API_Factory(ip, **kwargs): 
-            return live_api_instance
+        def API_Factory(ip=None, **kwargs): 
+            return live_cell.api_for(ip)
         
         wrap_mod.XArmAPI = API_Factory
         xarm_mod.wrapper = wrap_mod
         sys.modules['xarm'] = xarm_mod
         sys.modules['xarm.wrapper'] = wrap_mod
-        
+
+    def _run_robot_script(self, robot):
+        self.cell.bind_thread(robot)
+        robot.ctx.log_queue.put(f"--- Start: {os.path.basename(robot.script)} ---")
+        try:
+            runpy.run_path(robot.script, run_name="__main__")
+            # A trailing blended move (radius > 0) still has to reach its end point
+            robot.api._run_blocking(robot.api._finish_blend_steps())
+        except SystemExit as e:
+            robot.ctx.log_queue.put(f"--- {e} ---")
+        except Exception as e:
+            robot.ctx.log_queue.put(f"Error: {e}")
+            traceback.print_exc()
+
+    def _run_script_thread(self, path):
         self.ctx.log_queue.put(f"--- Start: {os.path.basename(path)} ---")
         try:
             runpy.run_path(path, run_name="__main__")
+            # Same for the arms without a script of their own (those finish in their thread)
+            for robot in self.cell.robots:
+                if robot is self.cell.primary or not robot.script:
+                    robot.api._run_blocking(robot.api._finish_blend_steps())
         except SystemExit as e:
             self.ctx.log_queue.put(f"--- {e} ---")
         except Exception as e:
             self.ctx.log_queue.put(f"Error: {e}")
             traceback.print_exc()
         finally:
+            for t in self.robot_threads: t.join()
             self.ctx.log_queue.put("--- Done ---")
             self.after(100, self._on_script_finished)
 
+    def _run_script_process(self, path):
+        self.ctx.log_queue.put(f"--- Start: {os.path.basename(path)} ---")
+        try:
+            self.script_process = ScriptProcess(self.ctx, self.api, path, self.viz.get_urdf_path(config.ACTIVE_MODEL))
+            self.script_process.run()
+        except Exception as e:
+            self.ctx.log_queue.put(f"Error: {e}")
+            traceback.print_exc()
+        finally:
+            self.script_process = None
+            self.ctx.log_queue.put("--- Done ---")
+            self.after(100, self._on_script_finished)
+
+    # RUN TIMELINE
+    def _compile_timeline(self):
+        timeline, self.api.timeline = self.api.timeline, None
+        if timeline is None or len(timeline) < 2: return
+        boxes = [(np.array(lo) / 1000.0, np.array(hi) / 1000.0) for lo, hi in config.SCENE_OBSTACLES]
+        t0 = time.time()
+        timeline.compile(self.api.model, self.viz.eef_offset_z, config.ROBOT_Z_OFFSET, boxes)
+        self.timeline = timeline
+        self.timeline_scale.config(to=max(timeline.duration, 0.001))
+        self.timeline_var.set(timeline.duration)
+        self.timeline_scale.state(["!disabled"])
+        self.timeline_lbl.config(text=f"{len(timeline):,} samples | {timeline.duration:.1f}s")
+        self.btn_timeline_export.config(state=tk.NORMAL)
+        note = " (truncated)" if timeline.truncated else ""
+        self.ctx.log_queue.put(f"[TIMELINE] {len(timeline)} samples cached in {(time.time() - t0) * 1000:.0f}ms "
+                               f"({timeline.frames.nbytes / 1e6:.1f} MB){note}")
+        if config.DYNAMICS_CHECK: self._report_dynamics(timeline)
+
+    def _report_dynamics(self, timeline):
+        # Joint torques and energy of the run, loaded tool and payload included
+        try:
+            dyn = DynamicModel.from_compiled(self.viz.compiled, tool=self.viz.eef_mass_properties(),
+                                             payload=config.PAYLOAD_MASS, tool_offset=self.viz.eef_offset_z)
+            timeline.dynamics = dyn.trajectory(timeline.joints, timeline.t)
+            if timeline.dynamics is None: return
+            for line in dynamics_report(timeline.dynamics): self.ctx.log_queue.put(line)
+        except Exception as e:
+            self.ctx.log_queue.put(f"[DYNAMICS] Torque estimate failed: {e}")
+
+    def _timeline_cb(self, val):
+        if self.timeline is None or str(self.btn_pause['state']) == 'normal': return
+        i = self.timeline.index_at(float(val))
+        self.viz.show_scrub_frame(self.timeline.matrices(i), self.timeline.collision[i])
+        x, y, z, roll, pitch, yaw = self.timeline.tool_pose(i)
+        text = f"{self.timeline.t[i]:.2f}s | X {x:.0f} Y {y:.0f} Z {z:.0f} | R {roll:.0f} P {pitch:.0f} Y {yaw:.0f}"
+        if self.timeline.collision[i]: text += " | COLLISION"
+        self.timeline_lbl.config(text=text)
+        self.btn_timeline_live.config(state=tk.NORMAL)
+
+    def _end_scrub(self):
+        if self.viz.scrub_frames is None: return
+        self.viz.end_scrub()
+        self.btn_timeline_live.config(state=tk.DISABLED)
+
+    def _timeline_live(self):
+        self._end_scrub()
+        self.api._update_gui()
+
+    # TELEMETRY REPLAY
+    def _refresh_recordings(self):
+        self.combo_recordings['values'] = [os.path.basename(p) for p in reversed(list_recordings())]
+
+    # --- TRAJECTORY EXPORT ---
+    def _ask_export_path(self, default_name):
+        types = [("NumPy array (memory-mappable)", "*.npy")]
+        if trajectory_io.HAS_ARROW: types.append(("Parquet", "*.parquet"))
+        return filedialog.asksaveasfilename(title="Export trajectory", defaultextension=".npy",
+                                            initialfile=default_name, filetypes=types)
+
+    def _export_timeline(self):
+        if self.timeline is None: return
+        path = self._ask_export_path("run.npy")
+        if not path: return
+        info = {"model": config.ACTIVE_MODEL, "script": os.path.basename(self.current_script_path or ""),
+                "tool_offset": self.viz.eef_offset_z}
+        self._run_export(lambda: trajectory_io.export_timeline(self.timeline, path, info), path)
+
+    def _export_recording(self):
+        if self.player is None: return
+        reader = self.player.reader
+        path = self._ask_export_path(os.path.basename(reader.directory) + ".npy")
+        if not path: return
+        self._run_export(lambda: trajectory_io.export_recording(reader, path), path)
+
+    def _compare_recording(self):
+        # Loaded recording vs the last simulated run (the same script, run in the simulator)
+        if self.player is None: return
+        if self.timeline is None or not self.timeline.compiled:
+            self.ctx.log_queue.put("[COMPARE] Run the script in the simulator first, then compare.")
+            return
+        reader, timeline = self.player.reader, self.timeline
+
+        def worker():
+            try:
+                sim = trajectory_io.timeline_rows(timeline)
+                real = trajectory_io.telemetry_rows(reader.rows(0, len(reader)), reader.t_start)
+                result = compare.compare(sim, real, reader.info.get("joint_count", config.JOINT_COUNT))
+                for line in compare.format_report(result): self.ctx.log_queue.put(line)
+            except Exception as e:
+                self.ctx.log_queue.put(f"[COMPARE] Failed: {e}")
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _run_export(self, job, path):
+        # Recordings can be millions of samples: write in the background
+        def worker():
+            t0 = time.time()
+            try:
+                n = job()
+                self.ctx.log_queue.put(f"[EXPORT] {n:,} samples written to {os.path.basename(path)} "
+                                       f"in {(time.time() - t0) * 1000:.0f}ms")
+            except Exception as e:
+                self.ctx.log_queue.put(f"[EXPORT] Failed: {e}")
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _browse_recording(self):
+        path = filedialog.askdirectory(title="Select telemetry recording")
+        if path: self._open_recording(path)
+
+    def _open_recording(self, name):
+        if not name: return
+        if self.api.is_connected or str(self.btn_pause['state']) == 'normal':
+            messagebox.showwarning("Replay", "Disconnect the robot and stop the script before replaying.")
+            return
+        path = name if os.path.isdir(name) else os.path.join(telemetry_dir(), name)
+        try:
+            player = TelemetryPlayer(path, self.ctx, on_finished=lambda: self.after(0, self._on_replay_finished))
+        except Exception as e:
+            self.ctx.log_queue.put(f"[REPLAY] Could not open recording: {e}")
+            return
+        if len(player) == 0:
+            self.ctx.log_queue.put("[REPLAY] Recording is empty.")
+            return
+
+        self._close_replay()
+        self._end_scrub()
+        self.player = player
+        self.player.set_speed(10 ** self.replay_speed_var.get())
+        self.viz.clear_trace()
+        self.replay_seek.config(to=max(player.duration, 0.001))
+        info = player.reader.info
+        self.replay_info_lbl.config(text=f"{info.get('model', '?')} @ {info.get('ip', '?')} | "
+                                         f"{len(player):,} samples | {self._fmt_time(player.duration)}")
+        self.btn_replay_play.config(state=tk.NORMAL, text="▶ Play")
+        self.btn_replay_stop.config(state=tk.NORMAL)
+        self.btn_replay_export.config(state=tk.NORMAL)
+        self.btn_replay_compare.config(state=tk.NORMAL)
+        self.btn_run.config(state=tk.DISABLED)
+        self._set_manual_controls_state(False)
+        self.player.seek(0.0)
+        self.ctx.log_queue.put(f"[REPLAY] Loaded {os.path.basename(path)}")
+        if self._replay_ui_job: self.after_cancel(self._replay_ui_job)
+        self._update_replay_ui()
+
+    def _toggle_replay(self):
+        if self.player is None: return
+        if self.player.playing:
+            self.player.pause()
+            self.btn_replay_play.config(text="▶ Play")
+        else:
+            self.player.play()
+            self.btn_replay_play.config(text="⏸ Pause")
+
+    def _close_replay(self):
+        if self.player is None: return
+        self.player.stop()
+        self.player = None
+        self.btn_replay_play.config(state=tk.DISABLED, text="▶ Play")
+        self.btn_replay_stop.config(state=tk.DISABLED)
+        self.btn_replay_export.config(state=tk.DISABLED)
+        self.btn_replay_compare.config(state=tk.DISABLED)
+        self.replay_info_lbl.config(text="No recording loaded")
+        if self.current_script_path: self.btn_run.config(state=tk.NORMAL)
+        self._set_manual_controls_state(True)
+        # Back to the simulator's own pose
+        self.api._update_gui()
+
+    def _on_replay_finished(self):
+        if self.player is not None: self.btn_replay_play.config(text="▶ Play")
+
+    def _replay_speed_cb(self, val):
+        speed = 10 ** float(val)
+        self.replay_speed_lbl.config(text=f"{speed:.0f}x")
+        if self.player is not None: self.player.set_speed(speed)
+
+    def _replay_seek_cb(self, val):
+        if self._replay_syncing or self.player is None: return
+        self.player.seek(float(val))
+
+    def _update_replay_ui(self):
+        self._replay_ui_job = None
+        if self.player is None: return
+        self._replay_syncing = True
+        self.replay_pos_var.set(self.player.elapsed)
+        self._replay_syncing = False
+        text = f"{self._fmt_time(self.player.elapsed)} / {self._fmt_time(self.player.duration)}"
+        sample = self.player.sample
+        if sample is not None and sample["err"]: text += f" | C{int(sample['err'])}"
+        self.replay_time_lbl.config(text=text)
+        self._replay_ui_job = self.after(100, self._update_replay_ui)
+
+    @staticmethod
+    def _fmt_time(seconds):
+        seconds = int(max(seconds, 0))
+        return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
     def _on_close(self):
         print("[SYSTEM] Closing application...")
         self.ctx.stop_flag = True
+        if self.player: self.player.stop()
+        if self.script_process: self.script_process.terminate()
         
         if self.api: 
             self.api.disconnect_real_robot()
+
+        planner.shutdown()
+        if self.api and self.api.ik_pool: self.api.ik_pool.shutdown()
             
         try: 
             if self.viz and self.viz.plotter and hasattr(self.viz.plotter, 'ren_win'):
@@ -1577,25 +2071,19 @@ class ControlPanel(tk.Tk):
     def _is_move_safe(self, target_pos_m, target_rpy):
         try:
             chain = self.api.chain
-            current_joints = self.api.joints_deg
             
             target_orient = rpy_to_matrix(target_rpy[0], target_rpy[1], target_rpy[2])
-            
-            start_rads = [0] + [math.radians(j) for j in current_joints] + [0]
-            
-            if len(start_rads) < len(chain.links):
-                start_rads += [0] * (len(chain.links) - len(start_rads))
-            start_rads = start_rads[:len(chain.links)]
-
-            target_joints_rad = chain.inverse_kinematics(
-                target_position=target_pos_m,
-                target_orientation=target_orient, 
-                orientation_mode="all",
-                initial_position=start_rads
-            )
 
-            if hasattr(np, 'isnan') and np.isnan(target_joints_rad).any():
+            # Instant rejection from the precomputed workspace map, before any IK
+            reach = self.api.reach_map
+            if reach is not None and not reach.is_reachable(target_pos_m, target_orient):
+                return False, "Target is outside the reachable workspace."
+            
+            # Same multi-seed solve set_position uses, so the checked pose is the one executed
+            target_joints = self.api._solve_ik_jump(np.array(target_pos_m), target_orient)
+            if not target_joints:
                 return False, "Calculation failed (Target unreachable)."
+            target_joints_rad = self.api._to_chain_vector(target_joints)
 
             matrices = chain.forward_kinematics(target_joints_rad, full_kinematics=True)
             
@@ -1628,12 +2116,7 @@ class ControlPanel(tk.Tk):
             chain = self.api.chain
             if not chain: return
 
-            rads = [0] + [math.radians(j) for j in joints_list] + [0]
-            if len(rads) < len(chain.links):
-                rads += [0] * (len(chain.links) - len(rads))
-            rads = rads[:len(chain.links)]
-            
-            matrix = chain.forward_kinematics(rads)
+            matrix = chain.forward_kinematics(self.api._to_chain_vector(joints_list))
             
             coords_mm = [
                 matrix[0, 3] * 1000.0,
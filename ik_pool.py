@@ -0,0 +1,111 @@
+import os
+import time
+import math
+import threading
+import warnings
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from kinematics import chain_spec, chain_from_spec, clip_to_bounds
+from utils import normalize_angles, app_main
+
+# --- MULTI-SEED IK PROCESS POOL ---
+# Fallback tier for targets the seeded solve in SimXArmAPI._solve_ik cannot reach.
+# Workers are spawned once, on first use, and keep a prebuilt chain in memory;
+# every later fallback only pays for pickling a target and a seed.
+
+_worker_chain = None
+_worker_limits = None
+
+
+def _init_worker(spec, limits):
+    global _worker_chain, _worker_limits
+    warnings.filterwarnings("ignore")
+    _worker_chain = chain_from_spec(spec)
+    _worker_limits = limits
+
+
+def _solve_seed(target_pos, target_orient, seed_rads, pos_tol, rot_tol):
+    try:
+        sol = _worker_chain.inverse_kinematics(
+            target_position=target_pos,
+            target_orientation=target_orient,
+            orientation_mode="all",
+            initial_position=None if seed_rads is None else clip_to_bounds(_worker_chain, seed_rads)
+        )
+        if np.isnan(sol).any(): return None
+
+        T = _worker_chain.forward_kinematics(sol)
+        if np.linalg.norm(T[:3, 3] - np.asarray(target_pos)) > pos_tol: return None
+        if np.max(np.abs(T[:3, :3] - np.asarray(target_orient))) > rot_tol: return None
+
+        n = len(_worker_limits)
+        deg = normalize_angles([math.degrees(v) for v in sol[_worker_chain._model.joint_links[:n]]])
+        for val, (min_l, max_l) in zip(deg, _worker_limits):
+            if val < (min_l - 0.1) or val > (max_l + 0.1): return None
+        return deg
+    except Exception:
+        return None
+
+
+class IKPool:
+    def __init__(self, chain, limits, workers=None):
+        self.spec = chain_spec(chain)
+        self.limits = [tuple(l) for l in limits]
+        self.workers = workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+        self._executor = None
+        self._warm = False
+        self._warm_lock = threading.Lock()
+
+    @property
+    def started(self): return self._executor is not None
+
+    def _get_executor(self):
+        if self._executor is None:
+            ctx = multiprocessing.get_context("spawn")
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx,
+                                                 initializer=_init_worker, initargs=(self.spec, self.limits))
+        return self._executor
+
+    def warm_up(self):
+        # Forces the workers to spawn and build their chain ahead of the first fallback.
+        # A call while another thread is warming up waits for it to finish
+        with self._warm_lock:
+            if self._warm: return
+            ex = self._get_executor()
+            with app_main():
+                futures = [ex.submit(_solve_seed, [0.2, 0.0, 0.2], np.eye(3), None, 1.0, 10.0) for _ in range(self.workers)]
+            wait(futures)
+            self._warm = True
+
+    def warm_up_async(self):
+        threading.Thread(target=self.warm_up, daemon=True).start()
+
+    def solve_first_valid(self, target_pos, target_orient, seeds_rads, deadline_s=0.5, pos_tol=0.001, rot_tol=0.02):
+        # First valid solution from any seed within the deadline; pending seeds are cancelled.
+        # The deadline starts once the workers are up (spawning them takes longer than a solve)
+        self.warm_up()
+        ex = self._get_executor()
+        end = time.time() + deadline_s
+        target_pos = np.asarray(target_pos, dtype=float)
+        target_orient = np.asarray(target_orient, dtype=float)
+        # Called from script threads: workers may be started by these submits
+        with app_main():
+            pending = {ex.submit(_solve_seed, target_pos, target_orient, list(seed), pos_tol, rot_tol) for seed in seeds_rads}
+        try:
+            while pending:
+                remaining = end - time.time()
+                if remaining <= 0: break
+                done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                for f in done:
+                    result = f.result()
+                    if result: return result
+            return None
+        finally:
+            for f in pending: f.cancel()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._warm = False
@@ -0,0 +1,355 @@
+import math
+import hashlib
+import numpy as np
+
+# Vectorized kinematics for an ikpy chain.
+# ikpy's forward_kinematics handles one configuration at a time; planners, maps and
+# analysis tools need thousands per call, so the chain is flattened into static
+# per-link transforms + joint axes and evaluated with numpy over a batch dimension.
+
+COLLISION_THRESHOLD = 0.001
+
+
+def _rpy_to_matrix_rad(roll, pitch, yaw):
+    ca, sa = math.cos(roll), math.sin(roll)
+    cb, sb = math.cos(pitch), math.sin(pitch)
+    cg, sg = math.cos(yaw), math.sin(yaw)
+    Rx = np.array([[1, 0, 0], [0, ca, -sa], [0, sa, ca]])
+    Ry = np.array([[cb, 0, sb], [0, 1, 0], [-sb, 0, cb]])
+    Rz = np.array([[cg, -sg, 0], [sg, cg, 0], [0, 0, 1]])
+    return Rz @ Ry @ Rx
+
+
+def axis_rotations(axes, angles):
+    # Rodrigues formula, batched. axes: [3], angles: [N] -> [N, 3, 3]
+    angles = np.asarray(angles, dtype=float)
+    k = np.asarray(axes, dtype=float)
+    K = np.array([[0, -k[2], k[1]], [k[2], 0, -k[0]], [-k[1], k[0], 0]])
+    K2 = K @ K
+    s = np.sin(angles)[..., None, None]
+    c = np.cos(angles)[..., None, None]
+    return np.eye(3) + s * K + (1.0 - c) * K2
+
+
+class KinematicModel:
+    def __init__(self, origins, axes, active_mask, names=None):
+        self.origins = np.asarray(origins, dtype=float)      # [L, 4, 4] static frame per link
+        self.axes = np.asarray(axes, dtype=float)            # [L, 3] joint axis (zeros = fixed)
+        self.active_mask = np.asarray(active_mask, dtype=bool)
+        self.names = list(names) if names is not None else [f"link{i}" for i in range(len(self.origins))]
+        self.joint_links = np.flatnonzero(self.active_mask)
+
+        # Single-configuration fast path: origin @ Rot(axis, q) = O + sin(q) O K + (1 - cos(q)) O K^2
+        self._single = []
+        for i in range(len(self.origins)):
+            O = self.origins[i]
+            if not self.active_mask[i]:
+                self._single.append((O, None, None))
+                continue
+            k = self.axes[i]
+            K = np.zeros((4, 4))
+            K[:3, :3] = [[0, -k[2], k[1]], [k[2], 0, -k[0]], [-k[1], k[0], 0]]
+            self._single.append((O, O @ K, O @ K @ K))
+
+    @classmethod
+    def from_chain(cls, chain):
+        origins, axes = [], []
+        for link in chain.links:
+            T = np.eye(4)
+            axis = np.zeros(3)
+            if hasattr(link, 'origin_translation'):
+                T[:3, :3] = _rpy_to_matrix_rad(*link.origin_orientation)
+                T[:3, 3] = link.origin_translation
+                if getattr(link, 'rotation', None) is not None:
+                    axis = np.asarray(link.rotation, dtype=float)
+            origins.append(T)
+            axes.append(axis)
+        mask = list(chain.active_links_mask)
+        # Fixed links carry no rotation, even when the mask marks them active
+        mask = [bool(m) and bool(np.any(a)) for m, a in zip(mask, axes)]
+        return cls(origins, axes, mask, [link.name for link in chain.links])
+
+    @property
+    def n_links(self): return len(self.origins)
+
+    @property
+    def n_joints(self): return len(self.joint_links)
+
+    def full_vector(self, joints_rad):
+        # Same layout ikpy expects: one value per link, inactive links at 0
+        vec = np.zeros(self.n_links)
+        n = min(len(joints_rad), self.n_joints)
+        vec[self.joint_links[:n]] = np.asarray(joints_rad, dtype=float)[:n]
+        return vec
+
+    def fk_single(self, joints_rad, full=False):
+        # One configuration, no batch overhead: [n_joints] -> [4, 4] or [L, 4, 4]
+        T = np.eye(4)
+        frames = []
+        j = 0
+        for O, OK, OK2 in self._single:
+            if OK is None:
+                T = T @ O
+            else:
+                a = joints_rad[j] if j < len(joints_rad) else 0.0
+                T = T @ (O + math.sin(a) * OK + (1.0 - math.cos(a)) * OK2)
+                j += 1
+            if full: frames.append(T)
+        return np.array(frames) if full else T
+
+    def fk(self, joints_rad, full=False):
+        # joints_rad: [..., n_joints] -> [..., 4, 4] (tool) or [..., L, 4, 4] (every link frame)
+        q = np.asarray(joints_rad, dtype=float)
+        if q.ndim == 1: return self.fk_single(q, full=full)
+        batch_shape = q.shape[:-1]
+        q = q.reshape(-1, q.shape[-1])
+        n = q.shape[0]
+
+        T = np.broadcast_to(np.eye(4), (n, 4, 4)).copy()
+        frames = np.empty((n, self.n_links, 4, 4)) if full else None
+        j = 0
+        for i in range(self.n_links):
+            T = T @ self.origins[i]
+            if self.active_mask[i]:
+                R = axis_rotations(self.axes[i], q[:, j] if j < q.shape[1] else np.zeros(n))
+                T[:, :3, :3] = T[:, :3, :3] @ R
+                j += 1
+            if full: frames[:, i] = T
+
+        if full: return frames.reshape(batch_shape + (self.n_links, 4, 4))
+        return T.reshape(batch_shape + (4, 4))
+
+    def fk_deg(self, joints_deg, full=False):
+        return self.fk(np.radians(joints_deg), full=full)
+
+
+def model_hash(model, limits, extra=""):
+    # Short key for cached artifacts derived from a model + joint limits
+    h = hashlib.sha1()
+    h.update(np.ascontiguousarray(model.origins).tobytes())
+    h.update(np.ascontiguousarray(model.axes).tobytes())
+    h.update(np.asarray(limits, dtype=float)[:model.n_joints].tobytes())
+    h.update(str(extra).encode())
+    return h.hexdigest()[:12]
+
+
+def tool_points(frames, tool_offset=0.0):
+    # frames: [N, L, 4, 4] -> tool tip position [N, 3]
+    tip = frames[:, -1, :3, 3].copy()
+    if tool_offset > 0:
+        tip += frames[:, -1, :3, 2] * tool_offset
+    return tip
+
+
+def link_sample_points(frames, samples_per_link=4):
+    # Points along the segments connecting consecutive link origins: [N, S, 3]
+    origins = frames[:, :, :3, 3]
+    a = origins[:, :-1]
+    b = origins[:, 1:]
+    t = np.linspace(0.0, 1.0, samples_per_link)[None, None, :, None]
+    pts = a[:, :, None, :] + (b - a)[:, :, None, :] * t
+    return pts.reshape(frames.shape[0], -1, 3)
+
+
+def fit_link_spheres(points, count=3):
+    # Bounding spheres for one link's mesh points (link frame): [count, 4] = center xyz, radius.
+    # The points are cut into slabs along their longest extent, one sphere per slab.
+    pts = np.asarray(points, dtype=float)
+    if len(pts) == 0: return np.zeros((0, 4))
+    lo, hi = pts.min(axis=0), pts.max(axis=0)
+    axis = int(np.argmax(hi - lo))
+    edges = np.linspace(lo[axis], hi[axis], count + 1)
+    slab = np.clip(np.searchsorted(edges, pts[:, axis], side="right") - 1, 0, count - 1)
+    spheres = []
+    for k in range(count):
+        sel = pts[slab == k]
+        if len(sel) == 0: continue
+        center = (sel.min(axis=0) + sel.max(axis=0)) / 2.0
+        spheres.append(np.append(center, np.max(np.linalg.norm(sel - center, axis=1))))
+    return np.array(spheres)
+
+
+def collision_mask(frames, tool_offset=0.0, obstacles=None, z_offset=0.0, margin=0.0):
+    # Vectorized collision test for a batch of configurations.
+    # Floor: every link origin above the shoulder + wrist/tool tip must stay above the floor.
+    # Obstacles: axis-aligned boxes [(min_xyz, max_xyz), ...] in meters, tested against
+    # points sampled along the links and the tool.
+    n = frames.shape[0]
+    hit = np.zeros(n, dtype=bool)
+
+    origin_z = frames[:, 2:, 2, 3] + z_offset
+    hit |= np.any(origin_z < COLLISION_THRESHOLD, axis=1)
+
+    tip = tool_points(frames, tool_offset)
+    hit |= (tip[:, 2] + z_offset) < COLLISION_THRESHOLD
+
+    if obstacles:
+        pts = link_sample_points(frames[:, 1:])
+        pts = np.concatenate([pts, tip[:, None, :]], axis=1)
+        pts[..., 2] += z_offset
+        for box_min, box_max in obstacles:
+            lo = np.asarray(box_min, dtype=float) - margin
+            hi = np.asarray(box_max, dtype=float) + margin
+            inside = np.all((pts >= lo) & (pts <= hi), axis=-1)
+            hit |= np.any(inside, axis=1)
+    return hit
+
+
+def jacobian(model, joints_rad, frames=None):
+    # Geometric Jacobian [N, 6, n_joints] (linear rows first) from one batched FK pass.
+    # The joint axis is invariant under its own rotation, so the link frame gives it directly.
+    q = np.atleast_2d(np.asarray(joints_rad, dtype=float))
+    if frames is None: frames = model.fk(q, full=True)
+    links = model.joint_links[:q.shape[1]]
+    joint_frames = frames[:, links]
+    p_e = frames[:, -1, :3, 3]
+    z = np.einsum('nlij,lj->nli', joint_frames[:, :, :3, :3], model.axes[links])
+    p = joint_frames[:, :, :3, 3]
+    J = np.empty((q.shape[0], 6, len(links)))
+    J[:, :3] = np.cross(z, p_e[:, None, :] - p).transpose(0, 2, 1)
+    J[:, 3:] = z.transpose(0, 2, 1)
+    return J
+
+
+def manipulability(J):
+    # Yoshikawa index sqrt(det(J J^T)), batched
+    JJt = J @ J.transpose(0, 2, 1)
+    return np.sqrt(np.clip(np.linalg.det(JJt), 0.0, None))
+
+
+def conditioning(model, joints_rad, frames=None):
+    # Singularity measures for N samples in one batched pass: manipulability (product of the
+    # Jacobian's singular values, i.e. sqrt(det(J J^T)) on 6 joints and still meaningful on 5),
+    # condition number, and the joint-space direction that loses the most (unit [N, n])
+    J = jacobian(model, joints_rad, frames)
+    _, S, Vt = np.linalg.svd(J)
+    manip = np.prod(S, axis=1)
+    with np.errstate(divide="ignore"): cond = np.where(S[:, -1] > 1e-12, S[:, 0] / S[:, -1], np.inf)
+    return manip, cond, Vt[:, S.shape[1] - 1]
+
+
+def flagged_runs(flags):
+    # Boolean samples -> [(start, end)] index ranges (end exclusive) of consecutive True
+    f = np.concatenate([[False], np.asarray(flags, dtype=bool), [False]])
+    edges = np.flatnonzero(np.diff(f.astype(np.int8)))
+    return list(zip(edges[::2].tolist(), edges[1::2].tolist()))
+
+
+# --- CHAIN SPEC ---
+# Plain-data description of an ikpy chain. Picklable, so worker processes can rebuild
+# the chain without re-parsing the URDF (and without ikpy's sympy compilation step).
+
+def chain_spec(chain):
+    links = []
+    for link in chain.links:
+        if not hasattr(link, 'origin_translation'):
+            links.append({"type": "origin", "name": link.name})
+            continue
+        links.append({
+            "type": link.joint_type,
+            "name": link.name,
+            "translation": [float(v) for v in link.origin_translation],
+            "orientation": [float(v) for v in link.origin_orientation],
+            "rotation": None if getattr(link, 'rotation', None) is None else [float(v) for v in link.rotation],
+            "bounds": [None if b is None or not np.isfinite(b) else float(b) for b in link.bounds],
+        })
+    return {"links": links, "active_links_mask": [bool(m) for m in chain.active_links_mask]}
+
+
+def clip_to_bounds(chain, vector):
+    # ikpy rejects an initial guess outside the chain's (URDF) bounds, which can be narrower than
+    # config.JOINT_LIMITS: clip seeds into them before solving
+    out = np.array(vector, dtype=float)
+    for i, link in enumerate(chain.links[:len(out)]):
+        lo, hi = getattr(link, "bounds", (None, None))
+        out[i] = np.clip(out[i], -np.inf if lo is None else lo, np.inf if hi is None else hi)
+    return out
+
+
+def _compiled_chain_class():
+    from ikpy.chain import Chain
+
+    class CompiledChain(Chain):
+        # ikpy chain whose FK (called on every IK iteration) runs on the flattened model
+        def forward_kinematics(self, joints, full_kinematics=False):
+            q = np.asarray(joints, dtype=float)[self._model.joint_links]
+            if full_kinematics: return list(self._model.fk_single(q, full=True))
+            return self._model.fk_single(q)
+
+    return CompiledChain
+
+
+def chain_from_spec(spec):
+    from ikpy.link import OriginLink, URDFLink
+
+    links = []
+    for item in spec["links"]:
+        if item["type"] == "origin":
+            links.append(OriginLink())
+            continue
+        bounds = tuple(item.get("bounds") or (None, None))
+        links.append(URDFLink(name=item["name"], origin_translation=item["translation"],
+                              origin_orientation=item["orientation"], rotation=item["rotation"],
+                              bounds=bounds, joint_type=item["type"], use_symbolic_matrix=False))
+    chain = _compiled_chain_class()(links, active_links_mask=spec["active_links_mask"])
+    chain._model = KinematicModel.from_chain(chain)
+    return chain
+
+
+# --- DAMPED LEAST SQUARES ---
+# Incremental IK for small Cartesian steps: a few Jacobian iterations from the previous
+# solution instead of a full nonlinear optimisation. Refuses to step near singularities
+# so the caller can escalate to the full solver.
+
+def orientation_error(R_cur, R_target):
+    # [3, 3] -> [3], or batched [N, 3, 3] -> [N, 3]
+    return 0.5 * (np.cross(R_cur[..., :, 0], R_target[..., :, 0]) +
+                  np.cross(R_cur[..., :, 1], R_target[..., :, 1]) +
+                  np.cross(R_cur[..., :, 2], R_target[..., :, 2]))
+
+
+def dls_solve(model, q0_rad, target_pos, target_orient, max_iter=8, damping=0.01,
+              pos_tol=1e-4, rot_tol=1e-3, min_manip=1e-4):
+    q = np.array(q0_rad, dtype=float)
+    target_pos = np.asarray(target_pos, dtype=float)
+    target_orient = np.asarray(target_orient, dtype=float)
+    eye = np.eye(6) * damping ** 2
+    for _ in range(max_iter):
+        frames = model.fk_single(q, full=True)[None]
+        T = frames[0, -1]
+        e = np.concatenate([target_pos - T[:3, 3], orientation_error(T[:3, :3], target_orient)])
+        if np.linalg.norm(e[:3]) < pos_tol and np.linalg.norm(e[3:]) < rot_tol: return q, True
+        J = jacobian(model, q[None], frames)[0]
+        JJt = J @ J.T
+        if math.sqrt(max(np.linalg.det(JJt), 0.0)) < min_manip: return q, False
+        q = q + J.T @ np.linalg.solve(JJt + eye, e)
+    T = model.fk(q)
+    ok = (np.linalg.norm(target_pos - T[:3, 3]) < pos_tol and
+          np.linalg.norm(orientation_error(T[:3, :3], target_orient)) < rot_tol)
+    return q, ok
+
+
+def dls_solve_batch(model, q0_rad, target_pos, target_orient, max_iter=12, damping=0.01,
+                    pos_tol=1e-4, rot_tol=1e-3):
+    # dls_solve for N targets at once: [N, 3] + [N, 3, 3] from seeds [N, n] (or one
+    # shared seed). Converged rows drop out of the batch; returns q [N, n], ok [N].
+    target_pos = np.asarray(target_pos, dtype=float)
+    target_orient = np.asarray(target_orient, dtype=float)
+    n = len(target_pos)
+    q = np.array(np.broadcast_to(np.asarray(q0_rad, dtype=float), (n, model.n_joints)))
+    ok = np.zeros(n, dtype=bool)
+    eye = np.eye(6) * damping ** 2
+    for _ in range(max_iter + 1):
+        idx = np.nonzero(~ok)[0]
+        if not len(idx): break
+        frames = model.fk(q[idx], full=True)
+        T = frames[:, -1]
+        e = np.concatenate([target_pos[idx] - T[:, :3, 3], orientation_error(T[:, :3, :3], target_orient[idx])], axis=1)
+        done = (np.linalg.norm(e[:, :3], axis=1) < pos_tol) & (np.linalg.norm(e[:, 3:], axis=1) < rot_tol)
+        ok[idx[done]] = True
+        if _ == max_iter: break
+        step = ~done
+        J = jacobian(model, q[idx[step]], frames[step])
+        Jt = J.transpose(0, 2, 1)
+        q[idx[step]] += (Jt @ np.linalg.solve(J @ Jt + eye, e[step][..., None]))[..., 0]
+    return q, ok
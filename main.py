@@ -4,6 +4,7 @@ import tkinter as tk
 from tkinter import ttk
 import threading
 import time
+import multiprocessing
 
 # Crash prevention
 os.environ["OMP_NUM_THREADS"] = "1"
@@ -123,5 +124,7 @@ class SplashScreen(tk.Tk):
             app.mainloop()
 
 if __name__ == "__main__":
+    # Planner and other worker processes re-launch the frozen executable
+    multiprocessing.freeze_support()
     splash = SplashScreen()
     splash.mainloop()
\ No newline at end of file
@@ -0,0 +1,253 @@
+import os
+import json
+import math
+import time
+import hashlib
+import numpy as np
+import xml.etree.ElementTree as ET
+import config
+from kinematics import KinematicModel, chain_from_spec
+
+# --- COMPILED ROBOT MODEL ---
+# Everything LiteSim needs from a URDF (chain parameters, static transforms, joint
+# limits, mesh mapping) compiled once and cached in USER_DATA_DIR, keyed by the hash
+# of the URDF file (inertials and effort limits included, for the dynamics). Loading the cache skips both the XML parse and ikpy's sympy
+# compilation, and the result is plain data that worker processes can receive.
+
+CACHE_VERSION = 3
+
+
+def _floats(text, default):
+    if not text: return list(default)
+    return [float(v) for v in text.split()]
+
+
+def _origin_matrix(origin):
+    xyz = _floats(origin.attrib.get('xyz') if origin is not None else None, (0, 0, 0))
+    rpy = _floats(origin.attrib.get('rpy') if origin is not None else None, (0, 0, 0))
+    T = np.eye(4)
+    T[:3, :3] = _rpy_matrix(*rpy)
+    T[:3, 3] = xyz
+    return T
+
+
+def _rpy_matrix(roll, pitch, yaw):
+    ca, sa = math.cos(roll), math.sin(roll)
+    cb, sb = math.cos(pitch), math.sin(pitch)
+    cg, sg = math.cos(yaw), math.sin(yaw)
+    Rx = np.array([[1, 0, 0], [0, ca, -sa], [0, sa, ca]])
+    Ry = np.array([[cb, 0, sb], [0, 1, 0], [-sb, 0, cb]])
+    Rz = np.array([[cg, -sg, 0], [sg, cg, 0], [0, 0, 1]])
+    return Rz @ Ry @ Rx
+
+
+def _link_visual(link_el):
+    # First <visual><geometry><mesh> of a link: (filename, origin 4x4, scale) or None
+    if link_el is None: return None
+    for visual in link_el.findall('visual'):
+        mesh = visual.find('geometry/mesh')
+        if mesh is None or not mesh.attrib.get('filename'): continue
+        scale = _floats(mesh.attrib.get('scale'), (1, 1, 1))
+        return mesh.attrib['filename'], _origin_matrix(visual.find('origin')).tolist(), scale
+    return None
+
+
+def _link_inertial(link_el):
+    # <inertial> of a link in the link frame: {"mass", "com", "inertia" 3x3 about the COM} or None
+    if link_el is None: return None
+    inertial = link_el.find('inertial')
+    if inertial is None or inertial.find('mass') is None: return None
+    origin = _origin_matrix(inertial.find('origin'))
+    el = inertial.find('inertia')
+    get = lambda k: float(el.attrib.get(k, 0.0)) if el is not None else 0.0
+    I = np.array([[get('ixx'), get('ixy'), get('ixz')],
+                  [get('ixy'), get('iyy'), get('iyz')],
+                  [get('ixz'), get('iyz'), get('izz')]])
+    R = origin[:3, :3]
+    return {"mass": float(inertial.find('mass').attrib.get('value', 0.0)),
+            "com": origin[:3, 3].tolist(), "inertia": (R @ I @ R.T).tolist()}
+
+
+def resolve_mesh(filename, urdf_dir):
+    # URDF mesh references may be relative, file:// or package:// paths
+    if not filename: return None
+    name = filename
+    for prefix in ("package://", "file://"):
+        if name.startswith(prefix): name = name[len(prefix):]
+    candidates = [
+        os.path.join(urdf_dir, name),
+        name,
+        os.path.join(urdf_dir, "visual", os.path.basename(name)),
+        os.path.join(config.VISUAL_DIR, os.path.basename(name)),
+        os.path.join(config.MODEL_DIR, os.path.basename(name)),
+    ]
+    for path in candidates:
+        if os.path.isfile(path): return path
+    return None
+
+
+def urdf_hash(urdf_path):
+    h = hashlib.sha1()
+    with open(urdf_path, "rb") as f: h.update(f.read())
+    h.update(str(CACHE_VERSION).encode())
+    return h.hexdigest()[:16]
+
+
+def compile_urdf(urdf_path):
+    root = ET.parse(urdf_path).getroot()
+    link_els = {link.attrib['name']: link for link in root.findall('link')}
+    links = list(link_els)
+    joints = root.findall('joint')
+    root_link = links[0] if links else "link_base"
+
+    spec_links = [{"type": "origin", "name": "Base link"}]
+    visuals = [_link_visual(link_els.get(root_link))]
+    inertials = [_link_inertial(link_els.get(root_link))]
+    mask = [False]
+    limits = []
+    efforts = []
+
+    # Follow the kinematic chain from the root link, one joint per step
+    current = root_link
+    while True:
+        joint = next((j for j in joints if j.find('parent') is not None and j.find('parent').attrib.get('link') == current), None)
+        if joint is None: break
+
+        origin = joint.find('origin')
+        xyz = _floats(origin.attrib.get('xyz') if origin is not None else None, (0, 0, 0))
+        rpy = _floats(origin.attrib.get('rpy') if origin is not None else None, (0, 0, 0))
+        jtype = joint.attrib.get('type', 'fixed')
+        entry = {"type": "fixed", "name": joint.attrib['name'], "translation": xyz, "orientation": rpy,
+                 "rotation": None, "bounds": [None, None]}
+
+        if jtype in ("revolute", "continuous"):
+            axis = joint.find('axis')
+            entry["type"] = "revolute"
+            entry["rotation"] = _floats(axis.attrib.get('xyz') if axis is not None else None, (1, 0, 0))
+            limit = joint.find('limit')
+            if limit is not None and jtype == "revolute":
+                lo = float(limit.attrib.get('lower', -math.pi))
+                hi = float(limit.attrib.get('upper', math.pi))
+            else:
+                lo, hi = -2 * math.pi, 2 * math.pi
+            entry["bounds"] = [lo, hi]
+            limits.append((math.degrees(lo), math.degrees(hi)))
+            efforts.append(float(limit.attrib['effort']) if limit is not None and limit.attrib.get('effort') else None)
+            mask.append(True)
+        else:
+            mask.append(False)
+
+        spec_links.append(entry)
+        current = joint.find('child').attrib['link']
+        visuals.append(_link_visual(link_els.get(current)))
+        inertials.append(_link_inertial(link_els.get(current)))
+
+    # The tool slot is the last frame of the chain; when that link has its own mesh
+    # (no separate flange link) the visualizer adds an extra actor for the tool.
+    eef_index = len(spec_links) - 1
+
+    return {
+        "version": CACHE_VERSION,
+        "urdf": os.path.basename(urdf_path),
+        "urdf_dir": os.path.dirname(os.path.abspath(urdf_path)),
+        "root_link": root_link,
+        "spec": {"links": spec_links, "active_links_mask": mask},
+        "urdf_limits_deg": limits,
+        "meshes": [v[0] if v else None for v in visuals],
+        "mesh_origins": [v[1] if v else None for v in visuals],
+        "mesh_scales": [v[2] if v else None for v in visuals],
+        "eef_index": eef_index,
+        "inertials": inertials,
+        "effort_limits": efforts,
+    }
+
+
+class CompiledModel:
+    def __init__(self, data, origins, axes, key):
+        self.data = data
+        self.key = key
+        self.spec = data["spec"]
+        self.root_link = data["root_link"]
+        self.meshes = data["meshes"]
+        self.mesh_origins = [np.array(m) if m is not None else None for m in data["mesh_origins"]]
+        self.mesh_scales = data["mesh_scales"]
+        self.urdf_dir = data["urdf_dir"]
+        self.eef_index = data["eef_index"]
+        self.urdf_limits_deg = [tuple(l) for l in data["urdf_limits_deg"]]
+        self.inertials = data.get("inertials") or [None] * len(data["meshes"]) # Per link frame, link frame coordinates
+        self.effort_limits = data.get("effort_limits") or [None] * len(self.urdf_limits_deg) # N·m per joint
+        names = [item["name"] for item in self.spec["links"]]
+        mask = [bool(m) for m in self.spec["active_links_mask"]]
+        self.model = KinematicModel(origins, axes, mask, names)
+        self._chain = None
+
+    @property
+    def n_joints(self): return self.model.n_joints
+
+    def mesh_path(self, i):
+        return resolve_mesh(self.meshes[i], self.urdf_dir)
+
+    def joint_limits(self, model_name=None):
+        # Configured override for the model if any, else the URDF <limit> tags
+        entry = config.ROBOT_MODELS.get(model_name, {})
+        limits = entry.get("joint_limits")
+        if limits and len(limits) == self.n_joints: return [tuple(l) for l in limits]
+        return list(self.urdf_limits_deg)
+
+    def chain(self):
+        # Built once per process; non-symbolic links skip ikpy's sympy step
+        if self._chain is None: self._chain = chain_from_spec(self.spec)
+        return self._chain
+
+
+def cache_path(key):
+    return os.path.join(config.USER_DATA_DIR, f"model_{key}.npz")
+
+
+def load_compiled(urdf_path, use_cache=True):
+    t0 = time.time()
+    key = urdf_hash(urdf_path)
+    path = cache_path(key)
+
+    if use_cache and os.path.exists(path):
+        try:
+            with np.load(path) as npz:
+                data = json.loads(str(npz["meta"]))
+                compiled = CompiledModel(data, npz["origins"], npz["axes"], key)
+            print(f"[URDF] Cached model loaded in {(time.time() - t0) * 1000:.1f}ms")
+            return compiled
+        except Exception as e:
+            print(f"[URDF] Model cache unreadable, recompiling: {e}")
+
+    data = compile_urdf(urdf_path)
+    model = KinematicModel.from_chain(chain_from_spec(data["spec"]))
+    try:
+        np.savez(path, meta=np.array(json.dumps(data)), origins=model.origins, axes=model.axes)
+    except Exception as e:
+        print(f"[URDF] Could not write model cache: {e}")
+    print(f"[URDF] Model compiled in {(time.time() - t0) * 1000:.1f}ms")
+    return CompiledModel(data, model.origins, model.axes, key)
+
+
+# --- MODEL REGISTRY ---
+
+def available_models():
+    # Configured models whose URDF is present, plus any other URDF in MODEL_DIR
+    models = {}
+    for name, entry in config.ROBOT_MODELS.items():
+        path = os.path.join(config.MODEL_DIR, entry["urdf"])
+        if os.path.exists(path): models[name] = path
+    if os.path.exists(config.MODEL_DIR):
+        known = set(os.path.abspath(p) for p in models.values())
+        for f in sorted(os.listdir(config.MODEL_DIR)):
+            path = os.path.abspath(os.path.join(config.MODEL_DIR, f))
+            if f.lower().endswith(".urdf") and path not in known:
+                models[os.path.splitext(f)[0]] = path
+    return models
+
+
+def activate(model_name, compiled):
+    # Point the global joint configuration at the loaded model
+    config.ACTIVE_MODEL = model_name
+    config.JOINT_LIMITS = compiled.joint_limits(model_name)
+    config.JOINT_COUNT = compiled.n_joints
@@ -0,0 +1,68 @@
+import math
+import numpy as np
+
+# --- CARTESIAN PATHS ---
+# Waypoint generators for the simulator's Cartesian motions (line, circle, blend),
+# mirroring the controller's set_position / move_circle / set_position(radius=...).
+# Everything is vectorized: a motion is one [N, 3] array (meters) handed to a single
+# batched IK pass. The start point is never included, the end point always is.
+
+STEP_M = 0.005 # Waypoint spacing
+ROT_STEP_DEG = 2.0 # Max orientation change between waypoints
+MIN_POINTS = 5
+
+
+def _unit(v):
+    n = np.linalg.norm(v)
+    return v / n if n > 1e-12 else v * 0.0
+
+
+def line_points(p0, p1, step=STEP_M, min_points=MIN_POINTS):
+    p0, p1 = np.asarray(p0, dtype=float), np.asarray(p1, dtype=float)
+    n = max(MIN_POINTS, min_points, int(np.linalg.norm(p1 - p0) / step))
+    t = np.arange(1, n + 1)[:, None] / n
+    return p0 + (p1 - p0) * t
+
+
+def circle_through(p0, p1, p2):
+    # Circle through three points -> (center, radius, u, v) with u, v spanning its plane,
+    # u pointing at p0. None if the points are (nearly) collinear.
+    p0, p1, p2 = (np.asarray(p, dtype=float) for p in (p0, p1, p2))
+    a, b = p1 - p0, p2 - p0
+    n = np.cross(a, b)
+    nn = n @ n
+    if nn < 1e-12: return None
+    center = p0 + (np.cross(n, a) * (b @ b) + np.cross(b, n) * (a @ a)) / (2 * nn)
+    u = _unit(p0 - center)
+    v = np.cross(_unit(n), u) # Direction of travel p0 -> p1 -> p2
+    return center, float(np.linalg.norm(p0 - center)), u, v
+
+
+def circle_points(p0, p1, p2, percent=100.0, step=STEP_M):
+    # move_circle: from p0 along the circle through p1 and p2, 'percent' of the full circle
+    # (100 closes the loop, more than 100 keeps going). None for a degenerate circle.
+    circle = circle_through(p0, p1, p2)
+    if circle is None: return None
+    center, r, u, v = circle
+    sweep = 2 * math.pi * percent / 100.0
+    n = max(MIN_POINTS, int(math.ceil(abs(sweep) * r / step)))
+    a = sweep * np.arange(1, n + 1)[:, None] / n
+    return center + r * (np.cos(a) * u + np.sin(a) * v)
+
+
+def blend_points(p0, corner, p1, step=STEP_M):
+    # Tangent-continuous corner blend from p0 (on the incoming line) to p1 (on the outgoing
+    # line) as a quadratic Bezier with the corner as control point.
+    p0, corner, p1 = (np.asarray(p, dtype=float) for p in (p0, corner, p1))
+    length = np.linalg.norm(corner - p0) + np.linalg.norm(p1 - corner)
+    n = max(MIN_POINTS, int(length / step))
+    t = np.arange(1, n + 1)[:, None] / n
+    return (1 - t) ** 2 * p0 + 2 * (1 - t) * t * corner + t ** 2 * p1
+
+
+def trim_end(p0, p1, radius):
+    # Point 'radius' before p1 on the line p0 -> p1 (at most half way)
+    p0, p1 = np.asarray(p0, dtype=float), np.asarray(p1, dtype=float)
+    d = np.linalg.norm(p1 - p0)
+    if d < 1e-9: return p1
+    return p1 - (p1 - p0) * min(radius, d / 2.0) / d
@@ -0,0 +1,190 @@
+import time
+import numpy as np
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from kinematics import collision_mask
+from utils import app_main
+
+# --- RRT-CONNECT JOINT-SPACE PLANNER ---
+# Works in degrees inside config.JOINT_LIMITS. Edges are validated by interpolating
+# them at a fixed joint resolution and running one batched FK + collision pass.
+
+class RRTConnectPlanner:
+    def __init__(self, model, limits_deg, obstacles=None, tool_offset=0.0, z_offset=0.0,
+                 step_deg=10.0, edge_res_deg=2.0, margin=0.01, seed=None):
+        self.model = model
+        limits = np.asarray(limits_deg, dtype=float)[:model.n_joints]
+        self.lower = limits[:, 0]
+        self.upper = limits[:, 1]
+        self.obstacles = obstacles or []
+        self.tool_offset = tool_offset
+        self.z_offset = z_offset
+        self.step_deg = step_deg
+        self.edge_res_deg = edge_res_deg
+        self.margin = margin
+        self.rng = np.random.default_rng(seed)
+        self.edge_checks = 0
+
+    # COLLISION
+    def in_collision(self, configs_deg):
+        configs_deg = np.atleast_2d(configs_deg)
+        frames = self.model.fk_deg(configs_deg, full=True)
+        return collision_mask(frames, self.tool_offset, self.obstacles, self.z_offset, self.margin)
+
+    def edge_free(self, a, b):
+        self.edge_checks += 1
+        n = max(2, int(np.ceil(np.max(np.abs(b - a)) / self.edge_res_deg)) + 1)
+        t = np.linspace(0.0, 1.0, n)[:, None]
+        pts = a + (b - a) * t
+        return not np.any(self.in_collision(pts))
+
+    # TREE GROWTH
+    def _sample(self, goal):
+        if self.rng.random() < 0.1: return goal.copy()
+        return self.rng.uniform(self.lower, self.upper)
+
+    def _extend(self, nodes, parents, target):
+        arr = np.asarray(nodes)
+        idx = int(np.argmin(np.sum((arr - target) ** 2, axis=1)))
+        near = arr[idx]
+        diff = target - near
+        dist = np.max(np.abs(diff))
+        if dist < 1e-9: return "reached", idx
+        new = target if dist <= self.step_deg else near + diff * (self.step_deg / dist)
+        if not self.edge_free(near, new): return "trapped", None
+        nodes.append(new)
+        parents.append(idx)
+        return ("reached" if dist <= self.step_deg else "advanced"), len(nodes) - 1
+
+    def _connect(self, nodes, parents, target):
+        while True:
+            status, idx = self._extend(nodes, parents, target)
+            if status != "advanced": return status, idx
+
+    @staticmethod
+    def _trace(nodes, parents, idx):
+        out = []
+        while idx is not None and idx >= 0:
+            out.append(nodes[idx])
+            idx = parents[idx]
+        return out
+
+    def plan(self, start_deg, goal_deg, time_budget=2.0):
+        deadline = time.time() + time_budget
+        start = np.clip(np.asarray(start_deg, dtype=float), self.lower, self.upper)
+        goal = np.clip(np.asarray(goal_deg, dtype=float), self.lower, self.upper)
+
+        if self.in_collision(goal)[0]: return None, "Goal configuration is in collision"
+        if self.edge_free(start, goal): return [start, goal], "Direct"
+
+        tree_a = ([start], [-1])
+        tree_b = ([goal], [-1])
+        a_is_start = True
+
+        while time.time() < deadline:
+            rnd = self._sample(goal if a_is_start else start)
+            status, idx_a = self._extend(tree_a[0], tree_a[1], rnd)
+            if status != "trapped":
+                status_b, idx_b = self._connect(tree_b[0], tree_b[1], tree_a[0][idx_a])
+                if status_b == "reached":
+                    half_a = self._trace(*tree_a, idx_a)[::-1]
+                    half_b = self._trace(*tree_b, idx_b)[1:]
+                    path = half_a + half_b
+                    if not a_is_start: path = path[::-1]
+                    return path, "Found"
+            tree_a, tree_b = tree_b, tree_a
+            a_is_start = not a_is_start
+
+        return None, "Time budget exceeded"
+
+    # POST-PROCESSING
+    def shortcut(self, path, time_budget=0.5, attempts=200):
+        path = [np.asarray(p, dtype=float) for p in path]
+        deadline = time.time() + time_budget
+        for _ in range(attempts):
+            if len(path) < 3 or time.time() > deadline: break
+            i, j = sorted(self.rng.choice(len(path), 2, replace=False))
+            if j - i < 2: continue
+            if self.edge_free(path[i], path[j]):
+                path = path[:i + 1] + path[j:]
+        return path
+
+    def smooth(self, path, iterations=3):
+        # Chaikin corner cutting; a cut is only kept when the new edge stays collision free
+        path = [np.asarray(p, dtype=float) for p in path]
+        for _ in range(iterations):
+            if len(path) < 3: break
+            out = [path[0]]
+            for i in range(1, len(path) - 1):
+                # a and b lie on already validated edges, only the cut a->b is new
+                a = 0.25 * path[i - 1] + 0.75 * path[i]
+                b = 0.75 * path[i] + 0.25 * path[i + 1]
+                if self.edge_free(a, b):
+                    out.extend([a, b])
+                else:
+                    out.append(path[i])
+            out.append(path[-1])
+            path = out
+        return path
+
+
+def densify(path, speed_deg_s, rate_hz=30.0):
+    # Piecewise-linear path -> evenly timed samples the simulator can replay
+    path = np.asarray(path, dtype=float)
+    if len(path) < 2: return path, np.zeros(len(path))
+    seg = np.max(np.abs(np.diff(path, axis=0)), axis=1)
+    t_knots = np.concatenate([[0.0], np.cumsum(seg / max(speed_deg_s, 1e-6))])
+    total = t_knots[-1]
+    n = max(2, int(total * rate_hz) + 1)
+    times = np.linspace(0.0, total, n)
+    traj = np.stack([np.interp(times, t_knots, path[:, k]) for k in range(path.shape[1])], axis=1)
+    return traj, times
+
+
+def plan_trajectory(model, limits_deg, start_deg, goal_deg, obstacles=None, tool_offset=0.0,
+                    z_offset=0.0, time_budget=2.0, speed_deg_s=50.0, seed=None):
+    t0 = time.time()
+    planner = RRTConnectPlanner(model, limits_deg, obstacles, tool_offset, z_offset, seed=seed)
+    path, status = planner.plan(start_deg, goal_deg, time_budget=time_budget)
+    if path is None:
+        return {"ok": False, "status": status, "elapsed": time.time() - t0}
+
+    remaining = max(0.05, time_budget - (time.time() - t0))
+    raw_len = len(path)
+    path = planner.shortcut(path, time_budget=remaining * 0.5)
+    path = planner.smooth(path)
+    traj, times = densify(path, speed_deg_s)
+    return {
+        "ok": True,
+        "status": status,
+        "waypoints": np.asarray(path),
+        "trajectory": traj,
+        "times": times,
+        "raw_nodes": raw_len,
+        "edge_checks": planner.edge_checks,
+        "elapsed": time.time() - t0,
+    }
+
+
+# --- WORKER PROCESS ---
+# Planning runs in a separate process so neither Tk/VTK nor the script thread
+# is starved while RRT is sampling. The executor is created once and reused.
+
+_executor = None
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        ctx = multiprocessing.get_context("spawn")
+        _executor = ProcessPoolExecutor(max_workers=1, mp_context=ctx)
+    return _executor
+
+def submit_plan(*args, **kwargs):
+    # Called from script threads: the worker may be (re)started by this submit
+    with app_main(): return get_executor().submit(plan_trajectory, *args, **kwargs)
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,229 @@
+import os
+import sys
+import json
+import time
+import numpy as np
+import config
+from kinematics import collision_mask, jacobian, manipulability, model_hash
+
+# --- REACHABILITY MAP ---
+# Offline voxel grid over the workspace. Each layer stores, per voxel, the best
+# manipulability seen for samples whose tool axis points in that layer's direction
+# (0 = never reached) and the joint configuration that achieved it (IK warm start).
+# Both arrays live in USER_DATA_DIR as .npy files and are opened memory-mapped.
+
+VOXEL_SIZE = 0.025 # m
+ORIENT_TOLERANCE_DEG = 25.0
+SAMPLE_COUNT = 1500000
+CHUNK_SIZE = 50000
+
+# Tool approach directions (tool Z axis in world). 'any' ignores orientation.
+LAYERS = [
+    ("any", None),
+    ("down", (0, 0, -1)),
+    ("up", (0, 0, 1)),
+    ("+x", (1, 0, 0)),
+    ("-x", (-1, 0, 0)),
+    ("+y", (0, 1, 0)),
+    ("-y", (0, -1, 0)),
+]
+
+
+def grid_bounds(model):
+    # Workspace box of the model: the tool is never further from the first joint than the
+    # sum of the link offsets after it (the first joint's position does not depend on q)
+    j0 = model.joint_links[0]
+    center = model.fk_single(np.zeros(model.n_joints), full=True)[j0][:3, 3]
+    reach = float(np.sum(np.linalg.norm(model.origins[j0 + 1:, :3, 3], axis=1))) + VOXEL_SIZE
+    return center - reach, center + reach
+
+
+def map_key(model, limits):
+    grid_min, grid_max = grid_bounds(model)
+    return model_hash(model, limits, f"{VOXEL_SIZE}{grid_min}{grid_max}{ORIENT_TOLERANCE_DEG}")
+
+
+def map_paths(key):
+    base = os.path.join(config.USER_DATA_DIR, f"reachability_{key}")
+    return base + "_manip.npy", base + "_seeds.npy", base + ".json"
+
+
+class ReachabilityMap:
+    def __init__(self, manip, seeds, meta):
+        self.manip = manip   # [layers, nx, ny, nz] float32
+        self.seeds = seeds   # [layers, nx, ny, nz, joints] float32, degrees
+        self.meta = meta
+        self.voxel = meta["voxel_size"]
+        self.grid_min = np.array(meta["grid_min"])
+        self.shape = np.array(self.manip.shape[1:])
+        self.layer_names = [name for name, _ in LAYERS]
+        self.layer_dirs = [np.array(d, dtype=float) if d is not None else None for _, d in LAYERS]
+        self.cos_tol = np.cos(np.radians(meta["orient_tolerance_deg"]))
+
+    # --- BUILD / LOAD ---
+    @classmethod
+    def load(cls, model, limits=None):
+        limits = config.JOINT_LIMITS if limits is None else limits
+        key = map_key(model, limits)
+        manip_path, seeds_path, meta_path = map_paths(key)
+        if not (os.path.exists(manip_path) and os.path.exists(seeds_path) and os.path.exists(meta_path)):
+            return None
+        try:
+            with open(meta_path, "r") as f: meta = json.load(f)
+            manip = np.load(manip_path, mmap_mode="r")
+            seeds = np.load(seeds_path, mmap_mode="r")
+            return cls(manip, seeds, meta)
+        except Exception as e:
+            print(f"[REACH] Could not load map: {e}")
+            return None
+
+    @classmethod
+    def build(cls, model, limits=None, samples=SAMPLE_COUNT, progress=None, seed=0):
+        limits = np.asarray(config.JOINT_LIMITS if limits is None else limits, dtype=float)[:model.n_joints]
+        key = map_key(model, limits)
+        manip_path, seeds_path, meta_path = map_paths(key)
+
+        grid_min, grid_max = grid_bounds(model)
+        shape = np.ceil((grid_max - grid_min) / VOXEL_SIZE).astype(int)
+        n_layers = len(LAYERS)
+        flat = int(np.prod(shape))
+        best = np.zeros((n_layers, flat), dtype=np.float32)
+        seeds = np.zeros((n_layers, flat, model.n_joints), dtype=np.float32)
+        dirs = np.array([d if d is not None else (0, 0, 0) for _, d in LAYERS], dtype=float)
+        cos_tol = np.cos(np.radians(ORIENT_TOLERANCE_DEG))
+
+        rng = np.random.default_rng(seed)
+        t0 = time.time()
+        done = 0
+        while done < samples:
+            n = min(CHUNK_SIZE, samples - done)
+            q_deg = rng.uniform(limits[:, 0], limits[:, 1], size=(n, model.n_joints))
+            q_rad = np.radians(q_deg)
+            frames = model.fk(q_rad, full=True)
+            ok = ~collision_mask(frames, z_offset=config.ROBOT_Z_OFFSET)
+            frames, q_deg, q_rad = frames[ok], q_deg[ok], q_rad[ok]
+
+            pos = frames[:, -1, :3, 3]
+            idx3 = np.floor((pos - grid_min) / VOXEL_SIZE).astype(int)
+            inside = np.all((idx3 >= 0) & (idx3 < shape), axis=1)
+            frames, q_deg, q_rad, idx3 = frames[inside], q_deg[inside], q_rad[inside], idx3[inside]
+            vox = np.ravel_multi_index(idx3.T, shape)
+
+            w = manipulability(jacobian(model, q_rad, frames)).astype(np.float32)
+            w = np.maximum(w, 1e-9) # reached, even if singular
+            tool_z = frames[:, -1, :3, 2]
+            aligned = (tool_z @ dirs.T) >= cos_tol
+            aligned[:, 0] = True
+
+            for layer in range(n_layers):
+                sel = aligned[:, layer]
+                if not np.any(sel): continue
+                v, wl, ql = vox[sel], w[sel], q_deg[sel]
+                # Keep the best sample per voxel: sort by score, last write wins
+                order = np.argsort(wl)
+                v, wl, ql = v[order], wl[order], ql[order]
+                better = wl > best[layer, v]
+                v, wl, ql = v[better], wl[better], ql[better]
+                best[layer, v] = wl
+                seeds[layer, v] = ql
+
+            done += n
+            if progress: progress(done / samples)
+
+        best = best.reshape((n_layers,) + tuple(shape))
+        seeds = seeds.reshape((n_layers,) + tuple(shape) + (model.n_joints,))
+
+        out_manip = np.lib.format.open_memmap(manip_path, mode="w+", dtype=np.float32, shape=best.shape)
+        out_manip[:] = best
+        out_manip.flush()
+        out_seeds = np.lib.format.open_memmap(seeds_path, mode="w+", dtype=np.float32, shape=seeds.shape)
+        out_seeds[:] = seeds
+        out_seeds.flush()
+        del out_manip, out_seeds
+
+        meta = {
+            "voxel_size": VOXEL_SIZE,
+            "grid_min": grid_min.tolist(),
+            "grid_max": grid_max.tolist(),
+            "orient_tolerance_deg": ORIENT_TOLERANCE_DEG,
+            "samples": int(samples),
+            "layers": [name for name, _ in LAYERS],
+            "build_seconds": round(time.time() - t0, 2),
+        }
+        with open(meta_path, "w") as f: json.dump(meta, f, indent=2)
+        print(f"[REACH] Map built in {meta['build_seconds']}s -> {os.path.basename(manip_path)}")
+        return cls.load(model, limits)
+
+    @classmethod
+    def load_or_build(cls, model, limits=None, progress=None):
+        reach = cls.load(model, limits)
+        if reach is None: reach = cls.build(model, limits, progress=progress)
+        return reach
+
+    # --- QUERIES ---
+    def _voxel_index(self, pos_m):
+        idx = np.floor((np.asarray(pos_m, dtype=float) - self.grid_min) / self.voxel).astype(int)
+        if np.any(idx < 0) or np.any(idx >= self.shape): return None
+        return idx
+
+    def layer_for(self, target_orient):
+        # Best matching layer for a rotation matrix; 'any' when no direction is close enough
+        if target_orient is None: return 0
+        tool_z = np.asarray(target_orient)[:3, 2]
+        best_layer, best_cos = 0, self.cos_tol
+        for layer, d in enumerate(self.layer_dirs):
+            if d is None: continue
+            c = float(tool_z @ d)
+            if c >= best_cos: best_layer, best_cos = layer, c
+        return best_layer
+
+    def _neighbourhood(self, layer, idx):
+        lo = np.maximum(idx - 1, 0)
+        hi = np.minimum(idx + 2, self.shape)
+        return lo, hi, self.manip[layer, lo[0]:hi[0], lo[1]:hi[1], lo[2]:hi[2]]
+
+    def is_reachable(self, pos_m, target_orient=None):
+        # Conservative: a target is only rejected when its voxel and all neighbours are empty
+        idx = self._voxel_index(pos_m)
+        if idx is None: return False
+        _, _, block = self._neighbourhood(self.layer_for(target_orient), idx)
+        return bool(np.any(block > 0))
+
+    def manipulability_at(self, pos_m, target_orient=None):
+        idx = self._voxel_index(pos_m)
+        if idx is None: return 0.0
+        return float(self.manip[(self.layer_for(target_orient),) + tuple(idx)])
+
+    def seed_for(self, pos_m, target_orient=None):
+        # Joint configuration (deg) of the best sample in or around the target voxel
+        idx = self._voxel_index(pos_m)
+        if idx is None: return None
+        layer = self.layer_for(target_orient)
+        if self.manip[(layer,) + tuple(idx)] > 0:
+            return [float(v) for v in self.seeds[(layer,) + tuple(idx)]]
+        lo, _, block = self._neighbourhood(layer, idx)
+        if not np.any(block > 0): return None
+        local = np.unravel_index(int(np.argmax(block)), block.shape)
+        best = lo + np.array(local)
+        return [float(v) for v in self.seeds[(layer,) + tuple(best)]]
+
+    def heatmap_points(self, layer=0, stride=1):
+        # Voxel centers + manipulability for every reachable voxel in a layer
+        grid = np.asarray(self.manip[layer, ::stride, ::stride, ::stride])
+        idx = np.argwhere(grid > 0)
+        centers = self.grid_min + (idx * stride + 0.5) * self.voxel
+        return centers, grid[grid > 0]
+
+
+if __name__ == "__main__":
+    # Offline generation: python reachability.py
+    import warnings
+    warnings.filterwarnings("ignore")
+    from visualizer import RobotVisualizer
+    chain = RobotVisualizer().load_chain()
+    if chain is None: sys.exit("URDF not found")
+    from kinematics import KinematicModel
+    model = KinematicModel.from_chain(chain)
+
+    def report(frac): print(f"\r[REACH] {frac * 100:5.1f}%", end="", flush=True)
+    ReachabilityMap.build(model, progress=report)
@@ -0,0 +1,102 @@
+import time
+import queue
+import threading
+import config
+from telemetry import TelemetryReader
+
+# --- TELEMETRY REPLAY ---
+# Plays a recording back through the GUI's joint queue, i.e. the same path live
+# robot data takes into RobotVisualizer (trace, collision check, joint panel).
+# The playback clock runs at 1x-100x; each frame looks up the sample at the clock
+# time with a binary search on the memory-mapped chunks, so samples between frames
+# are skipped and opening a multi-hour recording reads nothing up front.
+
+FRAME_S = 1.0 / 30.0
+MIN_SPEED = 1.0
+MAX_SPEED = 100.0
+
+
+class TelemetryPlayer:
+    def __init__(self, directory, ctx, on_finished=None):
+        self.reader = TelemetryReader(directory)
+        self.ctx = ctx
+        self.on_finished = on_finished
+        self.n_joints = self.reader.info.get("joint_count", config.JOINT_COUNT)
+        self.speed = MIN_SPEED
+        self.position = self.reader.t_start
+        self.playing = False
+        self.sample = None
+        self._running = False
+        self._thread = None
+
+        model = self.reader.info.get("model")
+        if model and model != config.ACTIVE_MODEL:
+            self.ctx.log_queue.put(f"[REPLAY] Recorded on a {model}, showing it on the {config.ACTIVE_MODEL}")
+
+    @property
+    def duration(self): return self.reader.t_end - self.reader.t_start
+
+    @property
+    def elapsed(self): return self.position - self.reader.t_start
+
+    def __len__(self): return len(self.reader)
+
+    # --- CONTROLS ---
+    def play(self):
+        if len(self.reader) == 0: return
+        if self.position >= self.reader.t_end: self.position = self.reader.t_start
+        self.playing = True
+        if self._thread is None or not self._thread.is_alive():
+            self._running = True
+            self._thread = threading.Thread(target=self._loop, daemon=True)
+            self._thread.start()
+
+    def pause(self):
+        self.playing = False
+
+    def stop(self):
+        self.playing = False
+        self._running = False
+        if self._thread is not None: self._thread.join(timeout=1.0)
+
+    def seek(self, elapsed):
+        # Jump to a time offset (s) from the start of the recording
+        self.position = min(max(self.reader.t_start + elapsed, self.reader.t_start), self.reader.t_end)
+        self._push_frame()
+
+    def set_speed(self, speed):
+        self.speed = min(max(float(speed), MIN_SPEED), MAX_SPEED)
+
+    # --- PLAYBACK ---
+    def sample_at(self, t):
+        # Last sample at or before t
+        i = self.reader.index_at(t)
+        if i >= len(self.reader) or (i > 0 and self.reader.rows(i, i + 1)[0]["t"] > t): i -= 1
+        rows = self.reader.rows(max(i, 0), max(i, 0) + 1)
+        return rows[0] if len(rows) else None
+
+    def _push_frame(self):
+        sample = self.sample_at(self.position)
+        if sample is None: return
+        self.sample = sample
+        joints = [float(j) for j in sample["joints"][:self.n_joints]]
+        try: self.ctx.joint_queue.put_nowait(joints)
+        except queue.Full:
+            # Latest frame wins
+            try: self.ctx.joint_queue.get_nowait()
+            except queue.Empty: pass
+            try: self.ctx.joint_queue.put_nowait(joints)
+            except queue.Full: pass
+
+    def _loop(self):
+        last = time.time()
+        while self._running:
+            time.sleep(FRAME_S)
+            now = time.time()
+            dt, last = now - last, now
+            if not self.playing: continue
+            self.position = min(self.position + dt * self.speed, self.reader.t_end)
+            self._push_frame()
+            if self.position >= self.reader.t_end:
+                self.playing = False
+                if self.on_finished: self.on_finished()
@@ -4,7 +4,14 @@ import sys
 import threading
 import numpy as np
 import config
-from utils import normalize_angles, rpy_to_matrix
+import planner
+from utils import normalize_angles, rpy_to_matrix, matrix_to_rpy, slerp
+from kinematics import KinematicModel, dls_solve, dls_solve_batch, conditioning, flagged_runs, clip_to_bounds
+from ik_pool import IKPool
+from telemetry import TelemetryRecorder
+import drawing
+import paths
+from timing import time_parameterize, densify
 
 try:
     from xarm.wrapper import XArmAPI as RealXArmAPI
@@ -15,40 +22,68 @@ except ImportError:
 GLOBAL_API_INSTANCE = None 
 
 class SimXArmAPI:
-    def __init__(self, ctx, chain):
+    def __init__(self, ctx, chain, compiled=None):
         global GLOBAL_API_INSTANCE
         GLOBAL_API_INSTANCE = self
         
         self.ctx = ctx
         self.chain = chain 
-        self.joints_deg = [0.0] * 6
+        if compiled is not None: self.model = compiled.model
+        else: self.model = KinematicModel.from_chain(chain) if chain is not None else None
+        self.joints_deg = [0.0] * config.JOINT_COUNT
         self.speed_multiplier = 1.0
         self.last_rpy = [180, 0, 0]
         self.real_arm = None
+        self.tool_offset = 0.0
+        self.reach_map = None
+        self.seed_index = None
+        self.ik_pool = None
         
         # Monitor & Data
         self._monitor_running = False
         self._monitor_thread = None
         self.last_error_code = 0
         self.real_xyz = [0.0, 0.0, 0.0]
+        self.robot_ip = None
+        self.recorder = None
+        self.cmd_seq = 0
+        self.last_cmd_t = 0.0
+        self.timeline = None # Timeline capturing the current run, if any
+        self._blend = None # (corner m, orient, speed) of a blended move awaiting the next one
+        self.path_stats = {"moves": 0, "solves": 0, "uniform": 0} # Cartesian IK solves vs fixed 5 mm steps
 
         self._update_gui()
 
+    def set_model(self, chain, compiled):
+        # Robot model switched in the GUI: drop everything tied to the old chain
+        self.chain = chain
+        self.model = compiled.model
+        self.joints_deg = [0.0] * config.JOINT_COUNT
+        self.reach_map = None
+        self.seed_index = None
+        if self.ik_pool is not None:
+            self.ik_pool.shutdown()
+            self.ik_pool = None
+        self._update_gui()
+
     @property
     def is_connected(self):
-        if self.real_arm and HAS_REAL_SDK:
+        # Real SDK arm or the 'debug' mock
+        if self.real_arm:
             return self.real_arm.connected 
         return False
 
     def connect_real_robot(self, ip):
+        self.robot_ip = ip
         if ip.lower() in ["debug"]:
             self._log(f"[MOCK] Starting Virtual Connection...")
-            self.real_arm = MockXArmAPI(ip)
+            self.real_arm = MockXArmAPI(ip, self.model)
             
             self.joints_deg = list(self.real_arm._joints)
             self._update_gui()
-            self.last_rpy = self.real_arm._position[3:]
-            self.real_xyz = self.real_arm._position[:3]
+            pose = self.real_arm._position
+            self.last_rpy = pose[3:]
+            self.real_xyz = pose[:3]
             
             self._start_monitoring()
             return True, "Connected to MOCK"
@@ -70,7 +105,7 @@ class SimXArmAPI:
                 
                 code, angles = self.real_arm.get_servo_angle(is_radian=False)
                 if code == 0 and angles:
-                    self.joints_deg = list(angles)[:6]
+                    self.joints_deg = list(angles)[:config.JOINT_COUNT]
                     self._update_gui()
                 
                 code_pos, pos = self.real_arm.get_position(is_radian=False)
@@ -95,7 +130,7 @@ class SimXArmAPI:
             try:
                 code, angles = self.real_arm.get_servo_angle(is_radian=False)
                 if code == 0 and angles: 
-                    self.joints_deg = list(angles)[:6]
+                    self.joints_deg = list(angles)[:config.JOINT_COUNT]
                 
                 code, pos = self.real_arm.get_position(is_radian=False)
                 if code == 0 and pos:
@@ -115,16 +150,34 @@ class SimXArmAPI:
     def _start_monitoring(self):
         if self._monitor_running: return
         self._monitor_running = True
+        if config.TELEMETRY_RECORD and self.recorder is None:
+            try:
+                self.recorder = TelemetryRecorder(info={"model": config.ACTIVE_MODEL, "ip": self.robot_ip,
+                                                        "joint_count": config.JOINT_COUNT})
+                self._log(f"[TELEMETRY] Recording to {self.recorder.directory}")
+            except Exception as e:
+                self._log(f"[TELEMETRY] Recorder unavailable: {e}")
         self._monitor_thread = threading.Thread(target=self._monitor_loop, daemon=True)
         self._monitor_thread.start()
 
     def _stop_monitoring(self):
         self._monitor_running = False
+        if self._monitor_thread is not None: self._monitor_thread.join(timeout=1.0)
+        if self.recorder is not None:
+            self.recorder.close()
+            if self.recorder.dropped: self._log(f"[TELEMETRY] {self.recorder.dropped} samples dropped")
+            self.recorder = None
+
+    def _note_command(self):
+        # Motion command sent to the real arm (telemetry command timestamps)
+        self.cmd_seq += 1
+        self.last_cmd_t = time.time()
 
     def _monitor_loop(self):
         while self._monitor_running and self.is_connected:
             try:
                 code, codes = self.real_arm.get_err_warn_code()
+                if code != 0: codes = [self.last_error_code, 0]
                 if code == 0:
                     curr = codes[0]
                     if curr != 0 and curr != self.last_error_code:
@@ -135,8 +188,8 @@ class SimXArmAPI:
                         self.last_error_code = 0
 
                 code, angles = self.real_arm.get_servo_angle(is_radian=False)
-                if code == 0 and angles and len(angles) >= 6:
-                    self.joints_deg = list(angles)[:6]
+                if code == 0 and angles and len(angles) >= config.JOINT_COUNT:
+                    self.joints_deg = list(angles)[:config.JOINT_COUNT]
                     self._update_gui()
 
                 code_pos, pos = self.real_arm.get_position(is_radian=False)
@@ -144,6 +197,10 @@ class SimXArmAPI:
                     self.real_xyz = [pos[0], pos[1], pos[2]]
                     self.last_rpy = [pos[3], pos[4], pos[5]]
 
+                if self.recorder is not None:
+                    self.recorder.record(time.time(), self.joints_deg, self.real_xyz + self.last_rpy,
+                                         codes[0], codes[1], self.cmd_seq, self.last_cmd_t)
+
                 time.sleep(0.033)
             except Exception: 
                 time.sleep(0.5)
@@ -152,7 +209,7 @@ class SimXArmAPI:
         if not self.is_connected: return
         try:
             code, angles = self.real_arm.get_servo_angle(is_radian=False)
-            if code == 0 and angles: self.joints_deg = list(angles)[:6]
+            if code == 0 and angles: self.joints_deg = list(angles)[:config.JOINT_COUNT]
             
             code, pos = self.real_arm.get_position(is_radian=False)
             if code == 0 and pos: 
@@ -163,9 +220,14 @@ class SimXArmAPI:
         except: pass
 
     # COMMANDs
+    # Motions are generators that yield sleep times (s); the public calls drive them
+    # with time.sleep, AsyncXArmAPI drives the same steps with asyncio.sleep.
 
     def set_servo_angle(self, angle, speed=None, mvacc=None, is_radian=False, wait=True):
-        self._check_controls()
+        return self._run_blocking(self._servo_angle_steps(angle, speed, mvacc, is_radian, wait))
+
+    def _servo_angle_steps(self, angle, speed=None, mvacc=None, is_radian=False, wait=True):
+        yield from self._control_steps()
         
         if is_radian: target_deg = [math.degrees(a) for a in angle]
         else: target_deg = [float(a) for a in angle]
@@ -181,22 +243,27 @@ class SimXArmAPI:
 
         # Real Robot
         if self.is_connected:
+            self._note_command()
             self.real_arm.set_servo_angle(angle=safe_target, speed=speed, mvacc=mvacc, is_radian=False, wait=False)
-            if wait: self._wait_for_joints(safe_target)
+            if wait: yield from self._wait_for_joints_steps(safe_target)
             return 0
 
         # Simulator
+        yield from self._finish_blend_steps()
         max_diff = max([abs(t - c) for t, c in zip(safe_target, self.joints_deg)])
         calc_duration = max_diff / float(speed)
         
-        if wait: self._interpolated_move(safe_target, calc_duration)
+        if wait: yield from self._interpolated_move_steps(safe_target, calc_duration)
         else:
             self.joints_deg = safe_target
             self._update_gui()
         return 0
     
     def set_position(self, x=None, y=None, z=None, roll=None, pitch=None, yaw=None, speed=None, silent=False, **kwargs):
-        self._check_controls()
+        return self._run_blocking(self._position_steps(x, y, z, roll, pitch, yaw, speed, silent, **kwargs))
+
+    def _position_steps(self, x=None, y=None, z=None, roll=None, pitch=None, yaw=None, speed=None, silent=False, **kwargs):
+        yield from self._control_steps()
         
         if self.is_connected:
             cur_x, cur_y, cur_z = self.real_xyz
@@ -218,98 +285,428 @@ class SimXArmAPI:
 
         # Real Robot
         if self.is_connected:
+            # Preview the line on the model first: warn before the controller faults on a singularity
+            if config.SINGULARITY_CHECK and self.model is not None:
+                line = paths.line_points(np.array([cur_x, cur_y, cur_z]) / 1000.0, np.array([x, y, z]) / 1000.0)
+                self._check_singularity(self._solve_cartesian(line, rpy_to_matrix(roll, pitch, yaw), silent=True)["joints"])
             try:
+                self._note_command()
                 code = self.real_arm.set_position(x=x, y=y, z=z, roll=roll, pitch=pitch, yaw=yaw, 
                                            speed=speed, is_radian=False, wait=False, **kwargs)
                 if code == 9: 
                     self._log("[REAL ERROR] Kinematic Error (Code 9)")
                     return -2
                 
-                if wait: self._wait_for_position([x, y, z])
+                if wait: yield from self._wait_for_position_steps([x, y, z])
+            except SystemExit: raise
             except: pass
             return 0
             
         # Simulator
         if self.chain is None: return -1
-        
+
         start_pos = np.array([cur_x, cur_y, cur_z]) / 1000.0
         end_pos = np.array([x, y, z]) / 1000.0
-        dist = np.linalg.norm(end_pos - start_pos)
-        
-        steps = int(dist / 0.005) 
-        if steps < 5: steps = 5 
-        
+        target_orient = rpy_to_matrix(roll, pitch, yaw)
         if speed is None or speed <= 0: speed = 100
-        duration = dist * 1000 / float(speed) 
-        if duration < 0.1: duration = 0.1
-        dt = duration / steps
+        radius = kwargs.get('radius')
+        blend = radius is not None and radius > 0
 
-        xs = np.linspace(start_pos[0], end_pos[0], steps)
-        ys = np.linspace(start_pos[1], end_pos[1], steps)
-        zs = np.linspace(start_pos[2], end_pos[2], steps)
-        
-        target_orient = rpy_to_matrix(roll, pitch, yaw)
-        
-        curr_rads = [0] + [math.radians(j) for j in self.joints_deg] + [0]
-        if len(curr_rads) < len(self.chain.links): curr_rads += [0] * (len(self.chain.links) - len(curr_rads))
-        curr_rads = curr_rads[:len(self.chain.links)]
-        
-        if not wait:
-            final = self._solve_ik(end_pos, target_orient, curr_rads)
+        if not wait and not blend:
+            yield from self._finish_blend_steps()
+            final = self._solve_ik_jump(end_pos, target_orient)
             if final:
                 self.joints_deg = final
                 self._update_gui()
             else:
                 if not silent: self._log("[SIM IK FAIL] Unreachable")
+            return 0
+
+        # Blending (radius > 0): like the controller, stop short of the corner and round it
+        # off into the next Cartesian move
+        if self._blend is not None:
+            corner = self._blend[0]
+            self._blend = None
+            exit_pt = paths.trim_end(end_pos, corner, np.linalg.norm(corner - start_pos))
+            points = [paths.blend_points(start_pos, corner, exit_pt)]
+            line_start = exit_pt
         else:
-            for i in range(steps):
-                self._check_controls()
-                waypoint = [xs[i], ys[i], zs[i]]
-                new_j = self._solve_ik(waypoint, target_orient, curr_rads)
-                if new_j:
-                    self.joints_deg = new_j
-                    self._update_gui()
-                    curr_rads = [0] + [math.radians(j) for j in new_j] + [0]
-                    if len(curr_rads) < len(self.chain.links): curr_rads += [0] * (len(self.chain.links) - len(curr_rads))
-                    curr_rads = curr_rads[:len(self.chain.links)]
-                time.sleep(dt)
+            points, line_start = [], start_pos
+        line_end = end_pos
+        if blend:
+            line_end = paths.trim_end(line_start, end_pos, radius / 1000.0)
+            self._blend = (end_pos, target_orient, speed)
+        # Enough waypoints for the orientation change too (short moves with a big wrist turn)
+        turn = math.degrees(_rotation_between(self._current_orient(), target_orient)[1])
+        points.append(paths.line_points(line_start, line_end, min_points=int(turn / paths.ROT_STEP_DEG)))
+        yield from self._cartesian_steps(np.vstack(points), target_orient, speed, silent)
+        # wait=True returns at the end point like on the controller: only wait=False leaves the corner open
+        if wait: yield from self._finish_blend_steps()
+        return 0
+
+    def move_circle(self, pose1, pose2, percent, speed=None, mvacc=None, mvtime=None, is_radian=False, wait=True, **kwargs):
+        return self._run_blocking(self._move_circle_steps(pose1, pose2, percent, speed, mvacc, mvtime, is_radian, wait, **kwargs))
+
+    def _move_circle_steps(self, pose1, pose2, percent, speed=None, mvacc=None, mvtime=None, is_radian=False, wait=True, **kwargs):
+        # Circle through the current position, pose1 and pose2; percent of the full circle
+        yield from self._control_steps()
+        pose1, pose2 = [float(v) for v in pose1], [float(v) for v in pose2]
+        if is_radian:
+            pose1[3:] = [math.degrees(a) for a in pose1[3:6]]
+            pose2[3:] = [math.degrees(a) for a in pose2[3:6]]
+        cur = np.array(self.real_xyz if self.is_connected else self._get_current_fk_position(), dtype=float)
+        points = paths.circle_points(cur / 1000.0, np.array(pose1[:3]) / 1000.0, np.array(pose2[:3]) / 1000.0, percent)
+        if points is None:
+            self._log("[MOVE] Circle points are collinear")
+            return -2
+        self._log(f"[MOVE] Circle {percent:.0f}% through: x={pose1[0]:.0f} y={pose1[1]:.0f} z={pose1[2]:.0f}")
+        self.last_rpy = pose2[3:6]
+
+        # Real Robot
+        if self.is_connected:
+            try:
+                self._note_command()
+                code = self.real_arm.move_circle(pose1, pose2, percent, speed=speed, mvacc=mvacc, mvtime=mvtime,
+                                                 is_radian=False, wait=False, **kwargs)
+                if code == 9:
+                    self._log("[REAL ERROR] Kinematic Error (Code 9)")
+                    return -2
+                if wait: yield from self._wait_for_position_steps((points[-1] * 1000.0).tolist())
+            except SystemExit: raise
+            except: pass
+            return 0
+
+        # Simulator
+        if self.chain is None: return -1
+        yield from self._finish_blend_steps()
+        if speed is None or speed <= 0: speed = 100
+        yield from self._cartesian_steps(points, rpy_to_matrix(*pose2[3:6]), speed)
         return 0
 
+    def _cartesian_steps(self, points, target_orient, speed, silent=False):
+        # Sim execution of a Cartesian waypoint array (m) ending in target_orient, timed at
+        # 'speed' mm/s (deg/s for a pure re-orientation) within the joint limits
+        path = self._solve_cartesian(points, target_orient, speed, silent)
+        times = path["times"]
+        if times[-1] < 0.1: times = times * (0.1 / max(times[-1], 1e-9))
+        prev = 0.0
+        for t, joints in zip(times, path["joints"]):
+            yield from self._control_steps()
+            if joints:
+                self.joints_deg = joints
+                self._update_gui()
+            yield t - prev
+            prev = t
+
+    def _solve_cartesian(self, points, target_orient, speed=None, silent=False):
+        # Joints for a Cartesian waypoint array (m) from the current pose: the orientation is
+        # SLERPed from the current one along the path length, the joints are solved (adaptively
+        # or one batched pass per waypoint) and checked for singularities. With a speed the
+        # path is also timed. Returns {"s", "joints" (None = unreachable), "times"}.
+        start = np.array(self._get_current_fk_position()) / 1000.0
+        R0 = self._current_orient()
+        seg = np.linalg.norm(np.diff(np.vstack([start, points]), axis=0), axis=1)
+        length = float(np.sum(seg)) * 1000.0
+        if length > 1e-3: frac = np.cumsum(seg) * 1000.0 / length
+        else: frac = np.arange(1, len(points) + 1) / len(points)
+
+        if config.PATH_ADAPTIVE:
+            frac, solutions, solved, solves = self._solve_ik_adaptive(np.vstack([start, points]),
+                                                                      np.concatenate([[0.0], frac]), R0, target_orient)
+        else:
+            solutions = self._solve_ik_path(points, slerp(R0, target_orient, frac), self.joints_deg)
+            solved = np.ones(len(points), dtype=bool)
+            solves = len(points)
+        if not self.is_connected:
+            self.path_stats["moves"] += 1
+            self.path_stats["solves"] += solves
+            self.path_stats["uniform"] += len(points)
+        failed = sum(1 for q in solutions if q is None)
+        if failed and not silent: self._log(f"[SIM IK FAIL] {failed}/{len(solutions)} waypoints unreachable")
+        if not silent: self._check_singularity(solutions)
+
+        path = {"s": np.asarray(frac), "joints": solutions, "times": None}
+        if speed is None: return path
+        # Timing: speed along the path, slowed wherever the joints would exceed their limits
+        if length <= 1e-3: length = math.degrees(_rotation_between(R0, target_orient)[1])
+        path["times"] = self._time_path(solutions, solved, path["s"] * length, speed)
+        nominal = trapezoid(length, float(speed), config.TCP_ACC_LIMIT)[0]
+        if not silent and path["times"][-1] > 1.1 * nominal + 0.05:
+            self._log(f"[SIM] Joint limits slow this move: {nominal:.2f}s -> {path['times'][-1]:.2f}s")
+        return path
+
+    def _check_singularity(self, solutions):
+        # Manipulability / condition number of every sample of a solved path in one pass; logs
+        # each near-singular stretch before it is executed. Returns the flagged (start, end) runs.
+        if not config.SINGULARITY_CHECK or self.model is None: return []
+        idx = np.array([i for i, q in enumerate(solutions) if q is not None])
+        if not len(idx): return []
+        manip, cond, weak = conditioning(self.model, np.radians([solutions[i] for i in idx]))
+        flags = np.zeros(len(solutions), dtype=bool)
+        flags[idx] = (manip < config.SINGULARITY_MANIP_MIN) | (cond > config.SINGULARITY_COND_MAX)
+        runs = flagged_runs(flags)
+        n = len(solutions)
+        for a, b in runs:
+            rows = (idx >= a) & (idx < b)
+            worst = np.argmin(manip[rows])
+            joints = "/".join(f"J{j + 1}" for j in np.argsort(-np.abs(weak[rows][worst]))[:2])
+            self._log(f"[SINGULARITY] {100 * a / n:.0f}-{100 * b / n:.0f}% of the move: manipulability "
+                      f"{manip[rows][worst]:.1e}, condition {cond[rows][worst]:.0f} (around {joints})")
+        return runs
+
+    def _time_path(self, solutions, solved, s, speed):
+        # Timing law (s since the move started) for the waypoints, starting from the current joints.
+        # Computed on a dense smooth curve through the IK-solved ones (interpolated waypoints
+        # would add artificial joint-space corners); unreachable waypoints hold the previous joints
+        q = [np.array(self.joints_deg, dtype=float)]
+        for joints in solutions:
+            step = _wrap_deg(np.array(joints) - q[-1]) if joints else np.zeros(len(q[-1]))
+            q.append(q[-1] + step)
+        keep = np.concatenate([[True], np.asarray(solved, dtype=bool)])
+        keep[-1] = True
+        s = np.concatenate([[0.0], s])
+        q_dense, s_dense = densify(np.array(q)[keep], s[keep])
+        t = time_parameterize(q_dense, s_dense, v_path=float(speed), a_path=config.TCP_ACC_LIMIT)
+        return np.interp(s, s_dense, t)[1:]
+
+    def _solve_ik_adaptive(self, polyline, frac, R0, R1):
+        # Adaptive subdivision of a Cartesian path. polyline [M+1, 3] m starts at the current
+        # position, frac [M+1] is its path parameter (0..1). IK is solved on a coarse grid, then
+        # every interval whose midpoint solution deviates from straight joint interpolation by
+        # more than PATH_JOINT_TOL is split, down to PATH_MIN_STEP. Each refinement level is one
+        # batched IK pass. Returns (s, joints or None, solved mask, IK solves) on the polyline
+        # parameters plus any finer nodes, with the joints between nodes interpolated.
+        length = float(np.sum(np.linalg.norm(np.diff(polyline, axis=0), axis=1)))
+        turn = math.degrees(_rotation_between(R0, R1)[1])
+        n0 = max(1, int(math.ceil(length / config.PATH_COARSE_STEP)), int(math.ceil(turn / 30.0)))
+        min_ds = config.PATH_MIN_STEP / length if length > 1e-6 else 1.0 / (4 * len(frac))
+
+        def pose(s):
+            pos = np.stack([np.interp(s, frac, polyline[:, d]) for d in range(3)], axis=1)
+            return pos, slerp(R0, R1, s)
+
+        nodes = {0.0: np.array(self.joints_deg, dtype=float)}
+        s0 = np.linspace(0.0, 1.0, n0 + 1)
+        for s, q in zip(s0[1:], self._solve_ik_path(*pose(s0[1:]), self.joints_deg)):
+            nodes[float(s)] = None if q is None else np.array(q)
+        solves = n0
+
+        pending = list(zip(s0[:-1].tolist(), s0[1:].tolist()))
+        while pending:
+            mids = np.array([(a + b) / 2 for a, b in pending])
+            seeds = []
+            for a, b in pending:
+                qa, qb = nodes[a], nodes[b]
+                if qa is not None and qb is not None: seeds.append(qa + _wrap_deg(qb - qa) / 2)
+                else: seeds.append(qa if qa is not None else qb if qb is not None else nodes[0.0])
+            q_mid = self._solve_ik_rows(*pose(mids), seeds)
+            solves += len(mids)
+            refine = []
+            for (a, b), m, qm in zip(pending, mids.tolist(), q_mid):
+                nodes[m] = None if qm is None else np.array(qm)
+                if b - a <= 2 * min_ds: continue
+                qa, qb = nodes[a], nodes[b]
+                if qa is None or qb is None or qm is None:
+                    # Narrow down the edge of an unreachable stretch, skip fully unreachable ones
+                    if not (qa is None and qb is None and qm is None): refine += [(a, m), (m, b)]
+                    continue
+                err = np.max(np.abs(_wrap_deg(qm - (qa + _wrap_deg(qb - qa) / 2))))
+                if err > config.PATH_JOINT_TOL: refine += [(a, m), (m, b)]
+            pending = refine
+
+        # Joints on the playback grid: solved nodes as they are, everything else interpolated
+        # linearly in joint space between the surrounding nodes (None next to a failed node)
+        keys = sorted(nodes)
+        S = np.array(keys)
+        ok = np.array([nodes[k] is not None for k in keys])
+        Q = np.array([nodes[k] if nodes[k] is not None else np.zeros(len(self.joints_deg)) for k in keys])
+        for i in range(1, len(Q)): Q[i] = Q[i - 1] + _wrap_deg(Q[i] - Q[i - 1]) # Unwrap
+        near = np.isclose(frac[1:, None], S[None, 1:], rtol=0.0, atol=1e-9).any(axis=1)
+        grid = np.union1d(frac[1:][~near], S[1:])
+        idx = np.clip(np.searchsorted(S, grid), 1, len(S) - 1)
+        w = ((grid - S[idx - 1]) / (S[idx] - S[idx - 1]))[:, None]
+        q = Q[idx - 1] + (Q[idx] - Q[idx - 1]) * w
+        exact = np.isclose(grid, S[idx], rtol=0.0, atol=1e-9)
+        valid = exact & ok[idx] | ok[idx - 1] & ok[idx]
+        out = [normalize_angles(row.tolist()) if v else None for row, v in zip(q, valid)]
+        return grid, out, exact, solves
+
+    def _solve_ik_rows(self, positions, orients, seeds_deg):
+        # Independent targets with their own seeds (deg) in one batched DLS pass; rows that
+        # fail or leave the limits fall back to the seeded solvers (no process pool per waypoint)
+        q, ok = dls_solve_batch(self.model, np.radians(np.array(seeds_deg)), positions, orients)
+        deg = np.degrees(q)
+        out = []
+        for i in range(len(positions)):
+            cand = normalize_angles(deg[i].tolist()) if ok[i] else None
+            if cand is not None and not self._within_limits(cand): cand = None
+            if cand is None:
+                seed = list(seeds_deg[i])
+                cand = self._solve_ik_incremental(positions[i], orients[i], seed) or \
+                       self._solve_ik_seeded(positions[i], orients[i], self._to_chain_vector(seed))
+            out.append(cand)
+        return out
+
+    def path_stats_summary(self):
+        s = self.path_stats
+        if not s["moves"]: return None
+        saved = 100.0 * (1.0 - s["solves"] / max(s["uniform"], 1))
+        return f"[PATH] {s['moves']} Cartesian moves: {s['solves']} IK solves instead of {s['uniform']} ({saved:.0f}% saved)"
+
+    def _current_orient(self):
+        return self.model.fk_single(np.radians(self.joints_deg))[:3, :3]
+
+    def _finish_blend_steps(self):
+        # A blended move is only finished by the next Cartesian move; anything else (or the
+        # end of the script) first completes it to its corner
+        if self._blend is None or self.is_connected: return
+        corner, orient, speed = self._blend
+        self._blend = None
+        start = np.array(self._get_current_fk_position()) / 1000.0
+        yield from self._cartesian_steps(paths.line_points(start, corner), orient, speed, silent=True)
+
+    def plan_servo_angle(self, angle, speed=None, is_radian=False, time_budget=None, obstacles=None, wait=True):
+        return self._run_blocking(self._plan_servo_steps(angle, speed, is_radian, time_budget, obstacles, wait))
+
+    def _plan_servo_steps(self, angle, speed=None, is_radian=False, time_budget=None, obstacles=None, wait=True):
+        yield from self._control_steps()
+        if self.model is None: return -1
+
+        if is_radian: target_deg = [math.degrees(a) for a in angle]
+        else: target_deg = [float(a) for a in angle]
+        if speed is None or speed <= 0: speed = 50
+        if time_budget is None: time_budget = config.PLANNER_TIME_BUDGET
+        if obstacles is None: obstacles = config.SCENE_OBSTACLES
+        yield from self._finish_blend_steps()
+
+        # Obstacles are configured in mm, the planner works in meters
+        boxes = [(np.array(lo) / 1000.0, np.array(hi) / 1000.0) for lo, hi in obstacles]
+
+        self._log(f"[PLAN] Planning around {len(boxes)} obstacle(s)...")
+        future = planner.submit_plan(self.model, config.JOINT_LIMITS, list(self.joints_deg), target_deg,
+                                     obstacles=boxes, tool_offset=self.tool_offset, z_offset=config.ROBOT_Z_OFFSET,
+                                     time_budget=time_budget, speed_deg_s=speed)
+        yield from self._wait_plan_steps(future)
+
+        result = future.result()
+        if not result["ok"]:
+            self._log(f"[PLAN FAIL] {result['status']} ({result['elapsed']:.2f}s)")
+            return -2
+
+        self._log(f"[PLAN] {result['status']}: {len(result['waypoints'])} waypoints in {result['elapsed']:.2f}s")
+        self._check_singularity([list(q) for q in result["trajectory"]])
+
+        # wait=False: the controller queues the waypoints, the sim jumps to the goal like set_servo_angle
+        if self.is_connected:
+            for wp in result["waypoints"][1:]:
+                yield from self._servo_angle_steps(list(wp), speed=speed, wait=wait)
+            return 0
+
+        if wait: yield from self._execute_trajectory_steps(result["trajectory"], result["times"])
+        else:
+            self.joints_deg = normalize_angles(result["trajectory"][-1].tolist())
+            self._update_gui()
+        return 0
+
+    def _wait_plan_steps(self, future):
+        while not future.done():
+            yield from self._control_steps()
+            yield 0.02
+
+    def plan_position(self, x=None, y=None, z=None, roll=None, pitch=None, yaw=None, speed=None, **kwargs):
+        return self._run_blocking(self._plan_position_steps(x, y, z, roll, pitch, yaw, speed, **kwargs))
+
+    def _plan_position_steps(self, x=None, y=None, z=None, roll=None, pitch=None, yaw=None, speed=None, **kwargs):
+        yield from self._control_steps()
+        if self.chain is None: return -1
+
+        cur_x, cur_y, cur_z = self.real_xyz if self.is_connected else self._get_current_fk_position()
+        if x is None: x = cur_x
+        if y is None: y = cur_y
+        if z is None: z = cur_z
+        if roll is None: roll = self.last_rpy[0]
+        if pitch is None: pitch = self.last_rpy[1]
+        if yaw is None: yaw = self.last_rpy[2]
+
+        goal = self._solve_ik(np.array([x, y, z]) / 1000.0, rpy_to_matrix(roll, pitch, yaw), self._to_chain_vector(self.joints_deg))
+        if not goal:
+            self._log("[PLAN FAIL] Target pose unreachable")
+            return -2
+
+        self.last_rpy = [roll, pitch, yaw]
+        return (yield from self._plan_servo_steps(goal, speed=speed, **kwargs))
+
+    def draw_file(self, path, speed=None, plane=None):
+        # Pen-plot a G-code (.gcode/.nc/.ngc) or SVG file on the drawing plane (config.DRAWING_PLANE)
+        return self._run_blocking(self._draw_file_steps(path, speed, plane))
+
+    def _draw_file_steps(self, path, speed=None, plane=None):
+        return (yield from drawing.draw_steps(self, path, plane, speed))
+
+    def _execute_joint_trajectory(self, trajectory, times):
+        self._run_blocking(self._execute_trajectory_steps(trajectory, times))
+
+    def _execute_trajectory_steps(self, trajectory, times):
+        eff_speed = max(0.01, self.speed_multiplier) * config.SIM_SPEED_FACTOR
+        prev_t = times[0]
+        for q, t in zip(trajectory[1:], times[1:]):
+            yield from self._control_steps()
+            self.joints_deg = normalize_angles(q.tolist())
+            self._update_gui()
+            yield (t - prev_t) / eff_speed
+            prev_t = t
+        self.joints_deg = normalize_angles(trajectory[-1].tolist())
+        self._update_gui()
+
     # HELPERS
+    def _run_blocking(self, steps):
+        try:
+            while True: time.sleep(next(steps))
+        except StopIteration as done:
+            return done.value
+
     def _wait_for_joints(self, target, tolerance=0.5):
+        self._run_blocking(self._wait_for_joints_steps(target, tolerance))
+
+    def _wait_for_joints_steps(self, target, tolerance=0.5):
         start = time.time()
         while self.is_connected:
-            self._check_controls()
+            yield from self._control_steps()
             diff = max([abs(a-b) for a, b in zip(self.joints_deg, target)])
             if diff < tolerance: break
             if time.time() - start > 15.0: break
-            time.sleep(0.05)
+            yield 0.05
 
     def _wait_for_position(self, target_xyz, tolerance=1.0):
+        self._run_blocking(self._wait_for_position_steps(target_xyz, tolerance))
+
+    def _wait_for_position_steps(self, target_xyz, tolerance=1.0):
         start = time.time()
         while self.is_connected:
-            self._check_controls()
+            yield from self._control_steps()
             cx, cy, cz = self.real_xyz
             dist = math.sqrt((cx - target_xyz[0])**2 + (cy - target_xyz[1])**2 + (cz - target_xyz[2])**2)
             if dist < tolerance: 
-                time.sleep(0.1)
+                yield 0.1
                 break
             if time.time() - start > 15.0: break
-            time.sleep(0.05)
+            yield 0.05
 
     def _solve_ik(self, target_pos, target_orient, initial_rads):
+        result = self._solve_ik_seeded(target_pos, target_orient, initial_rads)
+        if result is None: result = self._solve_ik_fallback(target_pos, target_orient, initial_rads)
+        return result
+
+    def _solve_ik_seeded(self, target_pos, target_orient, initial_rads):
         try:
             real_joints = self.chain.inverse_kinematics(
                 target_position=target_pos,
                 target_orientation=target_orient, 
                 orientation_mode="all",
-                initial_position=initial_rads
+                initial_position=clip_to_bounds(self.chain, initial_rads)
             )
             if hasattr(real_joints, 'any') and np.isnan(real_joints).any(): return None
-            new_deg = []
-            for i in range(1, 7):
-                if i < len(real_joints): new_deg.append(math.degrees(real_joints[i]))
-                else: new_deg.append(0.0)
+            new_deg = [math.degrees(real_joints[i]) for i in self.model.joint_links]
             norm = normalize_angles(new_deg)
             for i, val in enumerate(norm):
                 if i < len(config.JOINT_LIMITS):
@@ -318,7 +715,134 @@ class SimXArmAPI:
             return norm
         except: return None
 
+    def _solve_ik_jump(self, target_pos, target_orient):
+        # IK for a direct jump to a target, possibly far from the current pose
+        if self.reach_map is not None and not self.reach_map.is_reachable(target_pos, target_orient): return None
+
+        curr_rads = self._to_chain_vector(self.joints_deg)
+        if self._is_big_jump(target_pos, target_orient):
+            if self.seed_index is not None:
+                seeds = [list(self.joints_deg)] + self.seed_index.query(target_pos, target_orient)
+                final = self._solve_ik_multi(target_pos, target_orient, seeds)
+                if final: return final
+        else:
+            # Small step (e.g. drag jog): Jacobian stepping from the current joints
+            final = self._solve_ik_incremental(target_pos, target_orient, self.joints_deg)
+            if final: return final
+
+        # ikpy returns its closest local minimum even when it misses: escalate unless it converged
+        final = self._solve_ik_seeded(target_pos, target_orient, curr_rads)
+        if final and self._ik_converged(final, target_pos, target_orient): return final
+        if self.reach_map is not None:
+            # Retry from the precomputed configuration closest to the target
+            seed = self.reach_map.seed_for(target_pos, target_orient)
+            if seed: final = self._solve_ik_seeded(target_pos, target_orient, self._to_chain_vector(seed))
+            if seed and final and self._ik_converged(final, target_pos, target_orient): return final
+        return self._solve_ik_fallback(target_pos, target_orient, curr_rads)
+
+    def _solve_ik_incremental(self, target_pos, target_orient, seed_deg):
+        # Damped-least-squares step for small moves; None means escalate to the full solver
+        if self.model is None: return None
+        q, ok = dls_solve(self.model, np.radians(seed_deg), target_pos, target_orient,
+                          min_manip=config.DLS_MIN_MANIPULABILITY)
+        if not ok: return None
+        norm = normalize_angles(np.degrees(q).tolist())
+        for i, val in enumerate(norm):
+            if i < len(config.JOINT_LIMITS):
+                min_l, max_l = config.JOINT_LIMITS[i]
+                if val < (min_l - 0.1) or val > (max_l + 0.1): return None
+        return norm
+
+    def _solve_ik_path(self, positions, orients, seed_deg):
+        # Waypoints [N, 3] m with [N, 3, 3] (or one [3, 3]) orientations -> joint solutions in
+        # degrees, None where unreachable. Each block is one batched DLS pass seeded from the
+        # previous solution; rows that fail, leave the limits or jump are re-solved in order
+        # from the previous solution (the process pool would cost its deadline per waypoint).
+        positions = np.asarray(positions, dtype=float)
+        orients = np.broadcast_to(np.asarray(orients, dtype=float), (len(positions), 3, 3))
+        block = config.PATH_IK_BLOCK
+        prev = list(seed_deg)
+        out = []
+        for s in range(0, len(positions), block):
+            pos, rot = positions[s:s + block], orients[s:s + block]
+            q, ok = dls_solve_batch(self.model, np.radians(prev), pos, rot)
+            deg = np.degrees(q)
+            for i in range(len(pos)):
+                cand = normalize_angles(deg[i].tolist()) if ok[i] else None
+                if cand is not None and (not self._within_limits(cand) or self._joint_step(cand, prev) > config.PATH_MAX_JOINT_STEP):
+                    cand = None
+                if cand is None:
+                    cand = self._solve_ik_incremental(pos[i], rot[i], prev) or self._solve_ik_seeded(pos[i], rot[i], self._to_chain_vector(prev))
+                out.append(cand)
+                if cand is not None: prev = cand
+        return out
+
+    def _within_limits(self, joints_deg):
+        for i, val in enumerate(joints_deg):
+            if i < len(config.JOINT_LIMITS):
+                min_l, max_l = config.JOINT_LIMITS[i]
+                if val < (min_l - 0.1) or val > (max_l + 0.1): return False
+        return True
+
+    @staticmethod
+    def _joint_step(a, b):
+        # Largest joint change between two configurations (deg, wrap-aware)
+        return max([abs((x - y + 180) % 360 - 180) for x, y in zip(a, b)] + [0.0])
+
+    def start_ik_pool(self):
+        # Create the fallback pool and spawn its workers in the background (model load), so
+        # the first fallback does not spend its deadline starting processes
+        if not config.IK_FALLBACK_ENABLED or self.chain is None or self.ik_pool is not None: return
+        self.ik_pool = IKPool(self.chain, config.JOINT_LIMITS)
+        self.ik_pool.warm_up_async()
+
+    def _solve_ik_fallback(self, target_pos, target_orient, initial_rads):
+        # Last tier: many seeds at once in the persistent IK process pool
+        if not config.IK_FALLBACK_ENABLED or self.chain is None: return None
+        if self.reach_map is not None and not self.reach_map.is_reachable(target_pos, target_orient): return None
+        self.start_ik_pool()
+
+        seeds = [list(initial_rads), self._to_chain_vector([0.0] * len(self.joints_deg))]
+        if self.seed_index is not None:
+            seeds += [self._to_chain_vector(s) for s in self.seed_index.query(target_pos, target_orient)]
+        if self.reach_map is not None:
+            seed = self.reach_map.seed_for(target_pos, target_orient)
+            if seed: seeds.append(self._to_chain_vector(seed))
+        rng = np.random.default_rng()
+        limits = np.array(config.JOINT_LIMITS, dtype=float)
+        while len(seeds) < config.IK_FALLBACK_SEEDS:
+            seeds.append(self._to_chain_vector(rng.uniform(limits[:, 0], limits[:, 1]).tolist()))
+
+        return self.ik_pool.solve_first_valid(target_pos, target_orient, seeds, deadline_s=config.IK_FALLBACK_DEADLINE)
+
+    def _solve_ik_multi(self, target_pos, target_orient, seeds_deg):
+        # Seeds in order (current joints first, then the nearest indexed poses); the first converged
+        # solution wins. ikpy holds the GIL, so solving them on threads would not be any faster
+        for seed in seeds_deg:
+            sol = self._solve_ik_seeded(target_pos, target_orient, self._to_chain_vector(seed))
+            if sol and self._ik_converged(sol, target_pos, target_orient): return sol
+        return None
+
+    def _ik_converged(self, joints_deg, target_pos, target_orient, pos_tol=0.001, rot_tol=0.02):
+        if self.model is None: return True
+        T = self.model.fk_deg(np.array(joints_deg))
+        if np.linalg.norm(T[:3, 3] - np.asarray(target_pos)) > pos_tol: return False
+        return np.max(np.abs(T[:3, :3] - np.asarray(target_orient))) < rot_tol
+
+    def _is_big_jump(self, target_pos, target_orient, dist_m=0.05, angle_deg=30.0):
+        if self.model is None: return False
+        T = self.model.fk_deg(np.array(self.joints_deg))
+        if np.linalg.norm(T[:3, 3] - np.asarray(target_pos)) > dist_m: return True
+        cos_angle = (np.trace(T[:3, :3].T @ np.asarray(target_orient)) - 1.0) / 2.0
+        return math.degrees(math.acos(max(-1.0, min(1.0, cos_angle)))) > angle_deg
+
+    def _to_chain_vector(self, joints_deg):
+        return self.model.full_vector([math.radians(j) for j in joints_deg]).tolist()
+
     def _interpolated_move(self, target_deg, duration):
+        self._run_blocking(self._interpolated_move_steps(target_deg, duration))
+
+    def _interpolated_move_steps(self, target_deg, duration):
         start_arr = np.array(self.joints_deg)
         end_arr = np.array(target_deg)
         eff_speed = max(0.01, self.speed_multiplier)
@@ -328,28 +852,30 @@ class SimXArmAPI:
         if steps < 1: steps = 1
         dt = real_dur / steps
         for i in range(1, steps + 1):
-            self._check_controls()
+            yield from self._control_steps()
             t = i / steps
             curr = start_arr + (end_arr - start_arr) * t
             self.joints_deg = normalize_angles(curr.tolist())
             self._update_gui()
-            time.sleep(dt)
+            yield dt
         self.joints_deg = normalize_angles(target_deg)
         self._update_gui()
 
     def _log(self, msg): self.ctx.log_queue.put(msg)
     def _update_gui(self): 
+        if self.timeline is not None: self.timeline.add(self.joints_deg)
         try: self.ctx.joint_queue.put_nowait(list(self.joints_deg))
         except: pass
     def _check_controls(self):
-        if self.ctx.stop_flag:
-            if self.real_arm: self.real_arm.set_state(4)
-            raise SystemExit("Stop")
+        self._run_blocking(self._control_steps())
+    def _control_steps(self):
+        if self.ctx.stop_flag: self._halt()
         while self.ctx.paused:
-            time.sleep(0.1)
-            if self.ctx.stop_flag: 
-                if self.real_arm: self.real_arm.set_state(4)
-                raise SystemExit("Stop")
+            yield 0.1
+            if self.ctx.stop_flag: self._halt()
+    def _halt(self):
+        if self.real_arm: self.real_arm.set_state(4)
+        raise SystemExit("Stop")
     def motion_enable(self, enable=True): 
         if self.real_arm: self.real_arm.motion_enable(enable=enable)
         return 0
@@ -366,35 +892,105 @@ class SimXArmAPI:
         if self.real_arm: self.real_arm.clean_error()
         return 0
     def disconnect(self): return 0
+    def get_servo_angle(self, is_radian=False):
+        if is_radian: return 0, [math.radians(j) for j in self.joints_deg]
+        return 0, list(self.joints_deg)
+    def get_position(self, is_radian=False):
+        x, y, z = self.real_xyz if self.is_connected else self._get_current_fk_position()
+        rpy = [math.radians(a) for a in self.last_rpy] if is_radian else list(self.last_rpy)
+        return 0, [float(x), float(y), float(z)] + rpy
     
     def _get_current_fk_position(self):
         if self.chain is None: return 0, 0, 0
-        current_rads = [0] + [math.radians(j) for j in self.joints_deg] + [0]
-        if len(current_rads) < len(self.chain.links):
-            current_rads += [0] * (len(self.chain.links) - len(current_rads))
-        current_rads = current_rads[:len(self.chain.links)]
-        matrix = self.chain.forward_kinematics(current_rads)
+        matrix = self.chain.forward_kinematics(self._to_chain_vector(self.joints_deg))
         return matrix[0, 3] * 1000.0, matrix[1, 3] * 1000.0, matrix[2, 3] * 1000.0
     
     def _emergency_home(self):
-        self.joints_deg = [0.0] * 6
+        self.joints_deg = [0.0] * config.JOINT_COUNT
         self._update_gui()
-        if self.is_connected: self.real_arm.set_servo_angle([0]*6, speed=30, wait=False)
+        if self.is_connected: self.real_arm.set_servo_angle([0]*config.JOINT_COUNT, speed=30, wait=False)
 
     # Mock robot for testing without Lite 6
+# Motion engine: commands queue like on the controller and are executed over time
+# with a trapezoidal velocity profile (speed / mvacc limits), joint moves in joint
+# space and set_position as a straight TCP line solved with DLS IK per tick. The
+# reported joints follow the profile through a first-order servo lag, and the
+# reported pose is always FK of the reported joints.
+
+MOCK_TICK_S = 0.005
+
+
+def trapezoid(distance, v_max, a_max):
+    # Returns (duration, s(t)) for a rest-to-rest move over distance
+    v_max, a_max = max(v_max, 1e-6), max(a_max, 1e-6)
+    if distance <= 0: return 0.0, lambda t: 0.0
+    if distance >= v_max * v_max / a_max:
+        ta = v_max / a_max
+        total = distance / v_max + ta
+    else:
+        ta = math.sqrt(distance / a_max)
+        v_max = a_max * ta
+        total = 2 * ta
+
+    def s(t):
+        if t <= 0: return 0.0
+        if t >= total: return distance
+        if t < ta: return 0.5 * a_max * t * t
+        if t < total - ta: return 0.5 * a_max * ta * ta + v_max * (t - ta)
+        return distance - 0.5 * a_max * (total - t) ** 2
+    return total, s
+
+
+def _wrap_deg(a):
+    return (np.asarray(a) + 180.0) % 360.0 - 180.0
+
+
+def _rotation_between(R0, R1):
+    # Axis and angle (rad) of R0.T @ R1
+    Rrel = R0.T @ R1
+    angle = math.acos(max(-1.0, min(1.0, (np.trace(Rrel) - 1.0) / 2.0)))
+    axis = np.array([Rrel[2, 1] - Rrel[1, 2], Rrel[0, 2] - Rrel[2, 0], Rrel[1, 0] - Rrel[0, 1]])
+    norm = np.linalg.norm(axis)
+    return (axis / norm if norm > 1e-9 else np.array([0.0, 0.0, 1.0])), angle
+
+
 class MockXArmAPI:
-    def __init__(self, ip):
+    def __init__(self, ip, model=None):
         print(f"[MOCK] Initializing Fake Robot at {ip}")
         self.connected = True
         self.has_error = False
         self.has_warn = False
-        
-        self._joints = [0.0, 0.0, 0.0, 0.0, 0.0, 0.0]
-        self._position = [200.0, 0.0, 150.0, 180.0, 0.0, 0.0] # XYZ RPY
+        self.model = model
+        self.servo_lag = config.MOCK_SERVO_LAG
+
+        n = config.JOINT_COUNT
+        self._cmd = [0.0] * n # Profile output (deg)
+        self._joints = [0.0] * n # Servo output (deg)
+        self._state = 2
+        self._moves = []
+        self._active = None
+        self._joint_speed = 20.0 # deg/s, SDK default until a speed is given
+        self._tcp_speed = 100.0 # mm/s
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._engine_loop, daemon=True)
+        self._thread.start()
+
+    @property
+    def _position(self):
+        return self._fk_pose(self._joints)
 
     def motion_enable(self, enable=True): return 0
     def set_mode(self, mode): return 0
-    def set_state(self, state): return 0
+    def set_state(self, state):
+        with self._lock:
+            if state == 4:
+                # Stop: flush the queue and hold where the servos are
+                self._moves = []
+                self._active = None
+                self._cmd = list(self._joints)
+            self._state = state if state in (3, 4) else (1 if self._busy() else 2)
+        return 0
+    def get_state(self): return 0, self._state
     def clean_warn(self): return 0
     def clean_error(self): return 0
     
@@ -406,24 +1002,135 @@ class MockXArmAPI:
         return 0, [0, 0]
 
     def get_servo_angle(self, is_radian=False):
-        return 0, list(self._joints)
+        joints = list(self._joints)
+        if is_radian: return 0, [math.radians(j) for j in joints]
+        return 0, joints
 
     def get_position(self, is_radian=False):
-        return 0, list(self._position)
+        pose = self._position
+        if is_radian: pose = pose[:3] + [math.radians(a) for a in pose[3:]]
+        return 0, pose
 
     def set_servo_angle(self, angle, speed=None, mvacc=None, is_radian=False, wait=False, **kwargs):
-        self._joints = list(angle)
-        
-        if wait: time.sleep(0.1)
+        target = [math.degrees(a) for a in angle] if is_radian else [float(a) for a in angle]
+        if speed: self._joint_speed = math.degrees(speed) if is_radian else float(speed)
+        if mvacc: acc = math.degrees(mvacc) if is_radian else float(mvacc)
+        else: acc = config.MOCK_JOINT_ACC
+        speed = min(self._joint_speed, config.MOCK_JOINT_SPEED)
+        return self._queue(("joint", target[:len(self._cmd)], speed, acc), wait)
+
+    def set_position(self, x=None, y=None, z=None, roll=None, pitch=None, yaw=None, speed=None, mvacc=None,
+                     is_radian=False, wait=False, **kwargs):
+        if speed: self._tcp_speed = float(speed)
+        rpy = [roll, pitch, yaw]
+        if is_radian: rpy = [math.degrees(a) if a is not None else None for a in rpy]
+        speed = min(self._tcp_speed, config.MOCK_TCP_SPEED)
+        return self._queue(("line", [x, y, z] + rpy, speed, float(mvacc) if mvacc else config.MOCK_TCP_ACC), wait)
+
+    def move_circle(self, pose1, pose2, percent, speed=None, mvacc=None, mvtime=None, is_radian=False, wait=False, **kwargs):
+        if speed: self._tcp_speed = float(speed)
+        pose1, pose2 = list(pose1), list(pose2)
+        if is_radian: pose2[3:] = [math.degrees(a) for a in pose2[3:6]]
+        speed = min(self._tcp_speed, config.MOCK_TCP_SPEED)
+        return self._queue(("circle", (pose1, pose2, float(percent)), speed,
+                            float(mvacc) if mvacc else config.MOCK_TCP_ACC), wait)
+
+    # --- MOTION ENGINE ---
+    def _queue(self, move, wait):
+        with self._lock:
+            if self._state == 4: return 0
+            self._moves.append(move)
+            self._state = 1
+        while wait and self.connected and self._busy():
+            if self._state == 4: break
+            time.sleep(0.01)
         return 0
 
-    def set_position(self, x=None, y=None, z=None, roll=None, pitch=None, yaw=None, is_radian=False, wait=False, **kwargs):
-        if x is not None: self._position[0] = x
-        if y is not None: self._position[1] = y
-        if z is not None: self._position[2] = z
-        if roll is not None: self._position[3] = roll
-        if pitch is not None: self._position[4] = pitch
-        if yaw is not None: self._position[5] = yaw
-        
-        if wait: time.sleep(0.1)
-        return 0
\ No newline at end of file
+    def _busy(self):
+        if self._moves or self._active: return True
+        return max([abs(a - b) for a, b in zip(self._cmd, self._joints)] + [0.0]) > 0.01
+
+    def _fk_pose(self, joints_deg):
+        if self.model is None: return [200.0, 0.0, 150.0, 180.0, 0.0, 0.0]
+        T = self.model.fk_single([math.radians(j) for j in joints_deg])
+        return [float(v) * 1000.0 for v in T[:3, 3]] + matrix_to_rpy(T[:3, :3])
+
+    def _start(self, move):
+        # Fix the start point and profile of the next queued move
+        kind, target, speed, acc = move
+        if kind == "joint":
+            start = np.array(self._cmd)
+            delta = np.array(target) - start
+            duration, s = trapezoid(float(np.max(np.abs(delta))) if len(delta) else 0.0, speed, acc)
+            return {"kind": kind, "start": start, "delta": delta, "duration": duration, "s": s, "t0": time.time()}
+
+        if self.model is None: return None
+        T0 = self.model.fk_single([math.radians(j) for j in self._cmd])
+        p0 = T0[:3, 3]
+        circle = None
+        if kind == "circle":
+            pose1, pose2, percent = target
+            circle = paths.circle_through(p0, np.array(pose1[:3]) / 1000.0, np.array(pose2[:3]) / 1000.0)
+            if circle is None: return None
+            goal = [float(v) for v in pose2[:6]]
+            sweep = 2 * math.pi * percent / 100.0
+            p1 = p0
+            dist = abs(sweep) * circle[1] * 1000.0
+        else:
+            pose = self._fk_pose(self._cmd)
+            goal = [c if t is None else float(t) for t, c in zip(target, pose)]
+            p1 = np.array(goal[:3]) / 1000.0
+            dist = float(np.linalg.norm(p1 - p0)) * 1000.0
+        R1 = rpy_to_matrix(*goal[3:])
+        axis, angle = _rotation_between(T0[:3, :3], R1)
+        # Pure re-orientation: run the profile over the angle (deg) instead
+        length = dist if dist > 1e-3 else math.degrees(angle)
+        duration, s = trapezoid(length, speed, acc)
+        move = {"kind": kind, "p0": p0, "p1": p1, "R0": T0[:3, :3], "axis": axis, "angle": angle,
+                "length": length, "duration": duration, "s": s, "t0": time.time()}
+        if circle is not None: move["circle"], move["sweep"] = circle, sweep
+        return move
+
+    def _profile_point(self, move, t):
+        if move["kind"] == "joint":
+            dist = float(np.max(np.abs(move["delta"]))) if len(move["delta"]) else 0.0
+            f = move["s"](t) / dist if dist > 0 else 1.0
+            return (move["start"] + move["delta"] * f).tolist()
+
+        f = move["s"](t) / move["length"] if move["length"] > 0 else 1.0
+        if "circle" in move:
+            center, r, u, v = move["circle"]
+            b = move["sweep"] * f
+            pos = center + r * (math.cos(b) * u + math.sin(b) * v)
+        else:
+            pos = move["p0"] + (move["p1"] - move["p0"]) * f
+        a = move["angle"] * f
+        k = move["axis"]
+        K = np.array([[0, -k[2], k[1]], [k[2], 0, -k[0]], [-k[1], k[0], 0]])
+        R = move["R0"] @ (np.eye(3) + math.sin(a) * K + (1.0 - math.cos(a)) * K @ K)
+        # Damped steps only: the controller also drives through wrist singularities
+        q, _ = dls_solve(self.model, np.radians(self._cmd), pos, R, min_manip=0.0)
+        return np.degrees(q).tolist()
+
+    def _engine_loop(self):
+        last = time.time()
+        while self.connected:
+            time.sleep(MOCK_TICK_S)
+            now = time.time()
+            dt, last = now - last, now
+            with self._lock:
+                if self._state != 3:
+                    if self._active is None and self._moves:
+                        self._active = self._start(self._moves.pop(0))
+                    if self._active is not None:
+                        t = now - self._active["t0"]
+                        self._cmd = self._profile_point(self._active, min(t, self._active["duration"]))
+                        if t >= self._active["duration"]: self._active = None
+                else:
+                    # Paused: shift the active profile so it resumes where it stopped
+                    if self._active is not None: self._active["t0"] += dt
+
+                # Servo tracking: first-order lag behind the profile
+                alpha = 1.0 if self.servo_lag <= 0 else 1.0 - math.exp(-dt / self.servo_lag)
+                self._joints = [j + (c - j) * alpha for j, c in zip(self._joints, self._cmd)]
+                if self._state == 1 and not self._busy(): self._state = 2
@@ -0,0 +1,282 @@
+import sys
+import time
+import types
+import queue
+import runpy
+import threading
+import traceback
+import multiprocessing
+import config
+
+# --- ISOLATED SCRIPT RUNNER ---
+# User scripts run in a spawned child process so their Python code never competes
+# with Tk/VTK for the GUI's GIL, and Stop can kill a script that ignores the stop
+# flag. In simulation the child runs its own SimXArmAPI on the cached model; joint
+# state streams back through shared memory (latest value wins). Logs, the final
+# state and real-robot calls go over a pipe: with a robot connected, the child's
+# XArmAPI is a proxy for the GUI's API, which owns the connection.
+
+MAX_JOINTS = 16
+STOP_GRACE_S = 1.0 # Time a script gets to honour Stop before it is terminated
+
+
+# --- CHILD SIDE ---
+
+class _PipeLog:
+    def __init__(self, conn, lock):
+        self.conn = conn
+        self.lock = lock
+
+    def put(self, msg):
+        with self.lock:
+            try: self.conn.send(("log", str(msg)))
+            except: pass
+
+    put_nowait = put
+
+
+class _SharedJoints:
+    def __init__(self, joints, seq):
+        self.joints = joints
+        self.seq = seq
+
+    def put_nowait(self, values):
+        with self.joints.get_lock():
+            n = min(len(values), len(self.joints))
+            self.joints[:n] = [float(v) for v in values[:n]]
+            self.seq.value += 1
+
+    put = put_nowait
+
+
+class _ChildContext:
+    # Same surface as gui.AppContext; the flags live in shared memory
+    def __init__(self, conn, lock, shared):
+        self.log_queue = _PipeLog(conn, lock)
+        self.alert_queue = self.log_queue
+        self.joint_queue = queue.Queue(maxsize=2)
+        self._stop = shared["stop"]
+        self._paused = shared["paused"]
+
+    @property
+    def stop_flag(self): return bool(self._stop.value)
+
+    @stop_flag.setter
+    def stop_flag(self, value): self._stop.value = 1 if value else 0
+
+    @property
+    def paused(self): return bool(self._paused.value)
+
+    @paused.setter
+    def paused(self, value): self._paused.value = 1 if value else 0
+
+
+class _RemoteAPI:
+    # xArm API proxy: every attribute and call is served by the GUI process
+    def __init__(self, conn, lock):
+        self.__dict__["_conn"] = conn
+        self.__dict__["_lock"] = lock
+        self.__dict__["_callables"] = set()
+
+    def _request(self, msg):
+        with self._lock:
+            self._conn.send(msg)
+            kind, value = self._conn.recv()
+        if kind == "stop": raise SystemExit(value)
+        if kind == "missing": raise AttributeError(value)
+        if kind == "error": raise RuntimeError(value)
+        return kind, value
+
+    def __getattr__(self, name):
+        if name.startswith("__"): raise AttributeError(name)
+        if name not in self._callables:
+            kind, value = self._request(("getattr", name))
+            if kind != "callable": return value
+            self._callables.add(name)
+
+        def call(*args, **kwargs):
+            return self._request(("call", name, args, kwargs))[1]
+        return call
+
+    def __setattr__(self, name, value):
+        self._request(("setattr", name, value))
+
+
+def _install_xarm_shim(api):
+    for name in ('xarm', 'xarm.wrapper'):
+        if name in sys.modules: del sys.modules[name]
+    xarm_mod = types.ModuleType('xarm')
+    wrap_mod = types.ModuleType('xarm.wrapper')
+
+    def API_Factory(ip, **kwargs):
+        return api
+
+    wrap_mod.XArmAPI = API_Factory
+    xarm_mod.wrapper = wrap_mod
+    sys.modules['xarm'] = xarm_mod
+    sys.modules['xarm.wrapper'] = wrap_mod
+
+
+def _child_main(conn, shared, setup, script_path):
+    import warnings
+    warnings.filterwarnings("ignore")
+    lock = threading.Lock()
+    ctx = _ChildContext(conn, lock, shared)
+    api = None
+    state = None
+
+    try:
+        if setup["remote"]:
+            api = _RemoteAPI(conn, lock)
+        else:
+            from model_cache import load_compiled, activate
+            from robot_api import SimXArmAPI
+            from reachability import ReachabilityMap
+            from seed_index import SeedIndex
+
+            compiled = load_compiled(setup["urdf"])
+            activate(setup["model_name"], compiled)
+            api = SimXArmAPI(ctx, compiled.chain(), compiled)
+            api.joints_deg = list(setup["joints"])
+            api.last_rpy = list(setup["last_rpy"])
+            api.speed_multiplier = setup["speed_multiplier"]
+            api.tool_offset = setup["tool_offset"]
+            api.reach_map = ReachabilityMap.load(api.model)
+            api.seed_index = SeedIndex.load(api.model)
+            api.start_ik_pool()
+            # __init__ published zeros to the throwaway queue; stream from here on
+            ctx.joint_queue = _SharedJoints(shared["joints"], shared["seq"])
+
+        _install_xarm_shim(api)
+        runpy.run_path(script_path, run_name="__main__")
+        # A trailing blended move (radius > 0) still has to reach its end point
+        if not setup["remote"]:
+            api._run_blocking(api._finish_blend_steps())
+            summary = api.path_stats_summary()
+            if summary: ctx.log_queue.put(summary)
+    except SystemExit as e:
+        ctx.log_queue.put(f"--- {e} ---")
+    except Exception as e:
+        ctx.log_queue.put(f"Error: {e}")
+        traceback.print_exc()
+    finally:
+        if api is not None and not setup["remote"]:
+            state = {"joints": list(api.joints_deg), "last_rpy": list(api.last_rpy)}
+            if api.ik_pool: api.ik_pool.shutdown()
+            try:
+                import planner
+                planner.shutdown()
+            except: pass
+        with lock:
+            try: conn.send(("done", state))
+            except: pass
+        conn.close()
+
+
+# --- GUI SIDE ---
+
+class ScriptProcess:
+    def __init__(self, ctx, api, script_path, urdf_path):
+        self.ctx = ctx
+        self.api = api
+        self.remote = api.real_arm is not None
+        self.n_joints = config.JOINT_COUNT
+
+        mp = multiprocessing.get_context("spawn")
+        self.shared = {
+            "joints": mp.Array('d', MAX_JOINTS),
+            "seq": mp.RawValue('Q', 0),
+            "stop": mp.RawValue('b', 0),
+            "paused": mp.RawValue('b', 0),
+        }
+        setup = {
+            "remote": self.remote,
+            "urdf": urdf_path,
+            "model_name": config.ACTIVE_MODEL,
+            "joints": list(api.joints_deg),
+            "last_rpy": list(api.last_rpy),
+            "speed_multiplier": api.speed_multiplier,
+            "tool_offset": api.tool_offset,
+        }
+        self.conn, child_conn = mp.Pipe()
+        # Not a daemon: the child may start its own planner / IK worker pools
+        self.process = mp.Process(target=_child_main, args=(child_conn, self.shared, setup, script_path),
+                                  name="LiteSimScript")
+        self._last_seq = 0
+
+    def run(self):
+        # Blocks until the script finished or was stopped; returns the child's final sim state
+        self.process.start()
+        stop_sent = None
+        terminated = False
+        state = None
+
+        while True:
+            self.shared["paused"].value = 1 if self.ctx.paused else 0
+            if self.ctx.stop_flag and stop_sent is None:
+                self.shared["stop"].value = 1
+                stop_sent = time.time()
+            if stop_sent and not terminated and time.time() - stop_sent > STOP_GRACE_S and self.process.is_alive():
+                self.process.terminate()
+                terminated = True
+                self.ctx.log_queue.put("[SCRIPT] Script ignored Stop, process terminated.")
+
+            self._pump_joints()
+            try:
+                if self.conn.poll(0.01):
+                    msg = self.conn.recv()
+                    if msg[0] == "done":
+                        state = msg[1]
+                        break
+                    self._handle(msg)
+                elif not self.process.is_alive():
+                    break
+            except (EOFError, OSError):
+                break
+
+        self.process.join(timeout=2.0)
+        if self.process.is_alive(): self.process.terminate()
+        self._pump_joints()
+        if state and not self.remote:
+            self.api.joints_deg = list(state["joints"])
+            self.api.last_rpy = list(state["last_rpy"])
+        return state
+
+    def terminate(self):
+        if self.process.is_alive(): self.process.terminate()
+
+    def _pump_joints(self):
+        joints = self.shared["joints"]
+        with joints.get_lock():
+            seq = self.shared["seq"].value
+            if seq == self._last_seq: return
+            values = list(joints[:self.n_joints])
+        self._last_seq = seq
+        self.api.joints_deg = values
+        self.api._update_gui()
+
+    def _handle(self, msg):
+        kind = msg[0]
+        if kind == "log":
+            self.ctx.log_queue.put(msg[1])
+            return
+
+        # Remote API request from the child (real robot mode)
+        try:
+            if kind == "getattr":
+                attr = getattr(self.api, msg[1])
+                reply = ("callable", None) if callable(attr) else ("value", attr)
+            elif kind == "setattr":
+                setattr(self.api, msg[1], msg[2])
+                reply = ("value", None)
+            else:
+                reply = ("value", getattr(self.api, msg[1])(*msg[2], **msg[3]))
+        except SystemExit as e:
+            reply = ("stop", str(e))
+        except AttributeError as e:
+            reply = ("missing", str(e))
+        except Exception as e:
+            reply = ("error", f"{type(e).__name__}: {e}")
+
+        try: self.conn.send(reply)
+        except Exception as e: self.conn.send(("error", f"Unpicklable result: {e}"))
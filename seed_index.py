@@ -0,0 +1,91 @@
+import os
+import time
+import numpy as np
+import config
+from kinematics import collision_mask, model_hash
+
+try:
+    from scipy.spatial import cKDTree
+    HAS_KDTREE = True
+except ImportError:
+    HAS_KDTREE = False
+
+# --- IK SEED INDEX ---
+# FK samples over the joint range, indexed by tool pose. A pose is embedded as
+# [x, y, z, w*tool_x, w*tool_z] so nearest neighbours in this space are close in
+# both position and orientation; the matching joint vectors are used as IK seeds.
+
+SAMPLE_COUNT = 200000
+CHUNK_SIZE = 20000 # Samples per FK batch: full link frames are only needed for the collision check
+ORIENT_WEIGHT = 0.05 # m per unit of axis difference
+
+
+def pose_features(frames_or_T):
+    T = np.asarray(frames_or_T)
+    if T.ndim == 2: T = T[None]
+    return np.concatenate([T[:, :3, 3], ORIENT_WEIGHT * T[:, :3, 0], ORIENT_WEIGHT * T[:, :3, 2]], axis=1)
+
+
+def index_paths(key):
+    base = os.path.join(config.USER_DATA_DIR, f"ik_seeds_{key}")
+    return base + "_poses.npy", base + "_joints.npy"
+
+
+class SeedIndex:
+    def __init__(self, features, joints):
+        self.features = features
+        self.joints = joints
+        self.tree = cKDTree(np.asarray(features)) if HAS_KDTREE else None
+
+    @classmethod
+    def load(cls, model, limits=None):
+        limits = config.JOINT_LIMITS if limits is None else limits
+        poses_path, joints_path = index_paths(model_hash(model, limits, f"seeds{SAMPLE_COUNT}"))
+        if not (os.path.exists(poses_path) and os.path.exists(joints_path)): return None
+        try:
+            return cls(np.load(poses_path, mmap_mode="r"), np.load(joints_path, mmap_mode="r"))
+        except Exception as e:
+            print(f"[IK SEEDS] Could not load index: {e}")
+            return None
+
+    @classmethod
+    def build(cls, model, limits=None, samples=SAMPLE_COUNT, seed=1):
+        limits = np.asarray(config.JOINT_LIMITS if limits is None else limits, dtype=float)[:model.n_joints]
+        poses_path, joints_path = index_paths(model_hash(model, limits, f"seeds{SAMPLE_COUNT}"))
+        t0 = time.time()
+
+        rng = np.random.default_rng(seed)
+        q_deg = rng.uniform(limits[:, 0], limits[:, 1], size=(samples, model.n_joints))
+        features, joints = [], []
+        for start in range(0, samples, CHUNK_SIZE):
+            q = q_deg[start:start + CHUNK_SIZE]
+            frames = model.fk_deg(q, full=True)
+            ok = ~collision_mask(frames, z_offset=config.ROBOT_Z_OFFSET)
+            features.append(pose_features(frames[ok, -1]).astype(np.float32))
+            joints.append(q[ok].astype(np.float32))
+        features = np.concatenate(features)
+        joints = np.concatenate(joints)
+
+        np.save(poses_path, features)
+        np.save(joints_path, joints)
+        print(f"[IK SEEDS] Indexed {len(joints)} poses in {time.time() - t0:.2f}s")
+        return cls.load(model, limits)
+
+    @classmethod
+    def load_or_build(cls, model, limits=None):
+        index = cls.load(model, limits)
+        if index is None: index = cls.build(model, limits)
+        return index
+
+    def query(self, target_pos, target_orient, k=4):
+        # Joint seeds (deg) for the k stored poses nearest to the target pose
+        T = np.eye(4)
+        T[:3, :3] = target_orient
+        T[:3, 3] = target_pos
+        f = pose_features(T)[0]
+        if self.tree is not None:
+            _, idx = self.tree.query(f, k=k)
+        else:
+            d = np.sum((np.asarray(self.features) - f) ** 2, axis=1)
+            idx = np.argpartition(d, k)[:k]
+        return [[float(v) for v in self.joints[i]] for i in np.atleast_1d(idx)]
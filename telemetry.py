@@ -0,0 +1,196 @@
+import os
+import json
+import time
+import threading
+import numpy as np
+import config
+
+# --- TELEMETRY RECORDER ---
+# Shift-long recording of the real arm. The monitor loop appends samples to a
+# preallocated ring buffer (no allocation per sample); a background thread flushes
+# them to fixed-size chunk files of raw records. Chunks are opened with np.memmap,
+# so a reader can slice any time range of a multi-hour recording without loading it.
+# If the disk stalls long enough to overrun the ring, the oldest unflushed samples
+# are dropped and counted, memory stays bounded.
+#
+# Recording layout:  <dir>/meta.json + <dir>/chunk_00000.bin, chunk_00001.bin, ...
+
+SDK_JOINTS = 7
+SAMPLE_DTYPE = np.dtype([
+    ("t", "<f8"), # Wall time of the sample (s)
+    ("joints", "<f4", (SDK_JOINTS,)), # deg
+    ("pose", "<f4", (6,)), # x, y, z mm + roll, pitch, yaw deg
+    ("err", "u1"),
+    ("warn", "u1"),
+    ("cmd_seq", "<u4"), # Motion commands sent so far
+    ("cmd_t", "<f8"), # Wall time of the last motion command
+])
+
+RING_SAMPLES = 65536
+CHUNK_SAMPLES = 262144 # ~20 MB per chunk
+FLUSH_INTERVAL = 1.0 # Seconds
+
+
+def telemetry_dir():
+    return os.path.join(config.USER_DATA_DIR, "telemetry")
+
+
+class TelemetryRecorder:
+    def __init__(self, directory=None, ring_samples=RING_SAMPLES, chunk_samples=CHUNK_SAMPLES, info=None):
+        if directory is None:
+            directory = os.path.join(telemetry_dir(), time.strftime("%Y%m%d_%H%M%S"))
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.chunk_samples = chunk_samples
+        self.ring = np.zeros(ring_samples, dtype=SAMPLE_DTYPE)
+        self.head = 0 # Samples recorded
+        self.flushed = 0 # Samples taken out of the ring
+        self.dropped = 0
+        self.chunks = [] # [first t, last t, count] per chunk
+        self.info = dict(info or {})
+        self._lock = threading.Lock()
+        self._running = True
+        self._write_meta()
+        self._thread = threading.Thread(target=self._flush_loop, daemon=True)
+        self._thread.start()
+
+    def record(self, t, joints, pose, err=0, warn=0, cmd_seq=0, cmd_t=0.0):
+        with self._lock:
+            row = self.ring[self.head % len(self.ring)]
+            row["t"] = t
+            n = min(len(joints), SDK_JOINTS)
+            row["joints"][:n] = joints[:n]
+            row["joints"][n:] = 0.0
+            row["pose"] = pose[:6]
+            row["err"] = err
+            row["warn"] = warn
+            row["cmd_seq"] = cmd_seq
+            row["cmd_t"] = cmd_t
+            self.head += 1
+
+    def close(self):
+        self._running = False
+        self._thread.join(timeout=5.0)
+        self.flush()
+
+    # --- FLUSH ---
+    def _take(self):
+        # Unflushed samples in order, copied out of the ring
+        with self._lock:
+            cap = len(self.ring)
+            if self.head - self.flushed > cap:
+                self.dropped += self.head - self.flushed - cap
+                self.flushed = self.head - cap
+            start, end = self.flushed, self.head
+            a, b = start % cap, end % cap
+            if end == start: out = self.ring[:0].copy()
+            elif a < b: out = self.ring[a:b].copy()
+            else: out = np.concatenate([self.ring[a:], self.ring[:b]])
+            self.flushed = end
+        return out
+
+    def flush(self):
+        samples = self._take()
+        while len(samples):
+            if not self.chunks or self.chunks[-1][2] >= self.chunk_samples:
+                self.chunks.append([float(samples["t"][0]), float(samples["t"][0]), 0])
+            chunk = self.chunks[-1]
+            part = samples[:self.chunk_samples - chunk[2]]
+            with open(self._chunk_path(len(self.chunks) - 1), "ab") as f:
+                f.write(part.tobytes())
+            chunk[1] = float(part["t"][-1])
+            chunk[2] += len(part)
+            samples = samples[len(part):]
+        self._write_meta()
+
+    def _flush_loop(self):
+        while self._running:
+            time.sleep(FLUSH_INTERVAL)
+            try: self.flush()
+            except Exception as e: print(f"[TELEMETRY] Flush failed: {e}")
+
+    def _chunk_path(self, i):
+        return os.path.join(self.directory, f"chunk_{i:05d}.bin")
+
+    def _write_meta(self):
+        meta = {
+            "version": 1,
+            "dtype": np.lib.format.dtype_to_descr(SAMPLE_DTYPE),
+            "chunk_samples": self.chunk_samples,
+            "chunks": self.chunks,
+            "dropped": self.dropped,
+            "info": self.info,
+        }
+        tmp = os.path.join(self.directory, "meta.json.tmp")
+        with open(tmp, "w") as f: json.dump(meta, f)
+        os.replace(tmp, os.path.join(self.directory, "meta.json"))
+
+
+# --- READER ---
+
+class TelemetryReader:
+    def __init__(self, directory):
+        self.directory = directory
+        self.refresh()
+
+    def refresh(self):
+        # Re-map the chunks; picks up samples flushed since the last call
+        with open(os.path.join(self.directory, "meta.json")) as f: self.meta = json.load(f)
+        self.dtype = np.lib.format.descr_to_dtype(self._descr(self.meta["dtype"]))
+        self.info = self.meta.get("info", {})
+        self.chunks = []
+        i = 0
+        while True:
+            path = os.path.join(self.directory, f"chunk_{i:05d}.bin")
+            if not os.path.exists(path): break
+            count = os.path.getsize(path) // self.dtype.itemsize
+            if count: self.chunks.append(np.memmap(path, dtype=self.dtype, mode="r", shape=(count,)))
+            i += 1
+        self.offsets = np.cumsum([0] + [len(c) for c in self.chunks])
+
+    @staticmethod
+    def _descr(descr):
+        # json turns the descr tuples (and sub-array shapes) into lists
+        if not isinstance(descr, list): return descr
+        return [tuple(tuple(v) if isinstance(v, list) else v for v in field) for field in descr]
+
+    def __len__(self): return int(self.offsets[-1])
+
+    @property
+    def t_start(self): return float(self.chunks[0]["t"][0]) if self.chunks else 0.0
+
+    @property
+    def t_end(self): return float(self.chunks[-1]["t"][-1]) if self.chunks else 0.0
+
+    def index_at(self, t):
+        # Global index of the first sample at or after t (binary search on the mapped chunks)
+        for k, chunk in enumerate(self.chunks):
+            if chunk["t"][-1] >= t:
+                return int(self.offsets[k] + np.searchsorted(chunk["t"], t))
+        return len(self)
+
+    def rows(self, start, stop, step=1):
+        # Samples [start:stop:step] across chunk boundaries, copied out of the maps
+        parts = []
+        for k, chunk in enumerate(self.chunks):
+            lo, hi = self.offsets[k], self.offsets[k + 1]
+            if hi <= start or lo >= stop: continue
+            first = max(start, lo)
+            # Keep the step phase aligned to the global index
+            first += (-(first - start)) % step
+            if first >= min(stop, hi): continue
+            parts.append(np.array(chunk[first - lo:min(stop, hi) - lo:step]))
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=self.dtype)
+
+    def slice(self, t0=None, t1=None, step=1):
+        # Samples with t0 <= t < t1; only the chunks overlapping the range are touched
+        start = 0 if t0 is None else self.index_at(t0)
+        stop = len(self) if t1 is None else self.index_at(t1)
+        return self.rows(start, stop, step)
+
+
+def list_recordings():
+    root = telemetry_dir()
+    if not os.path.isdir(root): return []
+    return [os.path.join(root, d) for d in sorted(os.listdir(root))
+            if os.path.exists(os.path.join(root, d, "meta.json"))]
@@ -0,0 +1,70 @@
+import time
+import numpy as np
+from kinematics import tool_points, collision_mask
+from utils import matrix_to_rpy
+
+# --- RUN TIMELINE ---
+# Joint states of the last simulated run, captured as the API publishes them.
+# After the run, one batched FK pass turns the whole run into a link-transform stack
+# [N, L, 3, 4] (float32, the constant bottom row dropped) plus per-sample tool point
+# and collision flag, so scrubbing is an index into arrays: no IK or FK per event.
+
+MAX_SAMPLES = 200000
+
+
+class Timeline:
+    def __init__(self, max_samples=MAX_SAMPLES):
+        self.max_samples = max_samples
+        self.times = []
+        self.joints = []
+        self.truncated = False
+        self.t = None
+        self.frames = None
+        self.tool = None
+        self.collision = None
+        self.dynamics = None # Torques / energy of the run (dynamics.DynamicModel.trajectory), if computed
+
+    # --- CAPTURE ---
+    def add(self, joints_deg):
+        if len(self.times) >= self.max_samples:
+            self.truncated = True
+            return
+        self.times.append(time.time())
+        self.joints.append(list(joints_deg))
+
+    # --- CACHE ---
+    def compile(self, model, tool_offset=0.0, z_offset=0.0, obstacles=None):
+        if not self.joints: return False
+        n = model.n_joints
+        q = np.radians(np.array([(j + [0.0] * n)[:n] for j in self.joints], dtype=float))
+        frames = model.fk(q, full=True)
+        self.t = np.array(self.times) - self.times[0]
+        self.frames = frames[:, :, :3, :].astype(np.float32)
+        self.tool = tool_points(frames, tool_offset).astype(np.float32)
+        self.collision = collision_mask(frames, tool_offset, obstacles, z_offset)
+        return True
+
+    @property
+    def compiled(self): return self.frames is not None
+
+    @property
+    def duration(self): return float(self.t[-1]) if self.compiled and len(self.t) else 0.0
+
+    def __len__(self): return len(self.times)
+
+    def index_at(self, t):
+        # Last sample at or before t
+        i = int(np.searchsorted(self.t, t, side="right")) - 1
+        return min(max(i, 0), len(self.t) - 1)
+
+    def matrices(self, i):
+        # [L, 4, 4] link transforms of sample i
+        M = np.zeros((self.frames.shape[1], 4, 4))
+        M[:, :3, :] = self.frames[i]
+        M[:, 3, 3] = 1.0
+        return M
+
+    def tool_pose(self, i):
+        # TCP [x, y, z] mm + [roll, pitch, yaw] deg of sample i
+        R = self.frames[i, -1, :, :3].astype(float)
+        return [float(v) * 1000.0 for v in self.tool[i]] + matrix_to_rpy(R)
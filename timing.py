@@ -0,0 +1,114 @@
+import numpy as np
+import config
+
+# --- TIME PARAMETERIZATION ---
+# Minimum-time timing law for a solved joint path under per-joint velocity and
+# acceleration limits (plus optional path speed / acceleration caps), as a
+# forward-backward pass over the path speed sdot(s):
+#
+#   velocity caps   sdot <= v_max_j / |q_j'(s)|        (joint speed)
+#                   sdot <= sqrt(a_max_j / |q_j''(s)|) (curvature: joints turning around)
+#   acceleration    |sddot| <= a_max_j / |q_j'(s)|      per segment
+#
+# The path starts and ends at rest. Near a singularity q' and q'' blow up, so the
+# path slows down the way the controller does instead of the sim joints moving at
+# impossible rates.
+
+
+DENSE_STEP = 5.0 # Path units (mm, deg for a pure re-orientation) between timing samples
+ACC_REFINE_ITERS = 8
+ACC_TOLERANCE = 0.05 # Relative overshoot of the joint acceleration limits accepted
+
+
+def _per_joint(limit, n):
+    limit = np.asarray(limit, dtype=float)
+    return np.broadcast_to(limit, (n,)) if limit.ndim == 0 else limit[:n]
+
+
+def time_parameterize(q, s, v_path=None, a_path=None, v_max=None, a_max=None):
+    # q [N, n] joint path (deg), s [N] increasing path parameter (e.g. mm along the TCP path).
+    # v_path / a_path cap ds/dt and d2s/dt2; v_max / a_max are per-joint (deg/s, deg/s^2),
+    # defaulting to config.JOINT_SPEED_LIMIT / JOINT_ACC_LIMIT. Returns t [N] in seconds.
+    q = np.asarray(q, dtype=float)
+    s = np.asarray(s, dtype=float)
+    N, n = q.shape
+    if N < 2: return np.zeros(N)
+    v_max = _per_joint(config.JOINT_SPEED_LIMIT if v_max is None else v_max, n)
+    a_max = _per_joint(config.JOINT_ACC_LIMIT if a_max is None else a_max, n)
+
+    ds = np.maximum(np.diff(s), 1e-9)
+    dq = np.diff(q, axis=0) / ds[:, None] # q' per segment [N-1, n]
+    qp = np.zeros((N, n)) # |q'| per node: the larger of the adjacent segments
+    qp[:-1] = np.abs(dq)
+    qp[1:] = np.maximum(qp[1:], np.abs(dq))
+    qpp = np.zeros((N, n)) # |q''| per interior node
+    if N > 2: qpp[1:-1] = np.abs(np.diff(dq, axis=0)) / ((ds[:-1] + ds[1:]) / 2.0)[:, None]
+
+    with np.errstate(divide="ignore"):
+        v2 = np.min(np.where(qp > 0, (v_max / qp) ** 2, np.inf), axis=1)
+        v2 = np.minimum(v2, np.min(np.where(qpp > 0, a_max / qpp, np.inf), axis=1))
+        acc = np.min(np.where(np.abs(dq) > 0, a_max / np.abs(dq), np.inf), axis=1)
+    if v_path: v2 = np.minimum(v2, v_path ** 2)
+    if a_path: acc = np.minimum(acc, a_path)
+    acc = np.minimum(acc, 1e12) # Segments where nothing moves
+    v2[0] = v2[-1] = 0.0
+
+    # The two acceleration terms each get the full budget above, so their sum can overshoot:
+    # lower the speed cap where the timed path still breaks a limit and run the passes again
+    for _ in range(ACC_REFINE_ITERS):
+        t, v2_eff = _passes(v2.copy(), acc, ds)
+        if N < 3: break
+        v = joint_velocities(q, t)
+        a = np.abs(np.diff(v, axis=0)) / np.maximum((t[2:] - t[:-2]) / 2.0, 1e-12)[:, None]
+        ratio = np.ones(N)
+        ratio[1:-1] = np.max(a / a_max, axis=1)
+        if ratio.max() <= 1.0 + ACC_TOLERANCE: break
+        # The node's acceleration comes from both adjacent segments: slow its neighbours too
+        ratio = np.maximum(ratio, np.maximum(np.roll(ratio, 1), np.roll(ratio, -1)))
+        over = ratio > 1.0 + ACC_TOLERANCE
+        v2[over] = np.minimum(v2[over], v2_eff[over] / ratio[over])
+    return t
+
+
+def densify(q, s, step=DENSE_STEP):
+    # Sparse solved nodes (e.g. 50 mm apart on an adaptive path) -> samples at most 'step' apart
+    # on a cubic Hermite curve through them. Speed caps and accelerations are only checked at
+    # the samples, so long segments would be timed far too slow; straight joint interpolation
+    # instead would put all of the joint curvature into a corner at every node.
+    q = np.asarray(q, dtype=float)
+    s = np.asarray(s, dtype=float)
+    if len(s) < 2: return q, s
+    ds = np.diff(s)
+    counts = np.maximum(1, np.ceil(ds / step).astype(int))
+    seg = np.repeat(np.arange(len(ds)), counts)
+    u = (np.arange(len(seg)) - np.repeat(np.cumsum(counts) - counts, counts)) / np.repeat(counts, counts)
+    seg, u = np.append(seg, len(ds) - 1), np.append(u, 1.0)
+    m = np.gradient(q, s, axis=0) if len(s) > 2 else np.repeat((q[1:] - q[:-1]) / max(ds[0], 1e-12), 2, axis=0)
+    h = ds[seg][:, None]
+    u = u[:, None]
+    h00, h10 = 2 * u ** 3 - 3 * u ** 2 + 1, u ** 3 - 2 * u ** 2 + u
+    h01, h11 = -2 * u ** 3 + 3 * u ** 2, u ** 3 - u ** 2
+    q_out = h00 * q[seg] + h10 * h * m[seg] + h01 * q[seg + 1] + h11 * h * m[seg + 1]
+    return q_out, s[seg] + u[:, 0] * ds[seg]
+
+
+def _passes(v2, acc, ds):
+    # Forward pass (acceleration), backward pass (deceleration), then integrate to times
+    N = len(v2)
+    for k in range(N - 1): v2[k + 1] = min(v2[k + 1], v2[k] + 2.0 * acc[k] * ds[k])
+    for k in range(N - 2, -1, -1): v2[k] = min(v2[k], v2[k + 1] + 2.0 * acc[k] * ds[k])
+    v = np.sqrt(np.maximum(v2, 0.0))
+    v0, v1 = v[:-1], v[1:]
+    # Per segment: accelerate, cruise at the faster end's speed, brake (a segment that starts
+    # or ends at rest would otherwise be crossed at a fraction of the allowed acceleration)
+    peak = np.minimum(np.maximum(v0, v1), np.sqrt((2.0 * acc * ds + v0 * v0 + v1 * v1) / 2.0))
+    peak = np.where(np.maximum(v0, v1) > 1e-12, peak, np.sqrt(acc * ds)) # Rest to rest within one segment
+    ramp = (2.0 * peak * peak - v0 * v0 - v1 * v1) / (2.0 * acc)
+    dt = (2.0 * peak - v0 - v1) / acc + np.maximum(ds - ramp, 0.0) / np.maximum(peak, 1e-12)
+    return np.concatenate([[0.0], np.cumsum(dt)]), v2
+
+
+def joint_velocities(q, t):
+    # Finite-difference joint velocities (deg/s) per segment of a timed path
+    q, t = np.asarray(q, dtype=float), np.asarray(t, dtype=float)
+    return np.diff(q, axis=0) / np.maximum(np.diff(t), 1e-12)[:, None]
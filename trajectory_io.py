@@ -0,0 +1,148 @@
+import os
+import json
+import numpy as np
+from telemetry import SDK_JOINTS
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAS_ARROW = True
+except ImportError:
+    HAS_ARROW = False
+
+# --- TRAJECTORY EXPORT ---
+# Simulated runs (Timeline) and telemetry recordings written as one structured array per
+# trajectory: time, joints, TCP pose and flags per sample. '.npy' is always available;
+# it is written block by block through a memory map and reloaded with mmap_mode="r",
+# so a multi-million sample file is sliced without being read. '.parquet' (columnar,
+# compressed) needs pyarrow. Metadata goes to a '<file>.json' sidecar.
+
+TRAJECTORY_DTYPE = np.dtype([
+    ("t", "<f8"), # s since the start of the trajectory
+    ("joints", "<f4", (SDK_JOINTS,)), # deg, unused joints 0
+    ("pose", "<f4", (6,)), # x, y, z mm + roll, pitch, yaw deg
+    ("flags", "u1"),
+])
+
+FLAG_COLLISION = 1 # Simulated: robot or tool in collision
+FLAG_TORQUE = 2 # Simulated: a joint over its torque limit
+FLAG_ERROR = 4 # Recorded: controller error code set
+FLAG_WARN = 8 # Recorded: controller warning code set
+FLAG_NAMES = {"collision": FLAG_COLLISION, "torque": FLAG_TORQUE, "error": FLAG_ERROR, "warn": FLAG_WARN}
+
+BLOCK_SAMPLES = 262144 # Rows converted per block when exporting a recording
+
+
+def _rpy_batch(R):
+    # Rotation matrices [N, 3, 3] -> [N, 3] roll, pitch, yaw deg (same convention as utils.matrix_to_rpy)
+    pitch = np.arcsin(np.clip(-R[:, 2, 0], -1.0, 1.0))
+    roll = np.arctan2(R[:, 2, 1], R[:, 2, 2])
+    yaw = np.arctan2(R[:, 1, 0], R[:, 0, 0])
+    return np.degrees(np.column_stack([roll, pitch, yaw]))
+
+
+def timeline_rows(timeline):
+    # Compiled Timeline -> structured array
+    out = np.zeros(len(timeline.t), dtype=TRAJECTORY_DTYPE)
+    out["t"] = timeline.t
+    joints = np.array(timeline.joints, dtype=np.float32)[:, :SDK_JOINTS]
+    out["joints"][:, :joints.shape[1]] = joints
+    out["pose"][:, :3] = timeline.tool * 1000.0
+    out["pose"][:, 3:] = _rpy_batch(timeline.frames[:, -1, :, :3].astype(float))
+    flags = np.where(timeline.collision, FLAG_COLLISION, 0).astype(np.uint8)
+    dyn = timeline.dynamics
+    if dyn is not None:
+        # Torque flags live on the dynamics' resampled grid: nearest grid point per sample
+        idx = np.clip(np.searchsorted(dyn["t"], timeline.t), 0, len(dyn["t"]) - 1)
+        flags |= np.where(np.any(dyn["over"], axis=1)[idx], FLAG_TORQUE, 0).astype(np.uint8)
+    out["flags"] = flags
+    return out
+
+
+def telemetry_rows(samples, t_start):
+    # Raw telemetry records (telemetry.SAMPLE_DTYPE) -> structured array
+    out = np.zeros(len(samples), dtype=TRAJECTORY_DTYPE)
+    out["t"] = samples["t"] - t_start
+    out["joints"] = samples["joints"]
+    out["pose"] = samples["pose"]
+    out["flags"] = np.where(samples["err"] != 0, FLAG_ERROR, 0) | np.where(samples["warn"] != 0, FLAG_WARN, 0)
+    return out
+
+
+# --- WRITE ---
+
+def save(path, blocks, count, info=None):
+    # Write 'count' rows arriving as blocks of structured arrays; returns the rows written
+    if path.lower().endswith(".parquet"): written = _save_parquet(path, blocks)
+    else:
+        mm = np.lib.format.open_memmap(path, mode="w+", dtype=TRAJECTORY_DTYPE, shape=(count,))
+        written = 0
+        for block in blocks:
+            mm[written:written + len(block)] = block
+            written += len(block)
+        mm.flush()
+        del mm
+    meta = dict(info or {})
+    meta.update({"samples": written, "flags": FLAG_NAMES, "joint_columns": SDK_JOINTS})
+    with open(path + ".json", "w") as f: json.dump(meta, f, indent=2)
+    return written
+
+
+def _save_parquet(path, blocks):
+    if not HAS_ARROW: raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+    writer = None
+    written = 0
+    try:
+        for block in blocks:
+            table = _to_table(block)
+            if writer is None: writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+            written += len(block)
+    finally:
+        if writer is not None: writer.close()
+    return written
+
+
+def _to_table(rows):
+    # One column per scalar: t, j1..j7, x, y, z, roll, pitch, yaw, flags
+    cols = {"t": rows["t"]}
+    for k in range(SDK_JOINTS): cols[f"j{k + 1}"] = rows["joints"][:, k]
+    for k, name in enumerate(("x", "y", "z", "roll", "pitch", "yaw")): cols[name] = rows["pose"][:, k]
+    cols["flags"] = rows["flags"]
+    return pa.table(cols)
+
+
+def export_timeline(timeline, path, info=None):
+    rows = timeline_rows(timeline)
+    meta = {"source": "simulation", "t_start": float(timeline.times[0]) if timeline.times else 0.0}
+    meta.update(info or {})
+    return save(path, [rows], len(rows), meta)
+
+
+def export_recording(reader, path, info=None):
+    # Streams the recording chunk by chunk; memory stays at one block
+    t_start = reader.t_start
+    blocks = (telemetry_rows(reader.rows(i, min(i + BLOCK_SAMPLES, len(reader))), t_start)
+              for i in range(0, len(reader), BLOCK_SAMPLES))
+    meta = {"source": "telemetry", "t_start": t_start, "recording": os.path.basename(reader.directory)}
+    meta.update(reader.info)
+    meta.update(info or {})
+    return save(path, blocks, len(reader), meta)
+
+
+# --- READ ---
+
+def load(path):
+    # -> (structured array, metadata). '.npy' is memory-mapped (no copy); '.parquet' is read into memory
+    meta = {}
+    if os.path.exists(path + ".json"):
+        with open(path + ".json") as f: meta = json.load(f)
+    if not path.lower().endswith(".parquet"): return np.load(path, mmap_mode="r"), meta
+    if not HAS_ARROW: raise RuntimeError("Reading parquet needs pyarrow (pip install pyarrow)")
+    table = pq.read_table(path, memory_map=True)
+    out = np.zeros(table.num_rows, dtype=TRAJECTORY_DTYPE)
+    out["t"] = table.column("t").to_numpy()
+    for k in range(SDK_JOINTS): out["joints"][:, k] = table.column(f"j{k + 1}").to_numpy()
+    for k, name in enumerate(("x", "y", "z", "roll", "pitch", "yaw")): out["pose"][:, k] = table.column(name).to_numpy()
+    out["flags"] = table.column("flags").to_numpy()
+    return out, meta
@@ -1,8 +1,23 @@
 # utils.py
+import sys
 import math
+import contextlib
 import numpy as np
 import queue
 
+# Worker pools use "spawn", which re-imports the parent's __main__ in every worker. While
+# runpy runs a script, __main__ is that script (its top level would run again in the worker),
+# so workers are started with the application's own main module in place.
+_APP_MAIN = sys.modules.get("__main__")
+
+@contextlib.contextmanager
+def app_main():
+    current = sys.modules.get("__main__")
+    if _APP_MAIN is not None: sys.modules["__main__"] = _APP_MAIN
+    try: yield
+    finally:
+        if current is not None: sys.modules["__main__"] = current
+
 class QueueRedirector:
     def __init__(self, q):
         self.q = q
@@ -25,4 +40,60 @@ def rpy_to_matrix(roll, pitch, yaw):
     Rx = np.array([[1, 0, 0], [0, ca, -sa], [0, sa, ca]])
     Ry = np.array([[cb, 0, sb], [0, 1, 0], [-sb, 0, cb]])
     Rz = np.array([[cg, -sg, 0], [sg, cg, 0], [0, 0, 1]])
-    return Rz @ Ry @ Rx
\ No newline at end of file
+    return Rz @ Ry @ Rx
+
+def matrix_to_rpy(R):
+    # Inverse of rpy_to_matrix: [roll, pitch, yaw] in degrees
+    pitch = math.asin(max(-1.0, min(1.0, -R[2][0])))
+    roll = math.atan2(R[2][1], R[2][2])
+    yaw = math.atan2(R[1][0], R[0][0])
+    return [math.degrees(roll), math.degrees(pitch), math.degrees(yaw)]
+
+def matrix_to_quat(R):
+    # Rotation matrix -> unit quaternion [w, x, y, z]
+    R = np.asarray(R, dtype=float)
+    tr = R[0, 0] + R[1, 1] + R[2, 2]
+    if tr > 0:
+        s = 2.0 * math.sqrt(tr + 1.0)
+        q = [0.25 * s, (R[2, 1] - R[1, 2]) / s, (R[0, 2] - R[2, 0]) / s, (R[1, 0] - R[0, 1]) / s]
+    elif R[0, 0] > R[1, 1] and R[0, 0] > R[2, 2]:
+        s = 2.0 * math.sqrt(1.0 + R[0, 0] - R[1, 1] - R[2, 2])
+        q = [(R[2, 1] - R[1, 2]) / s, 0.25 * s, (R[0, 1] + R[1, 0]) / s, (R[0, 2] + R[2, 0]) / s]
+    elif R[1, 1] > R[2, 2]:
+        s = 2.0 * math.sqrt(1.0 + R[1, 1] - R[0, 0] - R[2, 2])
+        q = [(R[0, 2] - R[2, 0]) / s, (R[0, 1] + R[1, 0]) / s, 0.25 * s, (R[1, 2] + R[2, 1]) / s]
+    else:
+        s = 2.0 * math.sqrt(1.0 + R[2, 2] - R[0, 0] - R[1, 1])
+        q = [(R[1, 0] - R[0, 1]) / s, (R[0, 2] + R[2, 0]) / s, (R[1, 2] + R[2, 1]) / s, 0.25 * s]
+    q = np.array(q)
+    return q / np.linalg.norm(q)
+
+def quat_to_matrix(q):
+    # Quaternions [..., 4] (w, x, y, z) -> rotation matrices [..., 3, 3]
+    q = np.asarray(q, dtype=float)
+    w, x, y, z = q[..., 0], q[..., 1], q[..., 2], q[..., 3]
+    R = np.empty(q.shape[:-1] + (3, 3))
+    R[..., 0, 0] = 1 - 2 * (y * y + z * z)
+    R[..., 0, 1] = 2 * (x * y - w * z)
+    R[..., 0, 2] = 2 * (x * z + w * y)
+    R[..., 1, 0] = 2 * (x * y + w * z)
+    R[..., 1, 1] = 1 - 2 * (x * x + z * z)
+    R[..., 1, 2] = 2 * (y * z - w * x)
+    R[..., 2, 0] = 2 * (x * z - w * y)
+    R[..., 2, 1] = 2 * (y * z + w * x)
+    R[..., 2, 2] = 1 - 2 * (x * x + y * y)
+    return R
+
+def slerp(R0, R1, t):
+    # Orientations from R0 to R1 at fractions t [N] (shortest arc) -> [N, 3, 3]
+    q0, q1 = matrix_to_quat(R0), matrix_to_quat(R1)
+    d = float(q0 @ q1)
+    if d < 0: q1, d = -q1, -d
+    t = np.asarray(t, dtype=float)[:, None]
+    if d > 0.9995:
+        # Nearly identical: lerp + renormalize avoids dividing by sin(~0)
+        q = q0 + (q1 - q0) * t
+    else:
+        theta = math.acos(d)
+        q = (np.sin((1 - t) * theta) * q0 + np.sin(t * theta) * q1) / math.sin(theta)
+    return quat_to_matrix(q / np.linalg.norm(q, axis=1, keepdims=True))
@@ -3,14 +3,15 @@ import os
 import math
 import numpy as np
 import traceback
-import xml.etree.ElementTree as ET
 import config
+from model_cache import load_compiled, available_models, activate
+from kinematics import COLLISION_THRESHOLD, conditioning
+from dynamics import box_inertia
 
 try:
     import pyvista as pv
     # PyVista settings
     pv.global_theme.allow_empty_mesh = True
-    from ikpy.chain import Chain
 except ImportError as e:
     print(f"CRITICAL: Module missing in Visualizer: {e}")
 
@@ -19,9 +20,13 @@ class RobotVisualizer:
         self.current_joints = [0.0] * config.JOINT_COUNT
         self.script_dir = os.path.dirname(os.path.abspath(__file__))
         self.chain = None
+        self.compiled = None
         self.link_map = [] 
         self.plotter = None
         self.ee_actor = None
+        self.ee_extra = False # Tool actor not tied to a URDF link mesh
+        self.wrist_index = None
+        self._mesh_cache = {}
 
         self.trace_enabled = False
         self.trace_points = []    
@@ -29,112 +34,170 @@ class RobotVisualizer:
         self.trace_color = config.COLOR_PATH
         self.last_trace_pos = None
         self.trace_source = 'wrist' 
+        self.trace_by_manip = False # Color the trace by manipulability (red = near a singularity)
+        self.trace_manip = []
         self.eef_offset_z = 0.0     
         self.is_in_collision_state = False
+        self.reach_actor = None
+        self.cell = None
+        self.cell_robots = [] # Actors and trace of every robot after the first
+        self.collision_reason = None
+
+        # Timeline scrubbing: link transforms shown instead of the live joints
+        self.scrub_frames = None
+        self.scrub_collision = False
+        self._scrub_dirty = False
+        self.show_link_frames = False
+        self.frame_axes = []
     
-    def get_urdf_path(self):
+    def get_urdf_path(self, model_name=None):
         if not os.path.exists(config.MODEL_DIR):
             print(f"[ERR] Model directory not found: {config.MODEL_DIR}")
             return None
-        for f in os.listdir(config.MODEL_DIR):
-            if f.lower().endswith(".urdf"):
-                return os.path.join(config.MODEL_DIR, f)
-        return None
+        models = available_models()
+        if model_name in models: return models[model_name]
+        if config.DEFAULT_MODEL in models: return models[config.DEFAULT_MODEL]
+        return next(iter(models.values()), None)
+
+    def get_model_name(self, urdf_path):
+        for name, path in available_models().items():
+            if os.path.abspath(path) == os.path.abspath(urdf_path): return name
+        return os.path.splitext(os.path.basename(urdf_path))[0]
 
     def get_mesh_path(self, filename):
         if not filename: return None
         return os.path.join(config.VISUAL_DIR, filename)
 
-    def get_urdf_root_link_name(self, urdf_path):
+    def load_chain(self, model_name=None):
+        urdf_path = self.get_urdf_path(model_name)
+        if not urdf_path:
+            print("URDF not found!")
+            return None
+        
+        print(f"[URDF] Loading: {os.path.basename(urdf_path)}")
         try:
-            tree = ET.parse(urdf_path)
-            root = tree.getroot()
-            links = [link.attrib['name'] for link in root.findall('link')]
-            if links: return links[0]
-        except Exception: pass
-        return "link_base"
+            compiled = load_compiled(urdf_path)
+            activate(self.get_model_name(urdf_path), compiled)
+            self.compiled = compiled
+            return self.compiled.chain()
+        except Exception as e:
+            print(f"[URDF] Could not load model: {e}")
+            return None
+
+    def _window_title(self):
+        return f"{config.APP_NAME} {config.APP_VERSION} | UFACTORY {config.ACTIVE_MODEL} Simulator | 3D View"
 
     def setup_scene(self):
-        self.plotter = pv.Plotter(window_size=[config.WINDOW_WIDTH, config.WINDOW_HEIGHT], 
-                                  title=f"{config.APP_NAME} {config.APP_VERSION} | UFACTORY Lite 6 Simulator | 3D View")
+        self.chain = self.load_chain()
+        if self.chain is None: return None
+
+        self.plotter = pv.Plotter(window_size=[config.WINDOW_WIDTH, config.WINDOW_HEIGHT], title=self._window_title())
         self.plotter.set_background(config.COLOR_BG)
         self.plotter.enable_lightkit()
-        urdf_path = self.get_urdf_path()
-        if not urdf_path:
-            print("URDF not found!")
-            return None
+
+        self._add_robot_actors()
         
-        print(f"[URDF] Loading: {os.path.basename(urdf_path)}")
-        root_name = self.get_urdf_root_link_name(urdf_path)
+        floor = pv.Plane(center=(0, 0, 0), direction=(0, 0, 1), i_size=1, j_size=1, i_resolution=20, j_resolution=20)
+        self.plotter.add_mesh(floor, color='#333333', show_edges=True, opacity=0.5, line_width=1)
+        
+        self.plotter.add_axes()
+        self.plotter.view_isometric()
+        self.plotter.enable_anti_aliasing()
+        
+        self.plotter.show(interactive_update=True, auto_close=False)
+        return self.chain
+
+    def _load_link_mesh(self, i):
+        # Visual mesh of chain link i with its URDF <visual> origin and scale baked in
+        path = self.compiled.mesh_path(i)
+        if path is None:
+            print(f"   [!] NOT FOUND: {self.compiled.meshes[i]}")
+            return None
+        origin = self.compiled.mesh_origins[i]
+        scale = self.compiled.mesh_scales[i]
+        key = (path, tuple(np.round(origin, 9).ravel()), tuple(scale))
+        if key in self._mesh_cache: return self._mesh_cache[key]
+
         try:
-            self.chain = Chain.from_urdf_file(urdf_path, base_elements=[root_name])
-            mask = [False] + [True] * config.JOINT_COUNT + [False]
-            if len(self.chain.links) != len(mask):
-                mask = [False] + [True] * config.JOINT_COUNT
-                if len(self.chain.links) > len(mask):
-                    mask += [False] * (len(self.chain.links) - len(mask))
-            self.chain.active_links_mask = mask
+            mesh = pv.read(path)
+            if scale and any(abs(v - 1.0) > 1e-12 for v in scale): mesh.scale(scale, inplace=True)
+            if origin is not None and not np.allclose(origin, np.eye(4)): mesh.transform(origin, inplace=True)
+            if mesh.n_points > 0:
+                mesh = mesh.compute_normals(cell_normals=False, point_normals=True, split_vertices=True, feature_angle=30.0)
         except: return None
-
-        # Base colors for the visualizer
-        colors = [config.COLOR_BASE] * 6 + [config.COLOR_WRIST, config.COLOR_EEF]
+        self._mesh_cache[key] = mesh
+        return mesh
+
+    def _add_robot_actors(self):
+        # One actor per URDF link with a <visual> mesh, plus the (empty) end-effector slot
+        joint_links = self.compiled.model.joint_links
+        self.wrist_index = int(joint_links[-1]) if len(joint_links) else None
+        self.link_map = []
+        self.ee_actor = None
+        self.ee_extra = False
+        style = dict(smooth_shading=True, specular=0.2, pbr=False, metallic=0.3, roughness=0.6)
 
         print("-" * 30)
         for i, link in enumerate(self.chain.links):
-            lname = link.name.lower()
-            expected_stl = None
-            is_end_effector = False
-            
-            if i == 0 or "base" in lname: expected_stl = "base.stl"
-            elif "link1" in lname or "l1" in lname or "joint1" in lname: expected_stl = "link1.stl"
-            elif "link2" in lname or "l2" in lname or "joint2" in lname: expected_stl = "link2.stl"
-            elif "link3" in lname or "l3" in lname or "joint3" in lname: expected_stl = "link3.stl"
-            elif "link4" in lname or "l4" in lname or "joint4" in lname: expected_stl = "link4.stl"
-            elif "link5" in lname or "l5" in lname or "joint5" in lname: expected_stl = "link5.stl"
-            elif "link6" in lname or "l6" in lname or "joint6" in lname: expected_stl = "link6.stl"
-            elif "eef" in lname or "flange" in lname:
-                is_end_effector = True
+            expected_stl = self.compiled.meshes[i]
+            is_end_effector = (i == self.compiled.eef_index and not expected_stl)
 
             print(f"Link {i} ('{link.name}') -> Mapped to: {expected_stl}")
 
             mesh = None
-
-            if is_end_effector:
-                mesh = pv.PolyData() # Empty 3D object
-            elif expected_stl:
-                stl_path = self.get_mesh_path(expected_stl)
-                if os.path.exists(stl_path):
-                    try: 
-                        mesh = pv.read(stl_path)
-                        if mesh.n_points > 0:
-                            mesh = mesh.compute_normals(cell_normals=False, point_normals=True, split_vertices=True, feature_angle=30.0)
-                    except: pass
-                else:
-                    print(f"   [!] NOT FOUND: {expected_stl} in {config.VISUAL_DIR}")
+            if is_end_effector: mesh = pv.PolyData() # Empty 3D object
+            elif expected_stl: mesh = self._load_link_mesh(i)
 
             if mesh is None:
                 self.link_map.append(None)
                 continue
 
-            color = colors[i % len(colors)]
-            if i == 0: color = colors[0]
+            if is_end_effector: color = config.COLOR_EEF
+            elif i == self.wrist_index: color = config.COLOR_WRIST
+            else: color = config.COLOR_BASE
 
-            actor = self.plotter.add_mesh(mesh, color=color, smooth_shading=True, specular=0.2, 
-                                          pbr=False, metallic=0.3, roughness=0.6)
+            actor = self.plotter.add_mesh(mesh, color=color, reset_camera=False, **style)
             self.link_map.append(actor)
             
             if is_end_effector:
                 self.ee_actor = actor
+
+        if self.ee_actor is None:
+            # Last link carries its own mesh: the tool gets a separate actor on the same frame
+            self.ee_actor = self.plotter.add_mesh(pv.PolyData(), color=config.COLOR_EEF, reset_camera=False, **style)
+            self.ee_extra = True
         print("-" * 30)
-        
-        floor = pv.Plane(center=(0, 0, 0), direction=(0, 0, 1), i_size=1, j_size=1, i_resolution=20, j_resolution=20)
-        self.plotter.add_mesh(floor, color='#333333', show_edges=True, opacity=0.5, line_width=1)
-        
-        self.plotter.add_axes()
-        self.plotter.view_isometric()
-        self.plotter.enable_anti_aliasing()
-        
-        self.plotter.show(interactive_update=True, auto_close=False)
+
+    def _remove_robot_actors(self):
+        for actor in self.link_map:
+            if actor is not None: self.plotter.remove_actor(actor, render=False)
+        if self.ee_extra and self.ee_actor is not None: self.plotter.remove_actor(self.ee_actor, render=False)
+        for actor in self.frame_axes: self.plotter.remove_actor(actor, render=False)
+        self.link_map = []
+        self.ee_actor = None
+        self.frame_axes = []
+
+    def switch_model(self, model_name):
+        # Swap the robot at runtime; kinematics and meshes come from the cached model
+        if self.plotter is None: return None
+        gripper = self.ee_actor.mapper.dataset if self.ee_actor else None
+
+        chain = self.load_chain(model_name)
+        if chain is None: return None
+
+        self._remove_cell_actors()
+        self._remove_robot_actors()
+        self.chain = chain
+        self.current_joints = [0.0] * config.JOINT_COUNT
+        self.is_in_collision_state = False
+        self._add_robot_actors()
+        if gripper is not None and self.ee_actor: self.ee_actor.mapper.dataset = gripper
+
+        self.clear_trace()
+        self.hide_reachability()
+        try: self.plotter.title = self._window_title()
+        except: pass
+        self.render_frame()
         return self.chain
     
     def set_custom_gripper(self, stl_path, scale_to_meters=False):
@@ -170,6 +233,21 @@ class RobotVisualizer:
             traceback.print_exc()
             return False
         
+    def eef_mass_properties(self):
+        # (mass kg, COM [3] m, inertia about the COM) of the loaded end-effector in the tool frame, or None.
+        # Mass from config.TOOL_MASS, else mesh volume x TOOL_DENSITY; inertia of its bounding box.
+        mesh = self.ee_actor.mapper.dataset if self.ee_actor else None
+        has_mesh = mesh is not None and mesh.n_points > 0
+        mass = config.TOOL_MASS
+        if mass is None:
+            if not has_mesh: return None
+            try: mass = abs(mesh.volume) * config.TOOL_DENSITY
+            except: return None
+        if mass <= 0: return None
+        if not has_mesh: return mass, np.zeros(3), np.zeros((3, 3))
+        b = mesh.bounds
+        return mass, np.array(mesh.center_of_mass()), box_inertia(mass, (b[1] - b[0], b[3] - b[2], b[5] - b[4]))
+
     def remove_gripper(self):
         if not self.ee_actor:
             return False
@@ -215,6 +293,7 @@ class RobotVisualizer:
     def render_frame(self):
         if self.plotter is None or self.chain is None: return False
         if not hasattr(self.plotter, 'ren_win') or self.plotter.ren_win is None: return False
+        if self.scrub_frames is not None: return self._render_scrub()
 
         try:
             target_vector = [0.0] * len(self.chain.links)
@@ -225,10 +304,16 @@ class RobotVisualizer:
                     target_vector[i] = math.radians(deg)
                     joint_idx += 1
             
-            matrices = self.chain.forward_kinematics(target_vector, full_kinematics=True)
+            all_frames = None
+            if self.cell is not None and len(self.cell) > 1:
+                all_frames = self.cell.frames(self.current_joints)
+                matrices = all_frames[0]
+            else:
+                matrices = self.chain.forward_kinematics(target_vector, full_kinematics=True)
             current_ee_pos = None
             
             current_collision = False
+            self.collision_reason = None
             COLLISION_THRESHOLD = 0.001 
 
             for i, matrix in enumerate(matrices):
@@ -237,7 +322,9 @@ class RobotVisualizer:
                     wrist_y = matrix[1, 3]
                     wrist_z = matrix[2, 3] + config.ROBOT_Z_OFFSET
 
-                    if wrist_z < COLLISION_THRESHOLD: current_collision = True
+                    if wrist_z < COLLISION_THRESHOLD:
+                        current_collision = True
+                        self.collision_reason = "floor"
 
                     if 'tip' in self.trace_source.lower() and hasattr(self, 'eef_offset_z') and self.eef_offset_z > 0:
                         rot_matrix = matrix[:3, :3]
@@ -245,7 +332,9 @@ class RobotVisualizer:
                         world_offset = rot_matrix @ local_offset
                         current_ee_pos = [wrist_x + world_offset[0], wrist_y + world_offset[1], wrist_z + world_offset[2]]
                         
-                        if current_ee_pos[2] < COLLISION_THRESHOLD: current_collision = True
+                        if current_ee_pos[2] < COLLISION_THRESHOLD:
+                            current_collision = True
+                            self.collision_reason = "floor"
                     else:
                         current_ee_pos = [wrist_x, wrist_y, wrist_z]
 
@@ -255,7 +344,16 @@ class RobotVisualizer:
                         mat_copy = matrix.copy()
                         mat_copy[2, 3] += config.ROBOT_Z_OFFSET
                         actor.user_matrix = mat_copy 
+
+                if self.ee_extra and self.ee_actor and i == len(matrices) - 1:
+                    mat_copy = matrix.copy()
+                    mat_copy[2, 3] += config.ROBOT_Z_OFFSET
+                    self.ee_actor.user_matrix = mat_copy
             
+            if all_frames is not None and self._update_cell_robots(all_frames):
+                current_collision = True
+            if self.show_link_frames: self._update_link_frames(matrices)
+
             if current_collision:
                 if not self.is_in_collision_state:
                     self.set_color("arm", config.COLOR_COLLISION)
@@ -279,11 +377,19 @@ class RobotVisualizer:
                 if should_add:
                     self.trace_points.append(current_ee_pos)
                     self.last_trace_pos = current_ee_pos
+                    if self.trace_by_manip:
+                        n = self.compiled.model.n_joints
+                        self.trace_manip.append(conditioning(self.compiled.model, np.radians([self.current_joints[:n]]))[0][0])
                     if len(self.trace_points) > 1:
                         if self.trace_actor: self.plotter.remove_actor(self.trace_actor)
                         points_array = np.array(self.trace_points)
                         line_mesh = pv.lines_from_points(points_array)
-                        self.trace_actor = self.plotter.add_mesh(line_mesh, color=self.trace_color, line_width=4, reset_camera=False)
+                        if self.trace_by_manip and len(self.trace_manip) == len(self.trace_points):
+                            self.trace_actor = self.plotter.add_mesh(line_mesh, scalars=np.array(self.trace_manip), cmap="RdYlGn",
+                                                                     clim=[0.0, 4 * config.SINGULARITY_MANIP_MIN], show_scalar_bar=False,
+                                                                     line_width=4, reset_camera=False)
+                        else:
+                            self.trace_actor = self.plotter.add_mesh(line_mesh, color=self.trace_color, line_width=4, reset_camera=False)
             
             self.plotter.render() 
             return False
@@ -299,12 +405,16 @@ class RobotVisualizer:
         try:
             if target == 'bg': self.plotter.set_background(color_hex)
             elif target == 'arm':
-                for i in range(6): 
-                    if i < len(self.link_map) and self.link_map[i]: self.link_map[i].prop.color = color_hex
+                for link_map, _ in self._robot_actor_sets():
+                    for i in range(self.wrist_index or 0): 
+                        if i < len(link_map) and link_map[i]: link_map[i].prop.color = color_hex
             elif target == 'wrist':
-                if len(self.link_map) > 6 and self.link_map[6]: self.link_map[6].prop.color = color_hex
+                w = self.wrist_index
+                for link_map, _ in self._robot_actor_sets():
+                    if w is not None and len(link_map) > w and link_map[w]: link_map[w].prop.color = color_hex
             elif target == 'eef':
-                if self.ee_actor: self.ee_actor.prop.color = color_hex
+                for _, ee_actor in self._robot_actor_sets():
+                    if ee_actor: ee_actor.prop.color = color_hex
             elif target == 'trace':
                 self.trace_color = color_hex 
                 if self.trace_actor: self.trace_actor.prop.color = color_hex
@@ -319,12 +429,23 @@ class RobotVisualizer:
             self.clear_trace()
             pass
 
+    def set_trace_manip(self, enabled):
+        self.trace_by_manip = enabled
+        self.clear_trace()
+
     def clear_trace(self):
         self.trace_points = []
+        self.trace_manip = []
         self.last_trace_pos = None
         if self.trace_actor:
             self.plotter.remove_actor(self.trace_actor)
             self.trace_actor = None
+        for robot in self.cell_robots:
+            robot["trace_points"] = []
+            robot["last_trace_pos"] = None
+            if robot["trace_actor"]:
+                self.plotter.remove_actor(robot["trace_actor"])
+                robot["trace_actor"] = None
 
     def set_ghost_mode(self, enabled, keep_gripper_visible):
         if not self.plotter: return
@@ -340,13 +461,167 @@ class RobotVisualizer:
             opacity_eef = 1.0 if keep_gripper_visible else 0.1
 
         try:
-            for actor in self.link_map:
-                if actor:
-                    actor.prop.opacity = opacity_arm
-            
-            if self.ee_actor:
-                self.ee_actor.prop.opacity = opacity_eef
+            for link_map, ee_actor in self._robot_actor_sets():
+                for actor in link_map:
+                    if actor:
+                        actor.prop.opacity = opacity_arm
+                
+                if ee_actor:
+                    ee_actor.prop.opacity = opacity_eef
             
             self.plotter.render()
         except Exception as e:
-            print(f"[VISUALIZER] Ghost mode error: {e}")
\ No newline at end of file
+            print(f"[VISUALIZER] Ghost mode error: {e}")
+
+    def show_reachability(self, reach_map, layer=0):
+        if not self.plotter: return
+        self.hide_reachability()
+        try:
+            centers, values = reach_map.heatmap_points(layer, stride=2)
+            if len(centers) == 0: return
+            centers[:, 2] += config.ROBOT_Z_OFFSET
+            cloud = pv.PolyData(centers)
+            cloud["manipulability"] = values
+            self.reach_actor = self.plotter.add_mesh(cloud, scalars="manipulability", cmap="inferno",
+                                                     point_size=4, opacity=0.35, render_points_as_spheres=False,
+                                                     show_scalar_bar=False, reset_camera=False)
+            self.plotter.render()
+        except Exception as e:
+            print(f"[VISUALIZER] Reachability map error: {e}")
+
+    def hide_reachability(self):
+        if self.reach_actor and self.plotter:
+            self.plotter.remove_actor(self.reach_actor)
+            self.reach_actor = None
+            self.plotter.render()
+
+    # --- TIMELINE SCRUBBING ---
+    def show_scrub_frame(self, matrices, collision=False):
+        # Pose from a precomputed transform stack; no FK until end_scrub()
+        self.scrub_frames = matrices
+        self.scrub_collision = bool(collision)
+        self._scrub_dirty = True
+
+    def end_scrub(self):
+        self.scrub_frames = None
+        self.scrub_collision = False
+
+    def _render_scrub(self):
+        if not self._scrub_dirty: return self.scrub_collision
+        self._scrub_dirty = False
+        last = len(self.scrub_frames) - 1
+        for i, matrix in enumerate(self.scrub_frames):
+            mat_copy = matrix.copy()
+            mat_copy[2, 3] += config.ROBOT_Z_OFFSET
+            if i < len(self.link_map) and self.link_map[i] is not None: self.link_map[i].user_matrix = mat_copy
+            if self.ee_extra and self.ee_actor and i == last: self.ee_actor.user_matrix = mat_copy
+        if self.show_link_frames: self._update_link_frames(self.scrub_frames)
+
+        if self.scrub_collision and not self.is_in_collision_state:
+            for target in ("arm", "wrist", "eef"): self.set_color(target, config.COLOR_COLLISION)
+            self.is_in_collision_state = True
+        elif not self.scrub_collision:
+            self.is_in_collision_state = False
+        self.collision_reason = "floor" if self.scrub_collision else None
+        self.plotter.render()
+        return self.scrub_collision
+
+    def set_link_frames(self, enabled):
+        self.show_link_frames = enabled
+        if not enabled:
+            for actor in self.frame_axes: self.plotter.remove_actor(actor, render=False)
+            self.frame_axes = []
+            self.plotter.render()
+        self._scrub_dirty = True
+
+    def _update_link_frames(self, matrices):
+        # Small axis triad on every link frame
+        while len(self.frame_axes) < len(matrices):
+            axes = pv.create_axes_marker(labels_off=True)
+            axes.SetTotalLength(0.05, 0.05, 0.05)
+            self.plotter.add_actor(axes, reset_camera=False, render=False)
+            self.frame_axes.append(axes)
+        for axes, matrix in zip(self.frame_axes, matrices):
+            mat_copy = np.array(matrix, dtype=float)
+            mat_copy[2, 3] += config.ROBOT_Z_OFFSET
+            axes.SetUserMatrix(pv.vtkmatrix_from_array(mat_copy))
+
+    # --- MULTI-ROBOT CELL ---
+    def _robot_actor_sets(self):
+        return [(self.link_map, self.ee_actor)] + [(r["link_map"], r["ee_actor"]) for r in self.cell_robots]
+
+    def _clone_actor(self, src):
+        # Extra arms share the first arm's mappers: one copy of each mesh, own pose and color
+        actor = pv.Actor(mapper=src.mapper, prop=src.prop.copy())
+        self.plotter.add_actor(actor, reset_camera=False, render=False)
+        return actor
+
+    def link_points(self, max_points=4000):
+        # Mesh points per link in its own frame, for the cell's bounding volumes
+        points = {}
+        for i, actor in enumerate(self.link_map):
+            if actor is None or actor is self.ee_actor: continue
+            pts = np.asarray(actor.mapper.dataset.points)
+            if len(pts) == 0: continue
+            step = max(1, len(pts) // max_points)
+            points[i] = pts[::step]
+        return points
+
+    def attach_cell(self, cell):
+        self._remove_cell_actors()
+        self.cell = cell
+        if self.plotter is None or cell is None: return
+        cell.set_link_volumes(self.link_points())
+        for robot in cell.robots[1:]:
+            link_map = [self._clone_actor(a) if a is not None else None for a in self.link_map]
+            if self.ee_extra: ee_actor = self._clone_actor(self.ee_actor)
+            else: ee_actor = link_map[self.compiled.eef_index]
+            self.cell_robots.append({"robot": robot, "link_map": link_map, "ee_actor": ee_actor,
+                                     "trace_points": [], "trace_actor": None, "last_trace_pos": None})
+        self.render_frame()
+
+    def _remove_cell_actors(self):
+        for robot in self.cell_robots:
+            for actor in robot["link_map"]:
+                if actor is not None: self.plotter.remove_actor(actor, render=False)
+            if self.ee_extra and robot["ee_actor"] is not None: self.plotter.remove_actor(robot["ee_actor"], render=False)
+            if robot["trace_actor"]: self.plotter.remove_actor(robot["trace_actor"], render=False)
+        self.cell_robots = []
+
+    def _tool_point(self, matrix):
+        pos = matrix[:3, 3].copy()
+        if 'tip' in self.trace_source.lower() and self.eef_offset_z > 0:
+            pos += matrix[:3, :3] @ np.array([0.0, 0.0, self.eef_offset_z])
+        return pos
+
+    def _update_cell_robots(self, all_frames):
+        # Pose, floor check and trace for robots 2..N, then the inter-robot check
+        collision = False
+        for r, robot in enumerate(self.cell_robots, start=1):
+            frames = all_frames[r].copy()
+            frames[:, 2, 3] += config.ROBOT_Z_OFFSET
+            for i, actor in enumerate(robot["link_map"]):
+                if actor is not None and i < len(frames): actor.user_matrix = frames[i]
+            if self.ee_extra and robot["ee_actor"] is not None: robot["ee_actor"].user_matrix = frames[-1]
+
+            tip = self._tool_point(frames[-1])
+            if min(frames[-1][2, 3], tip[2]) < COLLISION_THRESHOLD:
+                collision = True
+                self.collision_reason = "floor"
+
+            if self.trace_enabled:
+                last = robot["last_trace_pos"]
+                if last is None or np.linalg.norm(tip - last) > 0.001:
+                    robot["trace_points"].append(tip)
+                    robot["last_trace_pos"] = tip
+                    if len(robot["trace_points"]) > 1:
+                        if robot["trace_actor"]: self.plotter.remove_actor(robot["trace_actor"], render=False)
+                        line_mesh = pv.lines_from_points(np.array(robot["trace_points"]))
+                        robot["trace_actor"] = self.plotter.add_mesh(line_mesh, color=self.trace_color, line_width=4, reset_camera=False)
+
+        pairs = self.cell.collisions(all_frames)
+        if pairs:
+            collision = True
+            names = [f"{self.cell.robots[a].name} / {self.cell.robots[b].name}" for a, b in pairs]
+            self.collision_reason = "robots: " + ", ".join(names)
+        return collision
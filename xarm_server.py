@@ -0,0 +1,396 @@
+import math
+import time
+import queue
+import random
+import socket
+import struct
+import argparse
+import threading
+import numpy as np
+import config
+from utils import matrix_to_rpy
+from model_cache import load_compiled, available_models, activate
+from robot_api import SimXArmAPI
+
+# --- XARM PROTOCOL STAND-IN ---
+# Local TCP server that speaks the controller's private Modbus-TCP protocol on the
+# command port and streams report frames on the report ports, so the real xArm SDK
+# (connect_real_robot, _monitor_loop, scripts) can run against 127.0.0.1 without a
+# robot. Motion runs on a SimXArmAPI of the active model in real time; commands are
+# queued like on the controller. Replies can be delayed, jittered, dropped, and
+# motion commands can trigger controller errors, to test timeouts and recovery.
+#
+#   python xarm_server.py --latency 5 --jitter 3 --loss 0.01 --error-rate 0.002
+#
+# The SDK always connects to port 502: on Linux/macOS that needs root (or
+# --cmd-port with a port forward).
+
+CMD_PORT = 502
+REPORT_PORTS = {30001: 10.0, 30002: 10.0, 30003: 100.0} # normal, rich, real-time (Hz)
+PROTOCOL_ID = 2
+HEARTBEAT_ID = 1
+REPORT_SIZE = 145 # 'normal' report frame; rich/real-time parsers read the same prefix
+
+# Register (function code) ids
+REG_GET_VERSION = 1
+REG_GET_ROBOT_SN = 2
+REG_MOTION_EN = 11
+REG_SET_STATE = 12
+REG_GET_STATE = 13
+REG_GET_CMDNUM = 14
+REG_GET_ERROR = 15
+REG_CLEAN_ERR = 16
+REG_CLEAN_WAR = 17
+REG_SET_MODE = 19
+REG_MOVE_LINE = 21
+REG_MOVE_JOINT = 23
+REG_MOVE_HOME = 25
+REG_SLEEP_INSTT = 26
+REG_GET_TCP_POSE = 41
+REG_GET_JOINT_POS = 42
+REG_GET_FK = 44
+
+STATE_MOVING, STATE_READY, STATE_PAUSED, STATE_STOPPED = 1, 2, 3, 4
+FLAG_ERROR, FLAG_WARN = 0x40, 0x20
+# Injected errors: self-collision, joint limit, speed limit, abnormal current, safety boundary
+INJECT_ERROR_CODES = [22, 23, 24, 31, 35]
+UNKNOWN_REPLY_SIZE = 64 # Zero payload for registers the stand-in does not model
+SDK_JOINTS = 7
+
+
+class _PrintLog:
+    def __init__(self, verbose):
+        self.verbose = verbose
+
+    def put(self, msg):
+        if self.verbose: print(f"[XARM SIM] {msg}")
+
+    put_nowait = put
+
+
+class _ServerContext:
+    # Minimal AppContext for the SimXArmAPI that backs the server
+    def __init__(self, verbose=False):
+        self.log_queue = _PrintLog(verbose)
+        self.alert_queue = self.log_queue
+        self.joint_queue = queue.Queue(maxsize=1)
+        self.stop_flag = False
+        self.paused = False
+
+
+def _recv_exact(sock, n):
+    buf = b""
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk: raise ConnectionError("closed")
+        buf += chunk
+    return buf
+
+
+def _floats(values):
+    return struct.pack(f"<{len(values)}f", *values)
+
+
+class XArmStandIn:
+    def __init__(self, host="127.0.0.1", cmd_port=CMD_PORT, report_ports=None, model_name=None,
+                 latency_ms=0.0, jitter_ms=0.0, loss=0.0, error_rate=0.0, seed=None, verbose=False):
+        self.host = host
+        self.cmd_port = cmd_port
+        self.report_ports = dict(REPORT_PORTS if report_ports is None else report_ports)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.loss = loss
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+
+        model_name = model_name or config.ACTIVE_MODEL
+        models = available_models()
+        if model_name not in models: raise ValueError(f"Unknown robot model: {model_name}")
+        compiled = load_compiled(models[model_name])
+        activate(model_name, compiled)
+        self.model_name = model_name
+        self.model = compiled.model
+        self.ctx = _ServerContext(verbose)
+        self.api = SimXArmAPI(self.ctx, compiled.chain(), compiled)
+        try:
+            from reachability import ReachabilityMap
+            from seed_index import SeedIndex
+            self.api.reach_map = ReachabilityMap.load(self.model)
+            self.api.seed_index = SeedIndex.load(self.model)
+        except: pass
+
+        # Controller state
+        self.state = STATE_READY
+        self.mode = 0
+        self.error_code = 0
+        self.warn_code = 0
+        self.enabled = True
+        self.commands = queue.Queue()
+        self._busy = False
+        self._lock = threading.Lock()
+
+        self.stats = {"commands": 0, "dropped": 0, "errors": 0, "clients": 0}
+        self.running = False
+        self._sockets = []
+        self._threads = []
+
+    # --- LIFECYCLE ---
+    def start(self):
+        self.running = True
+        self._spawn(self._motion_loop)
+        self._listen(self.cmd_port, self._serve_commands)
+        for port, hz in self.report_ports.items():
+            self._listen(port, lambda conn, hz=hz: self._serve_reports(conn, hz))
+        ports = ", ".join(str(p) for p in self.report_ports)
+        print(f"[XARM SIM] {self.model_name} on {self.host}:{self.cmd_port} | Reports: {ports}")
+        return self
+
+    def stop(self):
+        self.running = False
+        self.ctx.stop_flag = True
+        for s in self._sockets:
+            try: s.close()
+            except: pass
+        for t in self._threads: t.join(timeout=1.0)
+
+    def _spawn(self, target, *args):
+        t = threading.Thread(target=target, args=args, daemon=True)
+        t.start()
+        self._threads.append(t)
+
+    def _listen(self, port, handler):
+        srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        srv.bind((self.host, port))
+        srv.listen(8)
+        srv.settimeout(0.5)
+        self._sockets.append(srv)
+        self._spawn(self._accept_loop, srv, handler)
+
+    def _accept_loop(self, srv, handler):
+        while self.running:
+            try: conn, _ = srv.accept()
+            except socket.timeout: continue
+            except OSError: break
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.stats["clients"] += 1
+            threading.Thread(target=handler, args=(conn,), daemon=True).start()
+
+    # --- FAULTS ---
+    def inject_error(self, code):
+        # Controller error: motion stops, queue is flushed, state 4 until cleared + set_state(0)
+        with self._lock:
+            self.error_code = int(code)
+            self.stats["errors"] += 1
+            self._halt()
+        print(f"[XARM SIM] Injected error C{code}")
+
+    def _halt(self):
+        self._flush()
+        self.state = STATE_STOPPED
+        if self._busy: self.ctx.stop_flag = True
+
+    def _flush(self):
+        while True:
+            try: self.commands.get_nowait()
+            except queue.Empty: return
+
+    def _delay(self):
+        if not self.latency_ms and not self.jitter_ms: return
+        ms = self.latency_ms + self.rng.uniform(-self.jitter_ms, self.jitter_ms)
+        if ms > 0: time.sleep(ms / 1000.0)
+
+    # --- STATE ---
+    def joints_rad(self):
+        joints = [math.radians(j) for j in self.api.joints_deg]
+        return (joints + [0.0] * SDK_JOINTS)[:SDK_JOINTS]
+
+    def pose(self, joints_rad=None):
+        # [x, y, z] mm + [roll, pitch, yaw] rad from the simulator's FK
+        q = self.joints_rad() if joints_rad is None else joints_rad
+        T = self.model.fk_single(list(q)[:self.model.n_joints])
+        rpy = [math.radians(a) for a in matrix_to_rpy(T[:3, :3])]
+        return [float(v) * 1000.0 for v in T[:3, 3]] + rpy
+
+    def cmd_num(self):
+        return self.commands.qsize() + (1 if self._busy else 0)
+
+    def _flags(self):
+        return (FLAG_ERROR if self.error_code else 0) | (FLAG_WARN if self.warn_code else 0)
+
+    # --- COMMAND PORT ---
+    def _serve_commands(self, conn):
+        try:
+            while self.running:
+                tid, prot, length = struct.unpack(">HHH", _recv_exact(conn, 6))
+                body = _recv_exact(conn, length)
+                if prot == HEARTBEAT_ID:
+                    conn.sendall(struct.pack(">HHH", tid, prot, length) + body)
+                    continue
+
+                self.stats["commands"] += 1
+                reg, params = body[0], body[1:]
+                data = self._handle(reg, params)
+
+                if self.loss and self.rng.random() < self.loss:
+                    self.stats["dropped"] += 1
+                    continue
+                self._delay()
+                reply = struct.pack(">HHHBB", tid, PROTOCOL_ID, 2 + len(data), reg, self._flags()) + data
+                conn.sendall(reply)
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            try: conn.close()
+            except: pass
+
+    def _handle(self, reg, params):
+        n = len(params) // 4
+        values = struct.unpack(f"<{n}f", params[:n * 4]) if n else ()
+
+        if reg == REG_GET_VERSION: return b"LiteSim stand-in 2.0.0".ljust(40, b"\0")
+        if reg == REG_GET_ROBOT_SN: return b"LITESIM0000000".ljust(40, b"\0")
+        if reg == REG_GET_STATE: return bytes([self.state])
+        if reg == REG_GET_CMDNUM: return struct.pack(">H", self.cmd_num())
+        if reg == REG_GET_ERROR: return bytes([self.error_code, self.warn_code])
+        if reg == REG_GET_JOINT_POS: return _floats(self.joints_rad())
+        if reg == REG_GET_TCP_POSE: return _floats(self.pose())
+        if reg == REG_GET_FK: return _floats(self.pose(list(values) or None))
+
+        with self._lock:
+            if reg == REG_MOTION_EN:
+                self.enabled = bool(params[1]) if len(params) > 1 else True
+            elif reg == REG_SET_MODE:
+                self.mode = params[0] if params else 0
+            elif reg == REG_CLEAN_ERR:
+                self.error_code = 0
+            elif reg == REG_CLEAN_WAR:
+                self.warn_code = 0
+            elif reg == REG_SET_STATE:
+                self._set_state(params[0] if params else 0)
+            elif reg in (REG_MOVE_JOINT, REG_MOVE_LINE, REG_MOVE_HOME, REG_SLEEP_INSTT):
+                self._queue_motion(reg, values)
+            else:
+                return bytes(UNKNOWN_REPLY_SIZE)
+        return b""
+
+    def _set_state(self, state):
+        if state == STATE_STOPPED:
+            self._halt()
+        elif state == STATE_PAUSED:
+            self.ctx.paused = True
+            self.state = STATE_PAUSED
+        elif not self.error_code:
+            self.ctx.paused = False
+            self.state = STATE_MOVING if self.cmd_num() else STATE_READY
+
+    def _queue_motion(self, reg, values):
+        # Rejected like the controller while stopped, in error or with motors off
+        if self.state == STATE_STOPPED or self.error_code or not self.enabled: return
+        if self.error_rate and self.rng.random() < self.error_rate:
+            self.error_code = self.rng.choice(INJECT_ERROR_CODES)
+            self.stats["errors"] += 1
+            self._halt()
+            return
+
+        n = self.model.n_joints
+        if reg == REG_MOVE_JOINT:
+            speed = math.degrees(values[SDK_JOINTS]) if len(values) > SDK_JOINTS else None
+            cmd = ("joint", [math.degrees(v) for v in values[:n]], speed)
+        elif reg == REG_MOVE_HOME:
+            cmd = ("joint", [0.0] * n, math.degrees(values[0]) if values else None)
+        elif reg == REG_MOVE_LINE:
+            cmd = ("line", values[:3], [math.degrees(v) for v in values[3:6]], values[6] if len(values) > 6 else None)
+        else:
+            cmd = ("sleep", values[0] if values else 0.0)
+        self.commands.put(cmd)
+        if self.state == STATE_READY: self.state = STATE_MOVING
+
+    # --- MOTION ---
+    def _motion_loop(self):
+        while self.running:
+            try: cmd = self.commands.get(timeout=0.1)
+            except queue.Empty: continue
+            with self._lock:
+                if self.state == STATE_STOPPED: continue
+                self._busy = True
+                self.ctx.stop_flag = False
+            try:
+                self.api._run_blocking(self._steps(cmd))
+            except SystemExit:
+                pass
+            except Exception as e:
+                print(f"[XARM SIM] Motion error: {e}")
+            with self._lock:
+                self._busy = False
+                self.ctx.stop_flag = False
+                if self.state == STATE_MOVING and self.commands.empty(): self.state = STATE_READY
+
+    def _steps(self, cmd):
+        if cmd[0] == "joint":
+            return self.api._servo_angle_steps(cmd[1], speed=cmd[2])
+        if cmd[0] == "line":
+            (x, y, z), (roll, pitch, yaw), speed = cmd[1], cmd[2], cmd[3]
+            return self.api._position_steps(x, y, z, roll, pitch, yaw, speed=speed, silent=True)
+        return self._sleep_steps(cmd[1])
+
+    def _sleep_steps(self, seconds):
+        yield from self.api._control_steps()
+        yield seconds
+
+    # --- REPORT PORTS ---
+    def report_frame(self):
+        enabled = (1 << self.model.n_joints) - 1 if self.enabled else 0
+        frame = struct.pack(">I", REPORT_SIZE)
+        frame += bytes([(self.state & 0x0F) | ((self.mode & 0x0F) << 4)])
+        frame += struct.pack(">H", self.cmd_num())
+        frame += _floats(self.joints_rad())
+        frame += _floats(self.pose())
+        frame += _floats([0.0] * SDK_JOINTS) # Joint torques
+        frame += bytes([enabled, enabled, self.error_code, self.warn_code]) # Brakes, motors, error, warning
+        frame += _floats([0.0, 0.0, self.api.tool_offset * 1000.0, 0.0, 0.0, 0.0]) # TCP offset (mm)
+        frame += _floats([0.0] * 4) # TCP load
+        frame += bytes([3, 3]) # Collision / teach sensitivity
+        frame += _floats([0.0, 0.0, -1.0]) # Gravity direction
+        return frame
+
+    def _serve_reports(self, conn, hz):
+        period = 1.0 / hz
+        try:
+            while self.running:
+                conn.sendall(self.report_frame())
+                time.sleep(period)
+        except OSError:
+            pass
+        finally:
+            try: conn.close()
+            except: pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local xArm controller stand-in backed by the LiteSim simulator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--cmd-port", type=int, default=CMD_PORT)
+    parser.add_argument("--model", default=config.DEFAULT_MODEL)
+    parser.add_argument("--latency", type=float, default=0.0, help="Reply latency in ms")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Uniform +/- jitter in ms")
+    parser.add_argument("--loss", type=float, default=0.0, help="Probability a reply is dropped")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability a motion command raises a controller error")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    server = XArmStandIn(args.host, args.cmd_port, model_name=args.model, latency_ms=args.latency,
+                         jitter_ms=args.jitter, loss=args.loss, error_rate=args.error_rate,
+                         seed=args.seed, verbose=args.verbose).start()
+    try:
+        while True: time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    server.stop()
+    s = server.stats
+    print(f"[XARM SIM] Stopped | Commands: {s['commands']} | Dropped: {s['dropped']} | Errors: {s['errors']}")
+
+
+if __name__ == "__main__":
+    main()